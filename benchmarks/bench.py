@@ -0,0 +1,191 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+"""Benchmark reaper commands against a local fake Reaper.
+
+Every scenario runs the CLI in a fresh process against a freshly reset fake
+fleet and records wall time, API request count and peak RSS of the process.
+Results can be saved with --output and compared with a saved --baseline:
+any increase of the request count, or of wall time or peak RSS beyond
+--tolerance, is a regression and makes the run exit 1. POSIX only.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from fnmatch import fnmatchcase
+from urllib.request import Request, urlopen
+
+from fake_reaper import FLEET_OPTIONS, fleet_arguments
+
+CLUSTERS = 'cluster-00*'
+
+
+def scenarios(fleet):
+    return [
+        ('repair-list', ['repair-list']),
+        ('repair-list-all-states', ['repair-list', '--states', 'ALL']),
+        ('repair-list-cluster-glob', ['repair-list', CLUSTERS]),
+        ('repair-list-eta', ['repair-list', '--eta']),
+        ('repair-segment-list', ['repair-segment-list', fleet['large_repair']]),
+        ('repair-segment-list-ndjson', ['repair-segment-list', fleet['large_repair'], '--format', 'ndjson']),
+        ('repair-segment-stats', ['repair-segment-stats', fleet['large_repair']]),
+        ('schedule-list', ['schedule-list']),
+        ('schedule-list-json', ['schedule-list', '--json']),
+        ('cluster-schedule-disable', ['cluster-schedule-disable', CLUSTERS, '--concurrency', '8']),
+        ('cluster-schedule-enable', ['cluster-schedule-enable', CLUSTERS, '--concurrency', '8']),
+        ('cluster-schedule-delete', ['cluster-schedule-delete', CLUSTERS, '--concurrency', '8']),
+        ('cluster-repair-pause', ['cluster-repair-pause', CLUSTERS, '--concurrency', '8']),
+        ('cluster-repair-resume', ['cluster-repair-resume', CLUSTERS, '--concurrency', '8']),
+        ('cluster-disable', ['cluster-disable', CLUSTERS, '--concurrency', '8']),
+        ('cluster-enable', ['cluster-enable', CLUSTERS, '--concurrency', '8']),
+    ]
+
+
+def start_server(args):
+    """Start fake_reaper.py in its own process and return it with its URL.
+
+    The fleet lives in another process, because a child forked from a process
+    holding it would report the parent's memory as its own peak RSS.
+    """
+    options = [f"--{o.replace('_', '-')}={getattr(args, o)}" for o in FLEET_OPTIONS]
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(__file__), 'fake_reaper.py'), '--port', '0', *options],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    line = server.stdout.readline()
+    if not line:
+        sys.exit(f"Fake Reaper exited with {server.wait()}")
+    return server, line.split()[-1]
+
+
+def control(url, path, method='GET'):
+    with urlopen(Request(f"{url}{path}", method=method)) as response:
+        body = response.read()
+    return json.loads(body) if body else None
+
+
+def run(argv, env):
+    """Run the CLI once and return its exit code, wall time in seconds and peak RSS in bytes"""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-c', 'from cassandra_reaper_cli import main; main()', *argv],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=env,
+    )
+    # wait4 gives the resource usage of this child alone, unlike getrusage(RUSAGE_CHILDREN)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+    return process.returncode, elapsed, rss
+
+
+def benchmark(url, name, argv, runs, env):
+    times = []
+    rss = []
+    for _ in range(runs):
+        control(url, '_reset', 'POST')
+        code, elapsed, peak = run(argv, env)
+        times.append(elapsed)
+        rss.append(peak)
+    stats = control(url, '_stats')
+    return {
+        'name': name,
+        'command': ' '.join(argv),
+        'exit_code': code,
+        'wall_time': statistics.median(times),
+        'wall_time_min': min(times),
+        'requests': stats['requests'],
+        'bytes': stats['bytes'],
+        'errors': stats['errors'],
+        'peak_rss': max(rss),
+        'endpoints': stats['endpoints'],
+    }
+
+
+def regressions(results, baseline, tolerance):
+    previous = {b['name']: b for b in baseline['results']}
+    found = []
+    for result in results:
+        before = previous.get(result['name'])
+        if before is None:
+            continue
+        if result['requests'] > before['requests']:
+            found.append(f"{result['name']}: requests {before['requests']} -> {result['requests']}")
+        for key in ('wall_time', 'peak_rss'):
+            if result[key] > before[key] * tolerance:
+                found.append(f"{result['name']}: {key} {before[key]:.6g} -> {result[key]:.6g}")
+    return found
+
+
+def print_results(results):
+    print(f"{'SCENARIO':30} {'EXIT':>4} {'WALL_MS':>9} {'REQUESTS':>8} {'ERRORS':>6} {'KBYTES':>9} {'PEAK_RSS_MB':>11}")
+    for r in results:
+        print(
+            f"{r['name']:30} {r['exit_code']:>4} {r['wall_time'] * 1000:>9.1f} {r['requests']:>8} {r['errors']:>6} "
+            f"{r['bytes'] / 1024:>9.0f} {r['peak_rss'] / 2 ** 20:>11.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    fleet_arguments(parser)
+    parser.add_argument('--runs', type=int, default=3, help='Runs of every scenario, median is reported (default 3)')
+    parser.add_argument(
+        '--scenario', '-k', action='append', help='Run only scenarios matching this glob pattern, can be repeated'
+    )
+    parser.add_argument('--list', action='store_true', help='List scenarios and exit')
+    parser.add_argument('--output', '-o', help='Save results as JSON to this file')
+    parser.add_argument('--baseline', '-b', help='Compare with results saved by --output and exit 1 on regressions')
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=1.25,
+        help='Allowed wall time and peak RSS ratio to the baseline (default 1.25)',
+    )
+    args = parser.parse_args()
+
+    server, url = start_server(args)
+    try:
+        fleet = control(url, '_fleet')
+        selected = [
+            (name, argv)
+            for name, argv in scenarios(fleet)
+            if not args.scenario or any(fnmatchcase(name, p) for p in args.scenario)
+        ]
+        if args.list:
+            for name, argv in selected:
+                print(f"{name:30} reaper {' '.join(argv)}")
+            return
+        with tempfile.TemporaryDirectory() as cache:
+            env = dict(os.environ, REAPER_URL=url, REAPER_USER='bench', REAPER_PASSWORD='bench', XDG_CACHE_HOME=cache)
+            results = [benchmark(url, name, argv, args.runs, env) for name, argv in selected]
+    finally:
+        server.terminate()
+        server.wait()
+    print_results(results)
+
+    report = {'options': {o: getattr(args, o) for o in FLEET_OPTIONS}, 'fleet': fleet, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,473 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+"""Local stand-in for the Reaper REST API, seeded with a synthetic fleet.
+
+Implements the endpoints used by cassandra-reaper-api with deterministic data
+(same seed, same fleet), optional per-request latency and injected 503
+errors. Control endpoints that are not part of Reaper: GET /_fleet describes
+the fleet, GET /_stats returns request counters, POST /_reset restores the
+seeded fleet and zeroes the counters.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+REPAIR_STATES = ['DONE'] * 14 + ['ERROR', 'ABORTED', 'RUNNING', 'RUNNING', 'PAUSED', 'NOT_STARTED']
+TOKEN_MIN = -(2**63)
+TOKEN_SPAN = 2**64
+HOUR = 3600 * 1000
+
+
+def repair_id(n):
+    return f"00000000-0000-4000-8000-{n:012x}"
+
+
+def schedule_id(n):
+    return f"00000000-0000-4000-9000-{n:012x}"
+
+
+def timestamp(millis):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(millis / 1000))
+
+
+class Fleet:
+    """Synthetic clusters, schedules, repairs and segments.
+
+    Repairs are spread over clusters round robin and `segments` over repairs
+    evenly, except for the first RUNNING repair (`large_repair`) which gets
+    `large_repair_segments` of its own. Segments are generated on request,
+    so a fleet with hundreds of thousands of them costs no memory up front.
+    """
+
+    def __init__(
+        self, clusters=50, repairs=10000, segments=200000, large_repair_segments=50000, keyspaces=10, hosts=12, seed=1
+    ):
+        self.seed = seed
+        self.now = int(time.time() * 1000)
+        self.hosts = [f"10.0.{n // 250}.{n % 250 + 1}" for n in range(hosts)]
+        self.clusters = [f"cluster-{n:03d}" for n in range(clusters)]
+        self.tables = {f"ks{k}": [f"table{t}" for t in range(5)] for k in range(keyspaces)}
+        rnd = random.Random(seed)
+
+        self.schedules = {}
+        for n in range(clusters * keyspaces):
+            sid = schedule_id(n)
+            self.schedules[sid] = {
+                'id': sid,
+                'cluster_name': self.clusters[n % clusters],
+                'keyspace_name': f"ks{n // clusters}",
+                'owner': 'reaper',
+                'state': 'ACTIVE' if rnd.random() < 0.8 else 'PAUSED',
+                'intensity': 0.9,
+                'scheduled_days_between': 7,
+                'next_activation': timestamp(self.now + rnd.randrange(7 * 24) * HOUR),
+                'repair_parallelism': 'DATACENTER_AWARE',
+                'segment_count_per_node': 64,
+                'percent_unrepaired_threshold': -1,
+                'adaptive': False,
+                'incremental_repair': False,
+                'repair_thread_count': 1,
+                'nodes': [],
+                'datacenters': [],
+                'column_families': [],
+                'blacklisted_tables': [],
+            }
+
+        self.repairs = {}
+        self.segment_counts = {}
+        self.large_repair = None
+        per_repair = segments // repairs if repairs else 0
+        for n in range(repairs):
+            rid = repair_id(n)
+            state = rnd.choice(REPAIR_STATES)
+            created = self.now - (repairs - n) * HOUR // 4
+            count = per_repair
+            if state == 'RUNNING' and self.large_repair is None:
+                self.large_repair = rid
+                count = large_repair_segments
+            self.segment_counts[rid] = count
+            repaired = count if state == 'DONE' else count // 2
+            self.repairs[rid] = {
+                'id': rid,
+                'cluster_name': self.clusters[n % clusters],
+                'keyspace_name': f"ks{n % keyspaces}",
+                'owner': 'reaper',
+                'cause': 'scheduled run',
+                'state': state,
+                'intensity': 0.9,
+                'repair_parallelism': 'DATACENTER_AWARE',
+                'creation_time': timestamp(created),
+                'start_time': timestamp(created + 1000),
+                'end_time': timestamp(created + 2 * HOUR) if state in ('DONE', 'ERROR', 'ABORTED') else None,
+                'pause_time': timestamp(created + HOUR) if state == 'PAUSED' else None,
+                'estimated_time_of_arrival': None,
+                'last_event': 'Triggered repair of segment',
+                'segments_repaired': repaired,
+                'total_segments': count,
+                'column_families': [],
+            }
+
+    def segments(self, rid):
+        repair = self.repairs[rid]
+        count = self.segment_counts[rid]
+        rnd = random.Random(f"{self.seed}-{rid}")
+        step = TOKEN_SPAN // count if count else 0
+        started = self.now - 2 * HOUR
+        for n in range(count):
+            start = TOKEN_MIN + n * step
+            end = TOKEN_MIN + (n + 1) * step if n < count - 1 else TOKEN_MIN
+            if n < repair['segments_repaired']:
+                state = 'DONE'
+            elif n < repair['segments_repaired'] + 3 and repair['state'] == 'RUNNING':
+                state = 'RUNNING'
+            else:
+                state = 'NOT_STARTED'
+            start_time = started + n * 7200 * 1000 // max(count, 1) if state != 'NOT_STARTED' else None
+            replicas = rnd.sample(self.hosts, min(3, len(self.hosts)))
+            yield {
+                'id': f"{rid[:-12]}{n:012x}",
+                'runId': rid,
+                'state': state,
+                'failCount': 0 if rnd.random() < 0.9 else rnd.randint(1, 3),
+                'startTime': start_time,
+                'endTime': start_time + rnd.randint(30, 600) * 1000 if state == 'DONE' else None,
+                'replicas': {host: 'dc1' for host in replicas},
+                'coordinatorHost': replicas[0],
+                'tokenRange': {
+                    'baseRange': {'start': str(start), 'end': str(end)},
+                    'tokenRanges': [{'start': str(start), 'end': str(end)}],
+                },
+            }
+
+
+class FakeReaper(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fleet_args=None, latency=0.0, error_rate=0.0, seed=1):
+        super().__init__(address, Handler)
+        self.fleet_args = fleet_args or {}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/"
+
+    def reset(self):
+        with self.lock:
+            self.fleet = Fleet(**self.fleet_args)
+            self.requests = Counter()
+            self.bytes_sent = 0
+            self.errors = 0
+
+    def describe(self):
+        with self.lock:
+            return {
+                'clusters': len(self.fleet.clusters),
+                'schedules': len(self.fleet.schedules),
+                'repairs': len(self.fleet.repairs),
+                'segments': sum(self.fleet.segment_counts.values()),
+                'large_repair': self.fleet.large_repair,
+            }
+
+    def stats(self):
+        with self.lock:
+            return {
+                'requests': sum(self.requests.values()),
+                'bytes': self.bytes_sent,
+                'errors': self.errors,
+                'endpoints': {' '.join(k): v for k, v in sorted(self.requests.items())},
+            }
+
+
+ROUTES = [
+    ('POST', r'login', 'login'),
+    ('GET', r'jwt', 'jwt'),
+    ('GET', r'cluster', 'clusters'),
+    ('GET', r'cluster/([^/]+)/tables', 'tables'),
+    ('GET', r'repair_run', 'repairs'),
+    ('GET', r'repair_run/([^/]+)', 'repair'),
+    ('DELETE', r'repair_run/([^/]+)', 'repair_delete'),
+    ('PUT', r'repair_run/([^/]+)/state/([A-Z]+)', 'repair_state'),
+    ('PUT', r'repair_run/([^/]+)/intensity/([0-9.]+)', 'repair_intensity'),
+    ('GET', r'repair_run/([^/]+)/segments', 'segments'),
+    ('POST', r'repair_run/([^/]+)/segments/abort/([^/]+)', 'segment_abort'),
+    ('GET', r'repair_schedule', 'schedules'),
+    ('POST', r'repair_schedule', 'schedule_add'),
+    ('GET', r'repair_schedule/cluster/([^/]+)', 'cluster_schedules'),
+    ('POST', r'repair_schedule/start/([^/]+)', 'schedule_start'),
+    ('GET', r'repair_schedule/([^/]+)', 'schedule'),
+    ('PUT', r'repair_schedule/([^/]+)', 'schedule_state'),
+    ('PATCH', r'repair_schedule/([^/]+)', 'schedule_update'),
+    ('DELETE', r'repair_schedule/([^/]+)', 'schedule_delete'),
+]
+ROUTES = [(method, re.compile(pattern), name) for method, pattern, name in ROUTES]
+
+
+def find_route(method, path):
+    """Name, pattern and match of the route of a request, None when no route matches"""
+    for route_method, pattern, name in ROUTES:
+        match = pattern.fullmatch(path)
+        if route_method == method and match:
+            return name, pattern, match
+    return None
+
+
+class NotFound(Exception):
+    pass
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def do_PUT(self):
+        self.handle_request('PUT')
+
+    def do_PATCH(self):
+        self.handle_request('PATCH')
+
+    def do_DELETE(self):
+        self.handle_request('DELETE')
+
+    def handle_request(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        url = urlparse(self.path)
+        path = url.path.strip('/')
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        server = self.server
+
+        if path == '_fleet':
+            return self.send(200, server.describe())
+        if path == '_stats':
+            return self.send(200, server.stats())
+        if path == '_reset':
+            server.reset()
+            return self.send(204)
+
+        route = find_route(method, path)
+        if route is None:
+            return self.send(404, f"No route for {method} /{path}")
+        name, pattern, match = route
+
+        with server.lock:
+            server.requests[method, pattern.pattern] += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if name not in ('login', 'jwt') and server.error_rate and server.random.random() < server.error_rate:
+            with server.lock:
+                server.errors += 1
+            return self.send(503, 'Injected error')
+        try:
+            with server.lock:
+                code, data = getattr(self, f"route_{name}")(server.fleet, query, body, *match.groups())
+        except NotFound as e:
+            return self.send(404, f"{e} not found")
+        self.send(code, data)
+
+    def send(self, code, data=None):
+        if data is None:
+            payload = b''
+        elif isinstance(data, str):
+            payload = data.encode()
+        elif isinstance(data, (list, dict)):
+            payload = json.dumps(data).encode()
+        else:
+            # Generator of dicts, serialized piece by piece to keep large segment lists cheap
+            payload = ('[' + ','.join(json.dumps(i) for i in data) + ']').encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        with self.server.lock:
+            self.server.bytes_sent += len(payload)
+
+    @staticmethod
+    def lookup(items, key):
+        if key not in items:
+            raise NotFound(key)
+        return items[key]
+
+    def route_login(self, fleet, query, body):
+        return 200, ''
+
+    def route_jwt(self, fleet, query, body):
+        return 200, 'fake-token'
+
+    def route_clusters(self, fleet, query, body):
+        return 200, fleet.clusters
+
+    def route_tables(self, fleet, query, body, cluster):
+        if cluster not in fleet.clusters:
+            raise NotFound(cluster)
+        return 200, fleet.tables
+
+    def route_repairs(self, fleet, query, body):
+        cluster = query.get('cluster_name')
+        states = query['state'].split(',') if query.get('state') else None
+        return 200, [
+            r
+            for r in fleet.repairs.values()
+            if (not cluster or r['cluster_name'] == cluster) and (not states or r['state'] in states)
+        ]
+
+    def route_repair(self, fleet, query, body, rid):
+        return 200, self.lookup(fleet.repairs, rid)
+
+    def route_repair_delete(self, fleet, query, body, rid):
+        self.lookup(fleet.repairs, rid)
+        del fleet.repairs[rid]
+        return 202, None
+
+    def route_repair_state(self, fleet, query, body, rid, state):
+        repair = self.lookup(fleet.repairs, rid)
+        repair['state'] = state
+        return 200, repair
+
+    def route_repair_intensity(self, fleet, query, body, rid, intensity):
+        repair = self.lookup(fleet.repairs, rid)
+        repair['intensity'] = float(intensity)
+        return 200, repair
+
+    def route_segments(self, fleet, query, body, rid):
+        self.lookup(fleet.repairs, rid)
+        return 200, list(fleet.segments(rid))
+
+    def route_segment_abort(self, fleet, query, body, rid, segment_id):
+        self.lookup(fleet.repairs, rid)
+        return 200, None
+
+    def route_schedules(self, fleet, query, body):
+        cluster = query.get('clusterName')
+        keyspace = query.get('keyspace')
+        return 200, [
+            s
+            for s in fleet.schedules.values()
+            if (not cluster or s['cluster_name'] == cluster) and (not keyspace or s['keyspace_name'] == keyspace)
+        ]
+
+    def route_schedule_add(self, fleet, query, body):
+        sid = schedule_id(len(fleet.schedules) + 10**6)
+        fleet.schedules[sid] = {
+            'id': sid,
+            'cluster_name': query['clusterName'],
+            'keyspace_name': query['keyspace'],
+            'owner': query['owner'],
+            'state': 'ACTIVE',
+            'intensity': float(query.get('intensity', 0.9)),
+            'scheduled_days_between': int(query['scheduleDaysBetween']),
+            'next_activation': query['scheduleTriggerTime'],
+            'repair_parallelism': query.get('repairParallelism', 'DATACENTER_AWARE'),
+            'segment_count_per_node': int(query.get('segmentCountPerNode', 64)),
+            'percent_unrepaired_threshold': int(query.get('percentUnrepairedThreshold', -1)),
+            'adaptive': query.get('adaptive') == 'True',
+            'incremental_repair': query.get('incrementalRepair') == 'True',
+            'repair_thread_count': int(query.get('repairThreadCount', 1)),
+            'nodes': [],
+            'datacenters': [],
+            'column_families': [],
+            'blacklisted_tables': [],
+        }
+        return 201, None
+
+    def route_cluster_schedules(self, fleet, query, body, cluster):
+        return 200, [s for s in fleet.schedules.values() if s['cluster_name'] == cluster]
+
+    def route_schedule_start(self, fleet, query, body, sid):
+        self.lookup(fleet.schedules, sid)
+        return 200, None
+
+    def route_schedule(self, fleet, query, body, sid):
+        return 200, self.lookup(fleet.schedules, sid)
+
+    def route_schedule_state(self, fleet, query, body, sid):
+        schedule = self.lookup(fleet.schedules, sid)
+        schedule['state'] = query['state']
+        return 200, schedule
+
+    def route_schedule_update(self, fleet, query, body, sid):
+        schedule = self.lookup(fleet.schedules, sid)
+        schedule.update(json.loads(body))
+        return 200, schedule
+
+    def route_schedule_delete(self, fleet, query, body, sid):
+        self.lookup(fleet.schedules, sid)
+        del fleet.schedules[sid]
+        return 202, None
+
+
+FLEET_OPTIONS = [
+    'clusters',
+    'repairs',
+    'segments',
+    'large_repair_segments',
+    'keyspaces',
+    'latency',
+    'error_rate',
+    'seed',
+]
+
+
+def fleet_arguments(parser):
+    """Fleet size and fault injection options, bench.py passes them through"""
+    parser.add_argument('--clusters', type=int, default=50, help='Number of clusters (default 50)')
+    parser.add_argument('--repairs', type=int, default=10000, help='Number of repair runs (default 10000)')
+    parser.add_argument(
+        '--segments', type=int, default=200000, help='Segments spread evenly over repair runs (default 200000)'
+    )
+    parser.add_argument(
+        '--large-repair-segments', type=int, default=50000, help='Segments of the first RUNNING repair (default 50000)'
+    )
+    parser.add_argument(
+        '--keyspaces', type=int, default=10, help='Keyspaces per cluster, each has one schedule (default 10)'
+    )
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every request (default 0)')
+    parser.add_argument(
+        '--error-rate', type=float, default=0.0, help='Fraction of API requests failing with 503 (default 0)'
+    )
+    parser.add_argument('--seed', type=int, default=1, help='Random seed of the fleet (default 1)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8080, help='Listen port (default 8080)')
+    fleet_arguments(parser)
+    args = parser.parse_args()
+    fleet_args = {o: getattr(args, o) for o in FLEET_OPTIONS if o not in ('latency', 'error_rate')}
+    server = FakeReaper(('127.0.0.1', args.port), fleet_args, args.latency, args.error_rate, args.seed)
+    fleet = server.describe()
+    # bench.py reads the URL from the last word of this line
+    print(
+        f"Serving {fleet['clusters']} clusters, {fleet['schedules']} schedules, {fleet['repairs']} repairs "
+        f"and {fleet['segments']} segments on {server.url}",
+        flush=True,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+"""Startup time of the reaper CLI for invocations that don't call Reaper.
+
+Every invocation runs in a fresh interpreter, like cron jobs and completion
+hooks do, and the median wall time of --runs is reported together with the
+cumulative import time of the cassandra_reaper_cli package.
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+INVOCATIONS = [
+    ['-h'],
+    ['schedule-list', '-h'],
+    ['cluster-disable', '-h'],
+    ['completion-print', 'bash'],
+]
+
+
+def run(argv):
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, '-c', 'from cassandra_reaper_cli import main; main()', *argv],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=False,
+    )
+    return time.perf_counter() - start
+
+
+def import_time():
+    """Cumulative import time of the package in microseconds, from -X importtime"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import cassandra_reaper_cli'],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    match = re.search(r'\|\s*(\d+) \| cassandra_reaper_cli$', result.stderr, re.M)
+    return int(match.group(1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20, help='Runs of every invocation (default 20)')
+    args = parser.parse_args()
+
+    imports = [import_time() for _ in range(args.runs)]
+    print(f"{'import cassandra_reaper_cli':40}{statistics.median(imports) / 1000:>10.1f} ms")
+    for argv in INVOCATIONS:
+        times = [run(argv) for _ in range(args.runs)]
+        print(f"{'reaper ' + ' '.join(argv):40}{statistics.median(times) * 1000:>10.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,21 +2,113 @@
 #
 # SPDX-License-Identifier: MIT
 import argparse
+import contextlib
 import json
 import logging
 import os
+import re
 import sys
-from datetime import datetime, timedelta
-import shtab
-from cassandra_reaper_api import CassandraReaper
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from fnmatch import fnmatchcase
+from urllib.parse import urljoin
+from cassandra_reaper_cli.batch import ContextThreadPoolExecutor, read_commands, run_batch
+from cassandra_reaper_cli.bulk import Backoff, BulkResult, RateLimiter, http_status, is_transient, retry, run_bulk
+from cassandra_reaper_cli.cache import ACTIVE_REPAIR_STATES, MetadataCache
+from cassandra_reaper_cli.history import QUERIES, TERMINAL_STATES, History, history_path, since_timestamp
+from cassandra_reaper_cli.index import SegmentIndex
+from cassandra_reaper_cli.stats import PERCENTILES, repair_progress, segment_stats, stuck_segments
+from cassandra_reaper_cli.output import FORMATS, output_format, write_csv, write_items, write_lines, write_ndjson
+from cassandra_reaper_cli.planner import apply_move, estimate_durations, plan_cluster
+from cassandra_reaper_cli.query import Filter, field_list, parse_duration, project, pushed_down, select, sort_keys
+from cassandra_reaper_cli.reconcile import apply_change, describe_change, load_desired, plan
+from cassandra_reaper_cli.snapshot import load_snapshot, save_snapshot, snapshot_path
+from cassandra_reaper_cli.timings import Timings
+from cassandra_reaper_cli.watch import watch
 
 log = logging.getLogger('cassandra-reaper-cli')
 log_stream_handler = logging.StreamHandler()
 log.addHandler(log_stream_handler)
 log.setLevel(logging.INFO)
 
+# Parallel read-only fetches, matches the default connection pool size of requests
+PARALLEL_FETCHES = 10
+
 
 def main():
+    # CPU time of the process so far is interpreter startup and imports
+    startup = time.process_time()
+    started = time.perf_counter()
+    command = invoked_command(sys.argv[1:])
+    parser = build_parser(command)
+    args = parser.parse_args()
+    args.timings = Timings() if args.profile or args.profile_output else None
+    if args.timings:
+        args.timings.add_phase('startup', startup)
+        args.timings.add_phase('parse', time.perf_counter() - started)
+    if args.command == 'completion-print':
+        # Completion needs the whole tree, the only case when every subparser is filled
+        import shtab
+        from cassandra_reaper_cli.completion import PREAMBLE, add_completions
+        parser = build_parser()
+        add_completions(parser)
+        print(shtab.complete(parser, shell=args.shell, preamble=PREAMBLE))
+        exit(0)
+    if not hasattr(args, 'func'):
+        exit(parser.print_help())
+    missing = missing_options(args)
+    if missing:
+        names = ', '.join(missing[:-1]) + ' and ' + missing[-1] if len(missing) > 1 else missing[0]
+        parser.error(f"{names} must be set, as an option or in the environment")
+    exit_code = 1
+    started = time.perf_counter()
+    try:
+        exit_code = 1 if args.func(LazyReaper(args), args) else 0
+    except BrokenPipeError:
+        # Reader of streamed output (e.g. head) has exited, don't print a traceback on flush
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except SystemExit as e:
+        exit_code = e.code
+    finally:
+        if args.timings:
+            report_timings(args, time.perf_counter() - started, exit_status(exit_code))
+    exit(exit_code)
+
+
+def exit_status(code):
+    """ Process exit status of a SystemExit code, which may also be None or an error message"""
+    return 0 if code is None else code if isinstance(code, int) else 1
+
+
+def missing_options(args):
+    """ Global options the invocation needs but lacks, credentials are needed only to call Reaper"""
+    if args.command in LOCAL_COMMANDS:
+        names = LOCAL_COMMANDS[args.command]
+        return [] if any(getattr(args, name) for name in names) else [' or '.join(f"--{name}" for name in names)]
+    # --cached reads the cache of the URL, LazyReaper asks for credentials if it has to call Reaper after all
+    needed = ('url',) if getattr(args, 'cached', False) else ('url', 'username', 'password')
+    return [f"--{name}" for name in needed if not getattr(args, name)]
+
+
+def report_timings(args, seconds, exit_code):
+    args.timings.add_phase('command', seconds)
+    if args.profile:
+        args.timings.print_report()
+    if args.profile_output:
+        try:
+            args.timings.save(args.profile_output, args.command, exit_code)
+        except OSError as e:
+            log.error(f"Can't write profile to {args.profile_output}: {e}")
+
+
+def invoked_command(argv):
+    return next((a for a in argv if a in COMMANDS), None)
+
+
+def build_parser(command=None):
+    """ Argument parser with arguments of `command` only, or of all commands when it's not set"""
     parser = argparse.ArgumentParser(description='Cassandra Reaper CLI')
     parser.add_argument('--url', action='store',
                         default=os.environ.get('REAPER_URL'), help='Reaper URL (default value from env REAPER_URL)')
@@ -26,221 +118,25 @@ def main():
                         default=os.environ.get('REAPER_PASSWORD'), help='Reaper password (default value from env REAPER_PASSWORD)')
     parser.add_argument('--disable-ssl-verify',
                         action='store_true', help='Disable SSL verification')
-
-    subparsers = parser.add_subparsers(help='Supported commands')
-
-    parser_schedule_list = subparsers.add_parser(
-        'schedule-list', help='Repair Schedule list')
-    parser_schedule_list.add_argument(
-        'cluster', action='store', help='Cluster name', nargs='?', default='ALL')
-    parser_schedule_list.add_argument('--show-id', '-i',
-                                      action='store_true', help='Show Repair Schedule IDs')
-    parser_schedule_list.add_argument('--json', '-j',
-                                      action='store_true', help='Print in json format')
-    parser_schedule_list.set_defaults(func=schedule_list)
-
-    parser_schedule_info = subparsers.add_parser(
-        'schedule-info', help='Information about Schedule by ID')
-    parser_schedule_info.add_argument('id', action='store', help='Schedule ID')
-    parser_schedule_info.set_defaults(func=schedule_info)
-
-    parser_schedule_disable = subparsers.add_parser(
-        'schedule-disable', help='Disable Repair Schedule by ID')
-    parser_schedule_disable.add_argument(
-        'id', action='store', help='Schedule ID')
-    parser_schedule_disable.set_defaults(func=schedule_disable)
-
-    parser_schedule_enable = subparsers.add_parser(
-        'schedule-enable', help='Enable Repair Schedule by ID')
-    parser_schedule_enable.add_argument(
-        'id', action='store', help='Schedule ID')
-    parser_schedule_enable.set_defaults(func=schedule_enable)
-
-    parser_schedule_start = subparsers.add_parser(
-        'schedule-start', help='Start Repair Schedule by ID')
-    parser_schedule_start.add_argument(
-        'id', action='store', help='Schedule ID')
-    parser_schedule_start.set_defaults(func=schedule_start)
-
-    parser_schedule_delete = subparsers.add_parser(
-        'schedule-delete', help='Delete Repair Schedule by ID')
-    parser_schedule_delete.add_argument(
-        'id', action='store', help='Schedule ID')
-    parser_schedule_delete.set_defaults(func=schedule_delete)
-
-    parser_repair_list = subparsers.add_parser(
-        'repair-list', help='Repairs list')
-    parser_repair_list.add_argument('cluster', action='store',
-                                    help='Cluster name', nargs='?', default='ALL')
-    parser_repair_list.add_argument(
-        '--states', choices=['RUNNING', 'PAUSED', 'NOT_STARTED', 'DONE', 'ERROR', 'ABORTED', 'DELETED', 'ALL'], nargs='+', help='Repair states (Default RUNNING, PAUSED and NOT_STARTED)', default=['RUNNING', 'PAUSED', 'NOT_STARTED'])
-    parser_repair_list.add_argument('--show-id', '-i',
-                                    action='store_true', help='Show repair IDs')
-    parser_repair_list.add_argument('--json', '-j',
-                                    action='store_true', help='Print in json format')
-    parser_repair_list.set_defaults(func=repair_list)
-
-    parser_repair_info = subparsers.add_parser(
-        'repair-info', help='Information about Reapair by ID')
-    parser_repair_info.add_argument('id', action='store', help='Repair ID')
-    parser_repair_info.set_defaults(func=repair_info)
-
-    parser_repair_pause = subparsers.add_parser(
-        'repair-pause', help='Pause running repair by ID')
-    parser_repair_pause.add_argument('id', action='store', help='Repair ID')
-    parser_repair_pause.set_defaults(func=repair_pause)
-
-    parser_repair_abort = subparsers.add_parser(
-        'repair-abort', help='Abort repair by ID')
-    parser_repair_abort.add_argument('id', action='store', help='Repair ID')
-    parser_repair_abort.set_defaults(func=repair_abort)
-
-    parser_repair_delete = subparsers.add_parser(
-        'repair-delete', help='Delete repair by ID')
-    parser_repair_delete.add_argument('id', action='store', help='Repair ID')
-    parser_repair_delete.set_defaults(func=repair_delete)
-
-    parser_repair_resume = subparsers.add_parser(
-        'repair-resume', help='Resume paused repair by ID')
-    parser_repair_resume.add_argument('id', action='store', help='Repair ID')
-    parser_repair_resume.set_defaults(func=repair_resume)
-
-    parser_repair_intensity_change = subparsers.add_parser(
-        'repair-intensity-change', help='Change PAUSED repair intensity')
-    parser_repair_intensity_change.add_argument(
-        'id', action='store', help='Repair ID')
-    parser_repair_intensity_change.add_argument(
-        'intensity', action='store', type=repair_intensity, help='Intensity (from 0.0 to 1.0)')
-    parser_repair_intensity_change.set_defaults(func=repair_intensity_change)
-
-    parser_repair_segments_list = subparsers.add_parser(
-        'repair-segment-list', help='List repair segments by ID')
-    parser_repair_segments_list.add_argument(
-        'id', action='store', help='Repair ID')
-    parser_repair_segments_list.add_argument('--show-id', '-i',
-                                             action='store_true', help='Show Segment IDs')
-    parser_repair_segments_list.add_argument('--show-token-ranges', '-t',
-                                             action='store_true', help='Show Segment Token Ranges')
-    parser_repair_segments_list.add_argument('--json', '-j',
-                                             action='store_true', help='Print in json format')
-    parser_repair_segments_list.set_defaults(func=repair_segments_list)
-
-    parser_repair_segment_abort = subparsers.add_parser(
-        'repair-segment-abort', help='Aborts a running segment and puts it back in NOT_STARTED state. The segment will be processed again later during the lifetime of the repair run')
-    parser_repair_segment_abort.add_argument(
-        'id', action='store', help='Repair ID')
-    parser_repair_segment_abort.add_argument(
-        'segment_id', action='store', help='Segment ID')
-    parser_repair_segment_abort.set_defaults(func=repair_segment_abort)
-
-    parser_cluster_list = subparsers.add_parser(
-        'cluster-list', help='Clusters list')
-    parser_cluster_list.add_argument('--json', '-j',
-                                     action='store_true', help='Print in json format')
-    parser_cluster_list.set_defaults(func=cluster_list)
-
-    parser_cluster_table_list = subparsers.add_parser(
-        'cluster-table-list', help='Tables list of a Cluster (keyspace)')
-    parser_cluster_table_list.add_argument(
-        'cluster', action='store', help='Cluster name')
-    parser_cluster_table_list.add_argument('keyspace', action='store',
-                                           nargs='?', help='Keyspace name')
-    parser_cluster_table_list.add_argument('--show-id', '-i',
-                                           action='store_true', help='Show Repair Schedule IDs')
-    parser_cluster_table_list.add_argument('--json', '-j',
-                                           action='store_true', help='Print in json format')
-    parser_cluster_table_list.set_defaults(func=cluster_tables_list)
-
-    parser_cluster_schedule_list = subparsers.add_parser(
-        'cluster-schedule-list', help='Repair Schedules list of a Cluster')
-    parser_cluster_schedule_list.add_argument(
-        'cluster', action='store', help='Cluster name')
-    parser_cluster_schedule_list.add_argument('--show-id', '-i',
-                                              action='store_true', help='Show Repair Schedule IDs')
-    parser_cluster_schedule_list.add_argument('--json', '-j',
-                                              action='store_true', help='Print in json format')
-    parser_cluster_schedule_list.set_defaults(func=schedule_list)
-
-    parser_cluster_schedule_enable = subparsers.add_parser(
-        'cluster-schedule-enable', help='Enable all repair schedules of a cluster')
-    parser_cluster_schedule_enable.add_argument(
-        'cluster', action='store', help='Cluster name')
-    parser_cluster_schedule_enable.set_defaults(func=cluster_schedules_enable)
-
-    parser_cluster_schedule_disable = subparsers.add_parser(
-        'cluster-schedule-disable', help='Disable all repair schedules of a cluster')
-    parser_cluster_schedule_disable.add_argument(
-        'cluster', action='store', help='Cluster name')
-    parser_cluster_schedule_disable.set_defaults(
-        func=cluster_schedules_disable)
-
-    parser_cluster_schedule_delete = subparsers.add_parser(
-        'cluster-schedule-delete', help='Disable and delete all repair schedules of a cluster')
-    parser_cluster_schedule_delete.add_argument(
-        'cluster', action='store', help='Cluster name')
-    parser_cluster_schedule_delete.set_defaults(
-        func=cluster_schedules_delete)
-
-    parser_cluster_repair_list = subparsers.add_parser(
-        'cluster-repair-list', help='Cluster Repairs list')
-    parser_cluster_repair_list.add_argument('cluster', action='store',
-                                            help='Cluster name', nargs='?', default='ALL')
-    parser_cluster_repair_list.add_argument(
-        '--states', choices=['RUNNING', 'PAUSED', 'NOT_STARTED', 'DONE', 'ERROR', 'ABORTED', 'DELETED', 'ALL'], nargs='+', help='Repair states (Default RUNNING, PAUSED and NOT_STARTED)', default=['RUNNING', 'PAUSED', 'NOT_STARTED'])
-    parser_cluster_repair_list.add_argument('--show-id', '-i',
-                                            action='store_true', help='Show repair IDs')
-    parser_cluster_repair_list.add_argument('--json', '-j',
-                                            action='store_true', help='Print in json format')
-    parser_cluster_repair_list.set_defaults(func=repair_list)
-
-    parser_cluster_repair_pause = subparsers.add_parser(
-        'cluster-repair-pause', help='Pause all running repairs of a cluster')
-    parser_cluster_repair_pause.add_argument(
-        'cluster', action='store', help='Cluster name')
-    parser_cluster_repair_pause.set_defaults(func=cluster_repairs_pause)
-
-    parser_cluster_repair_resume = subparsers.add_parser(
-        'cluster-repair-resume', help='Resume all paused repairs of a cluster')
-    parser_cluster_repair_resume.add_argument(
-        'cluster', action='store', help='Cluster name')
-    parser_cluster_repair_resume.set_defaults(func=cluster_repairs_resume)
-
-    parser_cluster_repair_abort = subparsers.add_parser(
-        'cluster-repair-abort', help='Abort all running and paused repairs of a cluster')
-    parser_cluster_repair_abort.add_argument(
-        'cluster', action='store', help='Cluster name')
-    parser_cluster_repair_abort.set_defaults(func=cluster_repairs_abort)
-
-    parser_cluster_repair_delete = subparsers.add_parser(
-        'cluster-repair-delete', help='Delete all repairs of a cluster')
-    parser_cluster_repair_delete.add_argument(
-        'cluster', action='store', help='Cluster name')
-    parser_cluster_repair_delete.set_defaults(func=cluster_repairs_delete)
-
-    parser_cluster_enable = subparsers.add_parser(
-        'cluster-enable', help='Enable all repair schedules and resume all paused repairs of a cluster')
-    parser_cluster_enable.add_argument(
-        'cluster', action='store', help='Cluster name')
-    parser_cluster_enable.set_defaults(func=cluster_enable)
-
-    parser_cluster_disable = subparsers.add_parser(
-        'cluster-disable', help='Disable all repair schedules and pause all running repairs of a cluster')
-    parser_cluster_disable.add_argument(
-        'cluster', action='store', help='Cluster name')
-    parser_cluster_disable.set_defaults(func=cluster_disable)
-
-    parser_print_completion = subparsers.add_parser(
-        'completion-print', help='Print completion for shell')
-    parser_print_completion.add_argument(
-        'shell', choices=('bash', 'zsh'), help='For which shell to print completion')
-
-    args = parser.parse_args()
-    if hasattr(args, 'shell'):
-        print(shtab.complete(parser, shell=args.shell))
-        exit(0)
-    if not all((args.url, args.username, args.password)) or not hasattr(args, 'func'):
-        exit(parser.print_help())
-    args.func(args)
+    parser.add_argument('--cache-ttl', action='store', type=positive_int,
+                        default=os.environ.get('REAPER_CACHE_TTL', '300'),
+                        help='Metadata cache TTL in seconds for --cached (default value from env REAPER_CACHE_TTL or 300)')
+    parser.add_argument('--profile', '--timings', action='store_true',
+                        help='Print time spent in CLI phases and per API endpoint calls, bytes and latencies to stderr')
+    parser.add_argument('--profile-output', action='store', metavar='FILE',
+                        help='Write the profile to FILE, in Prometheus text format if it ends with .prom, '
+                             'JSON otherwise')
+
+    subparsers = parser.add_subparsers(help='Supported commands', dest='command')
+    for name, (command_help, func, arguments, defaults) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=command_help)
+        if command is not None and name != command:
+            continue
+        for flags, kwargs in arguments:
+            subparser.add_argument(*flags, **kwargs)
+        if func:
+            subparser.set_defaults(func=globals()[func], **{k: globals()[v] for k, v in defaults.items()})
+    return parser
 
 
 def repair_intensity(arg):
@@ -256,18 +152,557 @@ def repair_intensity(arg):
 
 
 def positive_int(arg):
+    """ Type function for argparse - an int greater than 0, counts like --concurrency make no sense at 0"""
     iarg = int(arg)
-    if iarg >= 0:
-        return arg
+    if iarg > 0:
+        return iarg
     else:
         raise argparse.ArgumentTypeError(
             f"{arg} is an invalid positive int value")
 
 
-def cluster_list(args):
+def positive_float(arg):
+    farg = float(arg)
+    if farg > 0:
+        return farg
+    else:
+        raise argparse.ArgumentTypeError(
+            f"{arg} is an invalid positive float value")
+
+
+def duration(arg):
+    """ Type function for argparse - seconds of a duration like 90, 30m or 2h"""
+    try:
+        seconds = parse_duration(arg)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"{arg} is not a duration like 90, 30m or 2h") from e
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError(f"{arg} is not a positive duration")
+    return seconds
+
+
+def listen_address(arg):
+    """ Type function for argparse - [HOST]:PORT to (host, port)"""
+    host, _, port = arg.rpartition(':')
+    if not port.isdigit() or int(port) > 65535:
+        raise argparse.ArgumentTypeError(f"{arg} is not a [HOST]:PORT address")
+    return host.strip('[]'), int(port)
+
+
+def arg(*flags, **kwargs):
+    return flags, kwargs
+
+
+REPAIR_STATES = ['RUNNING', 'PAUSED', 'NOT_STARTED', 'DONE', 'ERROR', 'ABORTED', 'DELETED', 'ALL']
+
+JSON_ARG = arg('--json', '-j', action='store_true', help='Print in json format')
+WATCH_ARG = arg('--watch', '-w', action='store', nargs='?', type=positive_float, const=5.0, metavar='INTERVAL',
+                help='Refresh the table every INTERVAL seconds (default 5), faster while rows change. Always a table, '
+                     'so not with --json, --format or --fields')
+SCHEDULE_ID_ARG = arg('id', action='store', help='Schedule ID')
+REPAIR_ID_ARG = arg('id', action='store', help='Repair ID')
+NO_LOOKUP_ARG = arg('--no-lookup', action='store_true',
+                    help="Don't fetch the item first to check its state and log its cluster and keyspace")
+
+CACHED_ARGS = [
+    arg('--cached', action='store_true', help='Use local metadata cache if it is not older than --cache-ttl'),
+]
+BULK_ARGS = [
+    arg('--concurrency', action='store', type=positive_int, default=1,
+        help='Number of API calls to run in parallel (default 1)'),
+    arg('--max-rps', action='store', type=positive_float,
+        help='Maximum number of API calls per second (default unlimited)'),
+]
+CLUSTERS_ARGS = [
+    arg('cluster', action='store', nargs='?', help='Cluster name or glob pattern (e.g. "prod-eu-*")'),
+    arg('--cluster-regex', action='store', type=re.compile,
+        help='Regular expression to select clusters instead of cluster name'),
+    arg('--parallel-clusters', action='store', type=positive_int, default=4,
+        help='Number of clusters to process in parallel (default 4)'),
+    arg('--dry-run', '-n', action='store_true',
+        help='Only print the single-item commands that would be run, as input for the batch command'),
+] + BULK_ARGS
+FORMAT_ARG = arg('--format', '-f', choices=FORMATS, default='table',
+                 help='Output format, ndjson and csv are streamed row by row (default table)')
+
+# Argument groups shared by several commands (like argparse parent parsers)
+SEGMENT_OUTPUT_ARGS = [
+    arg('--show-id', '-i', action='store_true', help='Show Segment IDs'),
+    arg('--show-token-ranges', '-t', action='store_true', help='Show Segment Token Ranges'),
+    JSON_ARG,
+    FORMAT_ARG,
+]
+LIST_QUERY_ARGS = [
+    arg('--filter', '-F', action='append', type=Filter, metavar='EXPR',
+        help='Only items matching FIELD OP VALUE, can be repeated. OP is = or != (glob patterns, comma separated '
+             'alternatives), ~ or !~ (regex), <, >, <= or >=. cluster and keyspace stand for cluster_name and '
+             'keyspace_name, age is the time since creation (e.g. "keyspace~^audit", "state=ERROR,ABORTED", '
+             '"age>7d"). Equalities on cluster, keyspace and state are passed to Reaper where it supports them'),
+    arg('--fields', action='store', type=field_list, metavar='FIELDS',
+        help='Comma separated fields to print, e.g. id,cluster,state (default all in json and ndjson)'),
+    arg('--sort', action='store', type=sort_keys, metavar='FIELDS',
+        help='Comma separated fields to sort by, prefixed with - for descending order (e.g. --sort=-creation_time)'),
+    arg('--limit', action='store', type=positive_int, help='Print at most this many items, after sorting'),
+    FORMAT_ARG,
+]
+HISTORY_DB_ARG = arg('--db', action='store',
+                     help='History database file (default $XDG_DATA_HOME/cassandra-reaper-cli/<url>/history.sqlite)')
+DESIRED_STATE_ARGS = [
+    arg('--file', '-f', action='store', type=argparse.FileType('r'), required=True,
+        help='Desired state file, YAML (needs PyYAML) or JSON, with rules under `schedules`'),
+    arg('--show-id', '-i', action='store_true', help='Show Repair Schedule IDs'),
+]
+REPAIR_LIST_ARGS = [
+    arg('cluster', action='store', help='Cluster name or glob pattern', nargs='?', default='ALL'),
+    arg('--states', choices=REPAIR_STATES, nargs='+',
+        help='Repair states (Default RUNNING, PAUSED and NOT_STARTED, or states required by --filter)'),
+    arg('--show-id', '-i', action='store_true', help='Show repair IDs'),
+    JSON_ARG,
+    WATCH_ARG,
+    arg('--eta', action='store_true',
+        help='Add ETA projected from segment throughput of running repairs (one more API call per running repair)'),
+] + LIST_QUERY_ARGS + CACHED_ARGS
+
+
+def cluster_command(command_help, func, arguments=()):
+    return command_help, 'for_each_cluster', CLUSTERS_ARGS + list(arguments), {'cluster_func': func}
+
+
+# Command name: (help, handler name, arguments, other handler names to set as defaults).
+# Handlers are looked up by name, and subparsers get their arguments only when the
+# command is invoked, so a run doesn't build the whole parser tree.
+COMMANDS = {
+    'schedule-list': ('Repair Schedule list', 'schedule_list', [
+        arg('cluster', action='store', help='Cluster name or glob pattern', nargs='?', default='ALL'),
+        arg('--show-id', '-i', action='store_true', help='Show Repair Schedule IDs'),
+        JSON_ARG,
+    ] + LIST_QUERY_ARGS + CACHED_ARGS, {}),
+    'schedule-info': ('Information about Schedule by ID', 'schedule_info', [SCHEDULE_ID_ARG], {}),
+    'schedule-disable': ('Disable Repair Schedule by ID', 'schedule_disable', [SCHEDULE_ID_ARG, NO_LOOKUP_ARG], {}),
+    'schedule-enable': ('Enable Repair Schedule by ID', 'schedule_enable', [SCHEDULE_ID_ARG, NO_LOOKUP_ARG], {}),
+    'schedule-start': ('Start Repair Schedule by ID', 'schedule_start', [SCHEDULE_ID_ARG, NO_LOOKUP_ARG], {}),
+    'schedule-delete': ('Delete Repair Schedule by ID', 'schedule_delete', [SCHEDULE_ID_ARG], {}),
+    'schedules-plan': ('Show changes that would bring repair schedules to the desired state', 'schedules_plan',
+                       DESIRED_STATE_ARGS + [JSON_ARG], {}),
+    'schedules-apply': ('Bring repair schedules to the desired state, changing only what differs', 'schedules_apply',
+                        DESIRED_STATE_ARGS + BULK_ARGS, {}),
+    'schedule-plan': ('Find hours where schedules of a cluster repair at once and propose staggered activations',
+                      'schedule_plan', [
+        arg('cluster', action='store', help='Cluster name or glob pattern', nargs='?', default='ALL'),
+        arg('--horizon', action='store', type=duration, default=14 * 86400,
+            help='How far ahead to project schedule activations, e.g. 30d (default 14d)'),
+        arg('--bucket', action='store', type=duration, default=3600,
+            help='Time bucket load is counted in and activations are shifted by (default 1h)'),
+        arg('--max-concurrent', action='store', type=positive_int, default=1,
+            help='Repairs a cluster may run at once, more make a hot spot (default 1)'),
+        arg('--default-duration', action='store', type=duration, default=7200,
+            help='Repair duration of keyspaces without DONE repairs to estimate it from (default 2h)'),
+        arg('--show-id', '-i', action='store_true', help='Show Repair Schedule IDs'),
+        JSON_ARG,
+        arg('--apply', action='store_true',
+            help='Recreate moved schedules with the proposed next activation, same settings and owner'),
+    ] + BULK_ARGS, {}),
+    'repair-list': ('Repairs list', 'repair_list', REPAIR_LIST_ARGS, {}),
+    'repair-info': ('Information about Reapair by ID', 'repair_info', [REPAIR_ID_ARG], {}),
+    'repair-pause': ('Pause running repair by ID', 'repair_pause', [REPAIR_ID_ARG, NO_LOOKUP_ARG], {}),
+    'repair-abort': ('Abort repair by ID', 'repair_abort', [REPAIR_ID_ARG, NO_LOOKUP_ARG], {}),
+    'repair-delete': ('Delete repair by ID', 'repair_delete', [REPAIR_ID_ARG], {}),
+    'repair-resume': ('Resume paused repair by ID', 'repair_resume', [REPAIR_ID_ARG, NO_LOOKUP_ARG], {}),
+    'repair-intensity-change': ('Change PAUSED repair intensity', 'repair_intensity_change', [
+        REPAIR_ID_ARG,
+        arg('intensity', action='store', type=repair_intensity, help='Intensity (from 0.0 to 1.0)'),
+        NO_LOOKUP_ARG,
+    ], {}),
+    'repair-wait': ('Wait until repairs are in one of the given states, exit 3 on timeout and 4 when a repair ends '
+                    'in another state', 'repair_wait', [
+        arg('ids', action='store', nargs='*', metavar='id', help='Repair IDs'),
+        arg('--cluster', action='store',
+            help='Wait for repairs of this cluster (name or glob pattern) that are active when the wait starts'),
+        arg('--until', action='store', nargs='+', required=True, choices=REPAIR_STATES[:-1], metavar='STATE',
+            help=f"States to wait for ({', '.join(REPAIR_STATES[:-1])})"),
+        arg('--timeout', action='store', type=positive_float, help='Seconds to wait at most (default no limit)'),
+        arg('--interval', action='store', type=positive_float, default=2.0,
+            help='First poll interval in seconds, doubled up to --max-interval while nothing changes (default 2)'),
+        arg('--max-interval', action='store', type=positive_float, default=60.0,
+            help='Longest poll interval in seconds (default 60)'),
+    ], {}),
+    'repair-segment-list': ('List repair segments by ID', 'repair_segments_list', [
+        REPAIR_ID_ARG,
+    ] + SEGMENT_OUTPUT_ARGS + [
+        WATCH_ARG,
+        arg('--sort', choices=['start-time', 'token', 'none'], default='start-time',
+            help='Sort segments by start time, start token or keep API order (default start-time)'),
+    ], {}),
+    'repair-segment-find': ('Find repair segments by token, replica host and state, optionally abort them',
+                            'repair_segments_find', [
+        REPAIR_ID_ARG,
+        arg('--token', action='store', type=int, help='Token the segment covers'),
+        arg('--host', action='store', help='Replica host of the segment'),
+        arg('--state', action='store', choices=['NOT_STARTED', 'RUNNING', 'DONE', 'STARTED'], help='Segment state'),
+    ] + SEGMENT_OUTPUT_ARGS + [
+        arg('--abort', action='store_true', help='Abort found segments that are RUNNING'),
+    ] + BULK_ARGS, {}),
+    'repair-segment-abort': ('Aborts a running segment and puts it back in NOT_STARTED state. The segment will be processed again later during the lifetime of the repair run', 'repair_segment_abort', [
+        REPAIR_ID_ARG,
+        arg('segment_id', action='store', help='Segment ID'),
+    ], {}),
+    'repair-segment-reap': ('Abort RUNNING segments that run much longer than completed segments of their repair, '
+                            'or longer than --max-duration', 'repair_segments_reap', [
+        arg('id', action='store', nargs='?', help='Repair ID'),
+        arg('--cluster', action='store',
+            help='Reap segments of all RUNNING repairs of this cluster (name or glob pattern)'),
+        arg('--factor', action='store', type=positive_float, default=3.0,
+            help='Abort segments running longer than FACTOR times the --percentile duration of DONE segments '
+                 '(default 3)'),
+        arg('--percentile', action='store', type=positive_int, default=90, choices=range(1, 101), metavar='1-100',
+            help='Percentile of DONE segment durations the threshold is relative to (default 90)'),
+        arg('--min-done', action='store', type=positive_int, default=20,
+            help='DONE segments a repair needs before the relative threshold applies (default 20)'),
+        arg('--max-duration', action='store', type=duration,
+            help='Abort segments running longer than this in any case, e.g. 2h'),
+        arg('--loop', action='store', nargs='?', type=positive_float, const=300.0, metavar='INTERVAL',
+            help='Keep reaping every INTERVAL seconds (default 300) until interrupted'),
+        arg('--dry-run', '-n', action='store_true',
+            help='Only print the single-item commands that would be run, as input for the batch command'),
+    ] + BULK_ARGS, {}),
+    'repair-progress': ('Repair throughput and completion time projected from segment start and end times since the '
+                        'last pause or intensity change, assuming other repairs of the cluster keep running as they '
+                        'did', 'repair_progress_info', [
+        REPAIR_ID_ARG,
+        JSON_ARG,
+    ], {}),
+    'repair-segment-stats': ('Segment duration percentiles, state and fail count distribution and per replica host breakdown of a repair', 'repair_segment_stats', [
+        REPAIR_ID_ARG,
+        arg('--top', action='store', type=positive_int, default=10,
+            help='Number of hosts to show, ordered by slow segments (default 10)'),
+        JSON_ARG,
+    ], {}),
+    'cluster-list': ('Clusters list', 'cluster_list', [JSON_ARG] + CACHED_ARGS, {}),
+    'cluster-table-list': ('Tables list of a Cluster (keyspace)', 'cluster_tables_list', [
+        arg('cluster', action='store', help='Cluster name'),
+        arg('keyspace', action='store', nargs='?', help='Keyspace name'),
+        arg('--show-id', '-i', action='store_true', help='Show Repair Schedule IDs'),
+        JSON_ARG,
+    ] + CACHED_ARGS, {}),
+    'cluster-schedule-list': ('Repair Schedules list of a Cluster', 'schedule_list', [
+        arg('cluster', action='store', help='Cluster name or glob pattern'),
+        arg('--show-id', '-i', action='store_true', help='Show Repair Schedule IDs'),
+        JSON_ARG,
+    ] + LIST_QUERY_ARGS + CACHED_ARGS, {}),
+    'cluster-schedule-enable': cluster_command('Enable all repair schedules of a cluster', 'cluster_schedules_enable'),
+    'cluster-schedule-disable': cluster_command('Disable all repair schedules of a cluster', 'cluster_schedules_disable'),
+    'cluster-schedule-delete': cluster_command('Disable and delete all repair schedules of a cluster', 'cluster_schedules_delete'),
+    'cluster-repair-list': ('Cluster Repairs list', 'repair_list', REPAIR_LIST_ARGS, {}),
+    'cluster-repair-pause': cluster_command('Pause all running repairs of a cluster', 'cluster_repairs_pause'),
+    'cluster-repair-resume': cluster_command('Resume all paused repairs of a cluster', 'cluster_repairs_resume'),
+    'cluster-repair-abort': cluster_command('Abort all running and paused repairs of a cluster', 'cluster_repairs_abort'),
+    'cluster-repair-intensity-change': ('Pause, change intensity and resume all running repairs of a cluster',
+                                        'for_each_cluster', CLUSTERS_ARGS + [
+        arg('intensity', action='store', type=repair_intensity, help='Intensity (from 0.0 to 1.0)'),
+        arg('--retries', action='store', type=positive_int, default=3,
+            help='Attempts of every API call on connection errors and 5xx responses (default 3)'),
+    ], {'cluster_func': 'cluster_repairs_intensity_change'}),
+    'cluster-repair-delete': cluster_command('Delete all repairs of a cluster', 'cluster_repairs_delete'),
+    'cluster-enable': cluster_command('Enable all repair schedules and resume all paused repairs of a cluster',
+                                      'cluster_enable', [
+        arg('--from-snapshot', action='store_true',
+            help='Enable and resume only what cluster-disable --snapshot paused, then remove the snapshot'),
+    ]),
+    'cluster-disable': cluster_command('Disable all repair schedules and pause all running repairs of a cluster',
+                                       'cluster_disable', [
+        arg('--snapshot', action='store_true',
+            help='Save which schedules were ACTIVE and repairs RUNNING for cluster-enable --from-snapshot '
+                 '(in $XDG_STATE_HOME/cassandra-reaper-cli)'),
+    ]),
+    'cache-refresh': ('Refresh local metadata cache used by --cached and shell completion', 'cache_refresh', BULK_ARGS, {}),
+    'history-sync': ('Store repairs in DONE, ERROR and ABORTED states in the local history database, writing only '
+                     'new and changed ones', 'history_sync', [
+        arg('cluster', action='store', nargs='?', help='Cluster name or glob pattern (default all clusters)'),
+        HISTORY_DB_ARG,
+    ], {}),
+    'history-query': ('Query the local repair history database without calling Reaper', 'history_query', [
+        arg('query', action='store', nargs='?', choices=sorted(QUERIES),
+            help='; '.join(f"{name}: {description}" for name, (description, _) in sorted(QUERIES.items()))),
+        arg('--sql', action='store', help='Run this SQL on the read-only database instead, the table is `repairs`'),
+        arg('--cluster', action='store', help='Cluster name or glob pattern'),
+        arg('--keyspace', action='store', help='Keyspace name or glob pattern'),
+        arg('--since', action='store', type=since_timestamp,
+            help='Only repairs ending after this date (e.g. 2023-05-01) or duration ago (e.g. 30d)'),
+        arg('--limit', action='store', type=positive_int, default=20, help='Number of rows (default 20)'),
+        FORMAT_ARG,
+        HISTORY_DB_ARG,
+    ], {}),
+    'batch': ('Run commands read from a file or stdin (one per line, or NDJSON) over one Reaper session and print '
+              'NDJSON results', 'batch', [
+        arg('file', action='store', nargs='?', type=argparse.FileType('r'), default='-',
+            help='File with commands without the global options, e.g. "schedule-disable <id>" (default stdin)'),
+        arg('--parallel', '-p', action='store', type=positive_int, default=1,
+            help='Number of commands to run in parallel (default 1)'),
+        arg('--fail-fast', action='store_true', help='Skip remaining commands after the first failed one'),
+    ], {}),
+    'exporter': ('Serve repair progress as Prometheus metrics, polling Reaper in the background', 'exporter', [
+        arg('--listen', '-l', action='store', type=listen_address, default=':9686', metavar='[HOST]:PORT',
+            help='Address to serve /metrics on (default :9686)'),
+        arg('--interval', action='store', type=positive_float, default=60.0,
+            help='Seconds between polls of repairs and schedules (default 60)'),
+        arg('--segments-interval', action='store', type=positive_float, default=300.0,
+            help='Minimum seconds between segment fetches of a running repair (default 300)'),
+        arg('--states', choices=REPAIR_STATES, nargs='+', default=ACTIVE_REPAIR_STATES,
+            help='States of exported repairs (default RUNNING, PAUSED and NOT_STARTED)'),
+    ], {}),
+    'completion-print': ('Print completion for shell', None, [
+        arg('shell', choices=('bash', 'zsh'), help='For which shell to print completion'),
+    ], {}),
+}
+
+# Commands that never call Reaper: name -> options one of which locates their local data
+LOCAL_COMMANDS = {
+    'history-query': ('db', 'url'),
+}
+
+
+def reaper_session(r):
+    """ HTTP session of a Reaper client, the only place that relies on where the API client keeps it"""
+    import requests
+
+    # cassandra-reaper-api has no public accessor of its requests session, fail clearly if a new version moved it
+    session = getattr(r, '_CassandraReaper__s', None)
+    if not isinstance(session, requests.Session):
+        log.error(f"Unsupported cassandra-reaper-api version, {type(r).__name__} has no HTTP session to configure")
+        raise SystemExit(1)
+    return session
+
+
+def reaper_client(args):
+    """ One Reaper client (and HTTP session) shared by all API calls of an invocation"""
+    # The API client pulls in the whole requests stack, import it only when a command calls Reaper
+    from cassandra_reaper_api import CassandraReaper
+    from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+
     r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
+                        not args.disable_ssl_verify, login=False)
+    if getattr(args, 'timings', None):
+        args.timings.instrument(reaper_session(r))
+    # Size the keep-alive pool for the bulk worker pool, so parallel calls reuse connections
+    connections = getattr(args, 'concurrency', 1) * getattr(args, 'parallel_clusters', 1) * getattr(args, 'parallel', 1)
+    adapter = HTTPAdapter(pool_maxsize=max(DEFAULT_POOLSIZE, connections))
+    session = reaper_session(r)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    r.login()
+    return r
+
+
+class LazyReaper:
+    """ Proxy that logs in to Reaper on the first API call, so commands served from cache stay offline"""
+
+    def __init__(self, args):
+        self.args = args
+        self.client = None
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        with self.lock:
+            if self.client is None:
+                if not (self.args.username and self.args.password):
+                    # Commands with --cached get here without credentials when the cache is missing or expired
+                    log.error('--username and --password must be set to call Reaper, the local cache is not enough')
+                    raise SystemExit(1)
+                self.client = reaper_client(self.args)
+        return getattr(self.client, name)
+
+
+def bulk(args, items, action, describe, command):
+    """ Run `action` for every item, or with --dry-run print the equivalent single-item `command` instead"""
+    if args.dry_run:
+        for item in items:
+            log.info(f"{describe(item)} (dry run)")
+            print(command(item), flush=True)
+        return BulkResult()
+    return run_bulk(items, action, describe, args.concurrency, args.limiter)
+
+
+def needs_change(items, state, what):
+    """ Items not in `state` yet, the others would be no-op API calls"""
+    changed = [i for i in items if i['state'] != state]
+    if len(changed) < len(items):
+        log.info(f"{what}: {len(items) - len(changed)}/{len(items)} already {state}, skipped")
+    return changed
+
+
+def reaper_request(r, method, query, **kwargs):
+    """ Request on the client's session, for calls the API client makes with other parameters or body"""
+    from requests.exceptions import HTTPError
+
+    session = reaper_session(r)
+    response = session.request(method, urljoin(r.url, query), timeout=10, **kwargs)
+    if response.status_code in (403, 498, 499):
+        # Expired token, log in again like the API client does
+        r.login()
+        response = session.request(method, urljoin(r.url, query), timeout=10, **kwargs)
+    if not response.ok:
+        # Same message as errors of the API client, http_status() reads the status from it
+        raise HTTPError(f"URL: {response.url}, Status: {response.status_code}, Text: {response.text}")
+    return response
+
+
+def delete_schedule(r, schedule):
+    # delete_schedule() of the API client fetches the schedule again only to get its owner
+    reaper_request(r, 'DELETE', f"repair_schedule/{schedule['id']}", params={'owner': schedule['owner']})
+
+
+def update_schedule(r, schedule_id, fields):
+    # update_schedule() of the API client sends every setting, null for the ones not given
+    reaper_request(r, 'PATCH', f"repair_schedule/{schedule_id}", json=fields)
+
+
+def delete_repair(r, repair):
+    # Same as delete_schedule(), delete_repair() of the API client fetches the repair for its owner
+    reaper_request(r, 'DELETE', f"repair_run/{repair['id']}", params={'owner': repair['owner']})
+
+
+def is_cluster_pattern(cluster):
+    return any(c in cluster for c in '*?[')
+
+
+def resolve_clusters(r, args):
+    if args.cluster_regex:
+        return [c for c in sorted(r.get_clusters()) if args.cluster_regex.search(c)]
+    if is_cluster_pattern(args.cluster):
+        return [c for c in sorted(r.get_clusters()) if fnmatchcase(c, args.cluster)]
+    return [args.cluster]
+
+
+def for_each_cluster(r, args):
+    """ Run a cluster command for every cluster matched by the cluster selector"""
+    if bool(args.cluster) == bool(args.cluster_regex):
+        log.error("Either cluster name (pattern) or --cluster-regex must be set")
+        return 1
+    clusters = resolve_clusters(r, args)
+    if not clusters:
+        log.error("No clusters match the cluster selector")
+        return 1
+    # All clusters share one rate limit, so --max-rps still caps the whole run
+    limiter = RateLimiter(args.max_rps)
+
+    def run(cluster):
+        cluster_args = argparse.Namespace(**vars(args))
+        cluster_args.cluster = cluster
+        cluster_args.limiter = limiter
+        try:
+            return args.cluster_func(r, cluster_args)
+        except Exception as e:
+            log.error(f"{cluster} cluster failed: {e}")
+            return 1
+
+    if len(clusters) > 1:
+        log.info(f"Selected {len(clusters)} clusters: {', '.join(clusters)}")
+    with ContextThreadPoolExecutor(max_workers=args.parallel_clusters) as executor:
+        failed = list(executor.map(run, clusters))
+    if len(clusters) > 1:
+        failed_clusters = [c for c, f in zip(clusters, failed) if f]
+        if failed_clusters:
+            log.error(f"Failures in {len(failed_clusters)}/{len(clusters)} clusters: {', '.join(failed_clusters)}")
+        else:
+            log.info(f"All {len(clusters)} clusters succeeded")
+    return sum(failed)
+
+
+# Options set once for the whole batch, commands of a batch share its session
+BATCH_GLOBAL_OPTIONS = ('url', 'username', 'password', 'disable_ssl_verify', 'cache_ttl')
+
+
+def batch(r, args):
+    def execute(argv):
+        command = invoked_command(argv)
+        if command in ('batch', 'exporter', 'completion-print'):
+            raise ValueError(f"{command} can't run in a batch")
+        command_args = build_parser(command).parse_args(argv)
+        if not hasattr(command_args, 'func'):
+            raise ValueError('No command')
+        for name in BATCH_GLOBAL_OPTIONS:
+            setattr(command_args, name, getattr(args, name))
+        return command_args.func(r, command_args)
+
+    total = failed = 0
+    with args.file:
+        for result in run_batch(read_commands(args.file), execute, args.parallel, args.fail_fast):
+            total += 1
+            failed += result['exit_code'] != 0
+            print(json.dumps(result, separators=(',', ':')), flush=True)
+    level = logging.ERROR if failed else logging.INFO
+    log.log(level, f"Batch: {total - failed}/{total} commands succeeded")
+    return failed
+
+
+def exporter(r, args):
+    # http.server is a heavy import that only this command needs
+    from cassandra_reaper_cli.exporter import Exporter, serve
+    states = [] if 'ALL' in args.states else args.states
+    serve(Exporter(r, states, args.interval, args.segments_interval, PARALLEL_FETCHES), *args.listen)
+
+
+def history_sync(r, args):
     clusters = sorted(r.get_clusters())
+    if args.cluster:
+        clusters = [c for c in clusters if fnmatchcase(c, args.cluster)]
+    history = History(args.db or history_path(args.url))
+    failed = 0
+    try:
+        with ContextThreadPoolExecutor(max_workers=PARALLEL_FETCHES) as executor:
+            # Fetches run ahead in parallel, while rows are written from this thread only
+            fetches = [executor.submit(r.get_repairs, c, TERMINAL_STATES) for c in clusters]
+            for cluster, fetch in zip(clusters, fetches):
+                try:
+                    repairs = fetch.result()
+                    inserted, updated = history.store(cluster, repairs)
+                except Exception as e:
+                    failed += 1
+                    log.error(f"Syncing {cluster} cluster repair history failed: {e}")
+                else:
+                    log.info(f"Synced {cluster} cluster repair history: {len(repairs)} repairs, "
+                             f"{inserted} new, {updated} changed")
+    finally:
+        history.close()
+    return failed
+
+
+def history_query(r, args):
+    if bool(args.query) == bool(args.sql):
+        log.error("Either a query name or --sql must be set")
+        return 1
+    try:
+        history = History(args.db or history_path(args.url), readonly=True)
+        try:
+            if args.sql:
+                columns, rows = history.sql(args.sql)
+            else:
+                columns, rows = history.query(args.query, args.cluster, args.keyspace, args.since, args.limit)
+        finally:
+            history.close()
+    except (OSError, ValueError) as e:
+        log.error(str(e))
+        return 1
+    write_items(rows, columns, args.format)
+
+
+def metadata_cache(args):
+    return MetadataCache(args.url, args.cache_ttl)
+
+
+def cache_refresh(r, args):
+    cache = metadata_cache(args)
+    clusters = cache.clusters(r)
+    cache.schedules(r)
+    cache.repairs(r)
+    result = run_bulk(clusters, lambda c: cache.tables(r, c), lambda c: f"Caching {c} cluster tables",
+                      args.concurrency, RateLimiter(args.max_rps))
+    result.log_summary(f"Caching metadata in {cache.dir}")
+    return len(result.failed)
+
+
+def cluster_list(r, args):
+    clusters = sorted(metadata_cache(args).clusters(r, args.cached))
     if args.json:
         print(json.dumps(clusters, indent=4))
     else:
@@ -275,48 +710,227 @@ def cluster_list(args):
             print(cluster)
 
 
-def cluster_enable(args):
+def cluster_enable(r, args):
     log.info(f"Enabling {args.cluster} cluster")
-    cluster_schedules_enable(args)
-    cluster_repairs_resume(args)
+    if args.from_snapshot:
+        return restore_snapshot(r, args)
+    failed = cluster_schedules_enable(r, args)
+    failed += cluster_repairs_resume(r, args)
+    return failed
 
 
-def cluster_disable(args):
+def cluster_disable(r, args):
     log.info(f"Disabling {args.cluster} cluster")
-    cluster_schedules_disable(args)
-    cluster_repairs_pause(args)
+    schedules = r.get_cluster_schedules(args.cluster)
+    repairs = r.get_repairs(args.cluster, ['RUNNING'])
+    if args.snapshot:
+        active = [s for s in schedules if s['state'] == 'ACTIVE']
+        if args.dry_run:
+            log.info(f"Saving snapshot of {len(active)} active schedules and {len(repairs)} running repairs (dry run)")
+        else:
+            # Saved before anything is paused, so a failed disable can still be restored
+            path = snapshot_path(args.url, args.cluster)
+            snapshot = save_snapshot(path, args.cluster, active, repairs)
+            log.info(f"Saved snapshot of {len(snapshot['schedules'])} active schedules and "
+                     f"{len(snapshot['repairs'])} running repairs to {path}")
+    failed = disable_schedules(r, args, schedules)
+    failed += pause_repairs(r, args, repairs)
+    return failed
+
+
+def restore_snapshot(r, args):
+    """ Enable and resume only the snapshot items, without listing the cluster"""
+    path = snapshot_path(args.url, args.cluster)
+    snapshot = load_snapshot(path)
+    if snapshot is None:
+        log.error(f"No snapshot of {args.cluster} cluster in {path}")
+        return 1
+    log.info(f"Restoring snapshot of {args.cluster} cluster taken at {snapshot['time']}")
+
+    def skip_gone(action):
+        def call(item):
+            try:
+                action(item['id'])
+            except Exception as e:
+                status = http_status(e)
+                name = f"{args.cluster} cluster {item['keyspace_name']} keyspace {item['id']}"
+                if status == 404:
+                    log.warning(f"{name} no longer exists, skipped")
+                # Reaper refuses state transitions that aren't allowed, e.g. resuming a repair that is DONE or ABORTED
+                # by now, with 409, or 405 in older versions
+                elif status in (405, 409):
+                    log.warning(f"{name} can't be restored from its current state ({e}), skipped")
+                else:
+                    raise
+        return call
+
+    schedules = bulk(args, snapshot['schedules'], skip_gone(r.enable_schedule),
+                     lambda s: f"Enabling {args.cluster} cluster {s['keyspace_name']} keyspace repair schedule",
+                     lambda s: f"schedule-enable {s['id']} --no-lookup")
+    schedules.log_summary(f"Enabling {args.cluster} cluster repair schedules")
+    repairs = bulk(args, snapshot['repairs'], skip_gone(r.resume_repair),
+                   lambda i: f"Resuming {args.cluster} cluster {i['keyspace_name']} keyspace repair",
+                   lambda i: f"repair-resume {i['id']} --no-lookup")
+    repairs.log_summary(f"Resuming {args.cluster} cluster repairs")
+    failed = len(schedules.failed) + len(repairs.failed)
+    if not failed and not args.dry_run:
+        os.remove(path)
+    return failed
+
+
+def watch_conflicts(args):
+    """ Log the output options --watch can't honour, it always redraws a table"""
+    options = [option for option, given in (('--json', args.json), ('--format', args.format != 'table'),
+                                            ('--fields', getattr(args, 'fields', None))) if given]
+    if options:
+        log.error(f"--watch always shows a table, it can't be combined with {', '.join(options)}")
+    return bool(options)
+
+
+def repair_list(r, args):
+    cluster = '' if args.cluster == 'ALL' or is_cluster_pattern(args.cluster) else args.cluster
+    if args.watch:
+        if watch_conflicts(args):
+            return 1
+        args.cached = False
+        watch(lambda: repair_table(r, args, cluster, list_repairs(r, args, cluster)), args.watch)
+        return
+    repairs = list_repairs(r, args, cluster)
+    if output_format(args) == 'table' and not args.fields:
+        header, rows = repair_table(r, args, cluster, repairs)
+        print(header)
+        for _, _, msg in rows:
+            print(msg)
+        return
+    etas = projected_etas(r, repairs) if args.eta else {}
+    for repair in repairs if args.eta else []:
+        repair['cli_eta'] = etas.get(repair['id'])
+    print_items(repairs, args, REPAIR_FIELDS + ['cli_eta'] if args.eta else REPAIR_FIELDS)
 
 
-def repair_list(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
-    cluster = '' if args.cluster == 'ALL' else args.cluster
-    states = [] if 'ALL' in args.states else args.states
-    repairs = sorted(r.get_repairs(cluster, states),
-                     key=lambda i: i['creation_time'])
+# Fields of csv and table output without --fields
+REPAIR_FIELDS = ['id', 'cluster_name', 'keyspace_name', 'state', 'creation_time', 'end_time', 'intensity',
+                 'segments_repaired', 'total_segments', 'last_event']
+SCHEDULE_FIELDS = ['id', 'cluster_name', 'keyspace_name', 'state', 'next_activation', 'scheduled_days_between',
+                   'intensity', 'repair_parallelism', 'owner']
+
+
+def print_items(items, args, default_fields):
+    fmt = output_format(args)
+    fields = args.fields or (default_fields if fmt in ('table', 'csv') else None)
+    items = project(items, fields) if fields else items
     if args.json:
-        print(json.dumps(repairs, indent=4))
+        print(json.dumps(items, indent=4))
     else:
-        header = f"{'CREATION_TIME':22}{'ETA':22}"
-        header = f"{header}{'KEYSPACE':40}" if cluster else f"{header}{'CLUSTER':30}{'KEYSPACE':40}"
-        header = f"{header}{'ID':40}" if args.show_id else header
-        header = f"{header}{'STATE':10}{'REPAIRED':10}{'LAST_EVENT'}"
-        print(header)
-        for repair in repairs:
-            eta = repair['end_time'] if repair['end_time'] else repair[
-                'estimated_time_of_arrival'] if repair['estimated_time_of_arrival'] else 'TBD'
-            msg = f"{repair['creation_time']:22}{eta:22}"
-            msg = f"{msg}{repair['keyspace_name']:40}" if cluster else f"{msg}{repair['cluster_name']:30}{repair['keyspace_name']:40}"
-            msg = f"{msg}{repair['id']:40}" if args.show_id else msg
-            repaired = f"{repair['segments_repaired']}/{repair['total_segments']}"
-            msg = f"{msg}{repair['state']:10}{repaired:10}{repair['last_event']}"
-            print(msg)
+        write_items(items, fields, fmt)
 
 
-def cluster_tables_list(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
-    tables = r.get_cluster_tables(args.cluster)
+def single_value(values):
+    """ The only value of a list, or '' that makes the API client leave the query parameter out"""
+    return values[0] if values and len(values) == 1 else ''
+
+
+def repair_states(args):
+    """ States to fetch: --states, or those an equality --filter on state requires, or the active ones"""
+    states = args.states or ACTIVE_REPAIR_STATES
+    required = pushed_down(args.filter, 'state')
+    if required and (args.states is None or 'ALL' in states):
+        states = required
+    return [] if 'ALL' in states else states
+
+
+def list_repairs(r, args, cluster):
+    """ Repairs selected by the arguments, filtered, sorted and limited in one pass"""
+    states = repair_states(args)
+    cluster = cluster or single_value(pushed_down(args.filter, 'cluster_name'))
+    if args.cached and states and set(states) <= set(ACTIVE_REPAIR_STATES):
+        repairs = (i for i in metadata_cache(args).repairs(r, True)
+                   if i['state'] in states and (not cluster or i['cluster_name'] == cluster))
+    else:
+        repairs = r.get_repairs(cluster, states)
+    if is_cluster_pattern(args.cluster):
+        repairs = (i for i in repairs if fnmatchcase(i['cluster_name'], args.cluster))
+    return select(repairs, args.filter, args.sort or [('creation_time', False)], args.limit)
+
+
+def repair_table(r, args, cluster, repairs):
+    """ Header and (id, signature, line) rows of repair list table"""
+    etas = projected_etas(r, repairs) if args.eta else {}
+    header = f"{'CREATION_TIME':22}{'ETA':22}"
+    header = f"{header}{'CLI_ETA':22}" if args.eta else header
+    header = f"{header}{'KEYSPACE':40}" if cluster else f"{header}{'CLUSTER':30}{'KEYSPACE':40}"
+    header = f"{header}{'ID':40}" if args.show_id else header
+    header = f"{header}{'STATE':10}{'REPAIRED':10}{'LAST_EVENT'}"
+    rows = []
+    for repair in repairs:
+        eta = repair['end_time'] if repair['end_time'] else repair[
+            'estimated_time_of_arrival'] if repair['estimated_time_of_arrival'] else 'TBD'
+        msg = f"{repair['creation_time']:22}{eta:22}"
+        msg = f"{msg}{etas.get(repair['id']) or '-':22}" if args.eta else msg
+        msg = f"{msg}{repair['keyspace_name']:40}" if cluster else f"{msg}{repair['cluster_name']:30}{repair['keyspace_name']:40}"
+        msg = f"{msg}{repair['id']:40}" if args.show_id else msg
+        repaired = f"{repair['segments_repaired']}/{repair['total_segments']}"
+        msg = f"{msg}{repair['state']:10}{repaired:10}{repair['last_event']}"
+        rows.append((repair['id'], (repair['state'], repair['segments_repaired'], repair['last_event']), msg))
+    return header, rows
+
+
+def format_timestamp(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def projected_etas(r, repairs):
+    """ CLI projected ETA of every running repair, fetching segments of repairs in parallel"""
+    running = [i for i in repairs if i['state'] == 'RUNNING']
+    per_cluster = Counter(i['cluster_name'] for i in running)
+    now = datetime.now().timestamp() * 1000
+
+    def eta(repair):
+        progress = repair_progress(repair, r.get_repair_segments(repair['id']), now,
+                                   per_cluster[repair['cluster_name']] - 1)
+        return format_timestamp(progress['eta']) if progress['eta'] else None
+
+    with ContextThreadPoolExecutor(max_workers=PARALLEL_FETCHES) as executor:
+        return dict(zip((i['id'] for i in running), executor.map(eta, running)))
+
+
+def repair_progress_info(r, args):
+    repair = r.get_repair(args.id)
+    segments = r.get_repair_segments(args.id)
+    concurrent = [i for i in r.get_repairs(repair['cluster_name'], ['RUNNING']) if i['id'] != repair['id']]
+    progress = repair_progress(repair, segments, datetime.now().timestamp() * 1000, len(concurrent))
+    if args.json:
+        print(json.dumps(progress, indent=4))
+        return
+    print(f"{'REPAIR':14}{repair['cluster_name']} cluster {repair['keyspace_name']} keyspace, "
+          f"{repair['state']}, intensity {repair['intensity']}")
+    print(f"{'SEGMENTS':14}{progress['done']}/{progress['total']} done, "
+          f"{progress['running']} running, {progress['remaining']} remaining")
+    rate = f"{progress['rate']:.1f} segments/hour" if progress['rate'] else 'not enough finished segments'
+    model_rate = f"{progress['model_rate']:.1f} segments/hour" if progress['model_rate'] else '-'
+    since = f" since {format_timestamp(progress['observed_since'])}" if progress['observed_since'] else ''
+    print(f"{'THROUGHPUT':14}{rate} observed{since}, {model_rate} from intensity and running segments")
+    print(f"{'CONCURRENT':14}{progress['concurrent_repairs']} other running repairs of the cluster")
+    if progress['remaining_seconds'] is None:
+        print(f"{'REMAINING':14}TBD")
+        return
+    remaining = format_duration(progress['remaining_seconds'])
+    if progress['remaining_seconds_low'] is not None:
+        remaining = (f"{remaining} (95% band {format_duration(progress['remaining_seconds_low'])}"
+                     f" - {format_duration(progress['remaining_seconds_high'])})")
+    print(f"{'REMAINING':14}{remaining}")
+    if progress['eta']:
+        eta = format_timestamp(progress['eta'])
+        if progress['eta_low']:
+            eta = (f"{eta} (between {format_timestamp(progress['eta_low'])} "
+                   f"and {format_timestamp(progress['eta_high'])})")
+        print(f"{'ETA':14}{eta}")
+    else:
+        print(f"{'ETA':14}TBD, repair is {repair['state']}")
+
+
+def cluster_tables_list(r, args):
+    tables = metadata_cache(args).tables(r, args.cluster, args.cached)
     if args.json:
         if args.keyspace:
             print(json.dumps(tables.get(args.keyspace)))
@@ -333,14 +947,19 @@ def cluster_tables_list(args):
                     print(f"  {t}")
 
 
-def schedule_list(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
-    cluster = '' if args.cluster == 'ALL' else args.cluster
-    schedules = sorted(r.get_schedules(cluster),
-                       key=lambda i: i['next_activation'])
-    if args.json:
-        print(json.dumps(schedules, indent=4))
+def schedule_list(r, args):
+    cluster = '' if args.cluster == 'ALL' or is_cluster_pattern(args.cluster) else args.cluster
+    query_cluster = cluster or single_value(pushed_down(args.filter, 'cluster_name'))
+    if args.cached:
+        schedules = (i for i in metadata_cache(args).schedules(r, True)
+                     if not query_cluster or i['cluster_name'] == query_cluster)
+    else:
+        schedules = r.get_schedules(query_cluster, single_value(pushed_down(args.filter, 'keyspace_name')))
+    if is_cluster_pattern(args.cluster):
+        schedules = (i for i in schedules if fnmatchcase(i['cluster_name'], args.cluster))
+    schedules = select(schedules, args.filter, args.sort or [('next_activation', False)], args.limit)
+    if output_format(args) != 'table' or args.fields:
+        print_items(schedules, args, SCHEDULE_FIELDS)
     else:
         header = f"{'KEYSPACE':40}" if cluster else f"{'CLUSTER':30}{'KEYSPACE':40}"
         header = f"{header}{'ID':40}" if args.show_id else header
@@ -353,61 +972,182 @@ def schedule_list(args):
             print(msg)
 
 
-def schedule_start(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
-    s = r.get_schedule(args.id)
-    log.info(
-        f"Starting {s['cluster_name']} cluster {s['keyspace_name']} keyspace repair schedule...")
-    r.start_schedule(args.id)
+def schedules_diff(r, args):
+    with args.file:
+        rules = load_desired(args.file)
+    # One call for the schedules of all clusters, rules select them locally
+    return plan(r.get_schedules(), rules)
 
 
-def schedule_disable(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
-    s = r.get_schedule(args.id)
-    log.info(
-        f"Disabling {s['cluster_name']} cluster {s['keyspace_name']} keyspace repair schedule...")
-    r.disable_schedule(args.id)
+def print_schedule_changes(changes, args):
+    header = f"{'CLUSTER':30}{'KEYSPACE':40}"
+    header = f"{header}{'ID':40}" if args.show_id else header
+    print(f"{header}CHANGES")
+    for c in changes:
+        s = c['schedule']
+        msg = f"{s['cluster_name']:30}{s['keyspace_name']:40}"
+        msg = f"{msg}{s['id']:40}" if args.show_id else msg
+        print(f"{msg}{describe_change(c)}")
 
 
-def schedule_enable(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
-    s = r.get_schedule(args.id)
-    log.info(
-        f"Enabling {s['cluster_name']} cluster {s['keyspace_name']} keyspace repair schedule...")
-    r.enable_schedule(args.id)
+def schedules_plan(r, args):
+    try:
+        changes = schedules_diff(r, args)
+    except ValueError as e:
+        log.error(e)
+        return 1
+    if args.json:
+        print(json.dumps([{'id': c['schedule']['id'], 'cluster_name': c['schedule']['cluster_name'],
+                           'keyspace_name': c['schedule']['keyspace_name'],
+                           'settings': {k: {'current': old, 'desired': new} for k, (old, new) in c['settings'].items()},
+                           'state': {'current': c['state'][0], 'desired': c['state'][1]} if c['state'] else None}
+                          for c in changes], indent=4))
+    elif changes:
+        print_schedule_changes(changes, args)
+    else:
+        log.info('Repair schedules are in the desired state')
 
 
-def schedule_delete(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
+def schedules_apply(r, args):
+    try:
+        changes = schedules_diff(r, args)
+    except ValueError as e:
+        log.error(e)
+        return 1
+    if not changes:
+        log.info('Repair schedules are in the desired state')
+        return 0
+    print_schedule_changes(changes, args)
+    result = run_bulk(changes, lambda c: apply_change(r, c, update_schedule, delete_schedule),
+                      lambda c: f"Changing {c['schedule']['cluster_name']} cluster {c['schedule']['keyspace_name']} "
+                                f"keyspace repair schedule ({describe_change(c)})",
+                      args.concurrency, RateLimiter(args.max_rps))
+    result.log_summary('Applying desired repair schedule state')
+    return len(result.failed)
+
+
+def schedule_plan(r, args):
+    cluster = '' if args.cluster == 'ALL' or is_cluster_pattern(args.cluster) else args.cluster
+    pattern = '*' if args.cluster == 'ALL' else args.cluster
+    with ContextThreadPoolExecutor(max_workers=2) as executor:
+        schedules = executor.submit(r.get_schedules, cluster)
+        done = executor.submit(r.get_repairs, cluster, ['DONE'])
+        schedules, durations = schedules.result(), estimate_durations(done.result())
+    per_cluster = defaultdict(list)
+    for s in schedules:
+        if fnmatchcase(s['cluster_name'], pattern):
+            per_cluster[s['cluster_name']].append(s)
+    # Buckets start on whole buckets, e.g. on the hour, so hot spots read as clock times
+    now = time.time() // args.bucket * args.bucket
+    plans = {c: plan_cluster(per_cluster[c], durations, args.default_duration, now, args.horizon, args.bucket,
+                             args.max_concurrent) for c in sorted(per_cluster)}
+    moves = [m for p in plans.values() for m in p['moves']]
+    if args.json:
+        print(json.dumps([{'cluster_name': c, 'schedules': p['schedules'], 'peak': p['peak'],
+                           'planned_peak': p['planned_peak'],
+                           'hot_spots': [dict(h, start=format_timestamp(h['start']), end=format_timestamp(h['end']))
+                                         for h in p['hot_spots']],
+                           'moves': [{'id': m['schedule']['id'], 'keyspace_name': m['schedule']['keyspace_name'],
+                                      'next_activation': format_timestamp(m['next_activation']),
+                                      'proposed_activation': format_timestamp(m['proposed_activation']),
+                                      'shift': m['shift'], 'estimated_duration': m['duration']}
+                                     for m in p['moves']]}
+                          for c, p in plans.items()], indent=4))
+    else:
+        print_schedule_plan(plans, args)
+    if not moves:
+        log.info('Repair schedule activations are level, nothing to move')
+        return 0
+    if not args.apply:
+        return 0
+    result = run_bulk(moves, lambda m: apply_move(r, m, delete_schedule),
+                      lambda m: f"Moving {m['schedule']['cluster_name']} cluster {m['schedule']['keyspace_name']} "
+                                f"keyspace repair schedule to {format_timestamp(m['proposed_activation'])}",
+                      args.concurrency, RateLimiter(args.max_rps))
+    result.log_summary('Moving repair schedule activations')
+    return len(result.failed)
+
+
+def print_schedule_plan(plans, args):
+    for cluster, p in plans.items():
+        log.info(f"{cluster} cluster: {p['schedules']} active schedules, {len(p['hot_spots'])} hot spots with up to "
+                 f"{p['peak']} repairs at once, {len(p['planned_hot_spots'])} with up to {p['planned_peak']} after "
+                 f"moving {len(p['moves'])} schedules")
+    hot_spots = [(c, h) for c, p in plans.items() for h in p['hot_spots']]
+    if hot_spots:
+        print(f"{'CLUSTER':30}{'START':22}{'END':22}{'REPAIRS':9}KEYSPACES")
+        for cluster, h in hot_spots:
+            print(f"{cluster:30}{format_timestamp(h['start']):22}{format_timestamp(h['end']):22}{h['peak']:<9}"
+                  f"{', '.join(h['keyspaces'])}")
+    moves = [m for p in plans.values() for m in p['moves']]
+    if moves:
+        if hot_spots:
+            print()
+        header = f"{'CLUSTER':30}{'KEYSPACE':40}"
+        header = f"{header}{'ID':40}" if args.show_id else header
+        print(f"{header}{'NEXT_ACTIVATION':22}{'PROPOSED_ACTIVATION':22}{'SHIFT':18}EST_DURATION")
+        for m in moves:
+            s = m['schedule']
+            msg = f"{s['cluster_name']:30}{s['keyspace_name']:40}"
+            msg = f"{msg}{s['id']:40}" if args.show_id else msg
+            print(f"{msg}{format_timestamp(m['next_activation']):22}{format_timestamp(m['proposed_activation']):22}"
+                  f"{format_duration(m['shift']):18}{format_duration(m['duration'])}")
+
+
+def mutate(r, args, get, action, verb, what, state=None):
+    """ Run a single-item mutation, skipped when the item is in the target `state` already"""
+    if args.no_lookup:
+        log.info(f"{verb} {what} {args.id}...")
+        action(args.id)
+        return
+    item = get(args.id)
+    name = f"{item['cluster_name']} cluster {item['keyspace_name']} keyspace {what}"
+    if item['state'] == state:
+        log.info(f"Skipping {name}, it's already {state}")
+        return
+    log.info(f"{verb} {name}...")
+    action(args.id)
+
+
+def schedule_start(r, args):
+    mutate(r, args, r.get_schedule, r.start_schedule, 'Starting', 'repair schedule')
+
+
+def schedule_disable(r, args):
+    mutate(r, args, r.get_schedule, r.disable_schedule, 'Disabling', 'repair schedule', 'PAUSED')
+
+
+def schedule_enable(r, args):
+    mutate(r, args, r.get_schedule, r.enable_schedule, 'Enabling', 'repair schedule', 'ACTIVE')
+
+
+def schedule_delete(r, args):
     s = r.get_schedule(args.id)
     if s['state'] == 'PAUSED':
         log.info(
             f"Deleting {s['cluster_name']} cluster {s['keyspace_name']} keyspace repair schedule...")
-        r.delete_schedule(args.id)
+        delete_schedule(r, s)
     else:
         log.error(
             f"Can't delete {s['cluster_name']} cluster {s['keyspace_name']} keyspace repair schedule because it's ACTIVE. Must be disabled first")
         exit(1)
 
 
-def repair_pause(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
-    repair = r.get_repair(args.id)
-    log.info(
-        f"Pausing {repair['cluster_name']} cluster {repair['keyspace_name']} keyspace repair...")
-    r.pause_repair(args.id)
+def repair_pause(r, args):
+    mutate(r, args, r.get_repair, r.pause_repair, 'Pausing', 'repair', 'PAUSED')
 
 
-def repair_intensity_change(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
+def repair_intensity_change(r, args):
+    if args.no_lookup:
+        log.info(f"Changing repair {args.id} intensity to {args.intensity}")
+        r.change_repair_intensity(args.id, args.intensity)
+        return
     repair = r.get_repair(args.id)
-    if repair['state'] == 'PAUSED':
+    if repair['intensity'] == args.intensity:
+        log.info(
+            f"Skipping {repair['cluster_name']} cluster {repair['keyspace_name']} keyspace repair, "
+            f"its intensity is already {args.intensity}")
+    elif repair['state'] == 'PAUSED':
         log.info(
             f"Changing {repair['cluster_name']} cluster {repair['keyspace_name']} keyspace repair intensity from {repair['intensity']} to {args.intensity}")
         r.change_repair_intensity(args.id, args.intensity)
@@ -417,169 +1157,459 @@ def repair_intensity_change(args):
         exit(1)
 
 
-def repair_abort(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
-    repair = r.get_repair(args.id)
-    log.info(
-        f"Aborting {repair['cluster_name']} cluster {repair['keyspace_name']} keyspace repair...")
-    r.abort_repair(args.id)
+def repair_abort(r, args):
+    mutate(r, args, r.get_repair, r.abort_repair, 'Aborting', 'repair', 'ABORTED')
 
 
-def repair_delete(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
+def repair_delete(r, args):
     repair = r.get_repair(args.id)
     log.info(
         f"Deleting {repair['cluster_name']} cluster {repair['keyspace_name']} keyspace repair {repair['id']}...")
-    r.delete_repair(args.id)
-
-
-def repair_resume(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
-    repair = r.get_repair(args.id)
-    log.info(
-        f"Resuming {repair['cluster_name']} cluster {repair['keyspace_name']} keyspace repair...")
-    r.resume_repair(args.id)
-
-
-def repair_segments_list(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
-    segments = sorted(r.get_repair_segments(args.id),
-                      key=lambda i: i['startTime'] if i['startTime'] else sys.maxsize)
-    if args.json:
+    delete_repair(r, repair)
+
+
+def repair_resume(r, args):
+    mutate(r, args, r.get_repair, r.resume_repair, 'Resuming', 'repair', 'RUNNING')
+
+
+# Exit codes of repair-wait besides 0 when all repairs are in a wanted state
+WAIT_TIMED_OUT = 3
+WAIT_UNEXPECTED_STATE = 4
+ENDED_REPAIR_STATES = TERMINAL_STATES + ['DELETED']
+
+
+def repair_wait(r, args):
+    """Wait until all selected repairs are in one of the --until states.
+
+    Every poll is one repair list call for the active states only, a short
+    list whatever the history size, filtered to one cluster when all waited
+    repairs are in it. A waited repair missing from that list has ended and
+    is fetched once by ID to learn how. Polls back off while nothing changes.
+    """
+    if bool(args.ids) == bool(args.cluster):
+        log.error("Either repair IDs or --cluster must be set")
+        return 1
+    until = set(args.until)
+    deadline = time.monotonic() + args.timeout if args.timeout else None
+    backoff = Backoff(args.interval, args.max_interval)
+    cluster = '' if not args.cluster or is_cluster_pattern(args.cluster) else args.cluster
+    waited = list(dict.fromkeys(args.ids)) or None
+    repairs = {}
+    while True:
+        try:
+            active = {i['id']: i for i in r.get_repairs(cluster, ACTIVE_REPAIR_STATES)}
+            if waited is None:
+                waited = [i for i, repair in active.items() if fnmatchcase(repair['cluster_name'], args.cluster)]
+                log.info(f"Waiting for {len(waited)} active repairs of {args.cluster} cluster")
+            if update_waited_repairs(r, waited, active, repairs):
+                backoff.reset()
+        except Exception as e:
+            if not is_transient(e):
+                raise
+            log.warning(f"Polling repairs failed: {e}")
+
+        unexpected = [i for i in repairs.values() if i['state'] in ENDED_REPAIR_STATES and i['state'] not in until]
+        for i in unexpected:
+            log.error(f"Repair {i['id']} ended in {i['state']} state instead of {' or '.join(args.until)}")
+        if unexpected:
+            sys.exit(WAIT_UNEXPECTED_STATE)
+        pending = None if waited is None else [
+            i for i in waited if i not in repairs or repairs[i]['state'] not in until]
+        if pending == []:
+            log.info(f"All {len(waited)} repairs are in {' or '.join(args.until)} state")
+            return
+        if deadline is not None and time.monotonic() >= deadline:
+            states = ', '.join(f"{i} ({repairs[i]['state'] if i in repairs else 'unknown'})" for i in pending or [])
+            log.error(f"Timed out waiting for repairs: {states}")
+            sys.exit(WAIT_TIMED_OUT)
+        # Once all waited repairs are known to be in one cluster, list only its repairs
+        clusters = {i['cluster_name'] for i in repairs.values()}
+        if not cluster and len(clusters) == 1 and len(repairs) == len(waited):
+            cluster = clusters.pop()
+        delay = backoff.next()
+        time.sleep(max(0.0, min(delay, deadline - time.monotonic())) if deadline is not None else delay)
+
+
+def update_waited_repairs(r, waited, active, repairs):
+    """ Update `repairs` with states of the waited repairs, log and return whether any changed"""
+    changed = False
+    for repair_id in waited:
+        previous = repairs.get(repair_id)
+        if repair_id in active:
+            repair = active[repair_id]
+        elif previous and previous['state'] in ENDED_REPAIR_STATES:
+            continue
+        else:
+            try:
+                repair = r.get_repair(repair_id)
+            except Exception as e:
+                if http_status(e) != 404:
+                    raise
+                repair = {'id': repair_id, 'state': 'DELETED', 'cluster_name': '', 'keyspace_name': ''}
+        repair = {k: repair.get(k) for k in ('id', 'state', 'cluster_name', 'keyspace_name')}
+        if previous is None or previous['state'] != repair['state']:
+            changed = True
+            if repair['cluster_name']:
+                log.info(f"{repair['cluster_name']} cluster {repair['keyspace_name']} keyspace repair {repair_id} "
+                         f"is {repair['state']}")
+            else:
+                log.info(f"Repair {repair_id} is {repair['state']}")
+        repairs[repair_id] = repair
+    return changed
+
+
+SEGMENT_SORT_KEYS = {
+    'start-time': lambda i: i['startTime'] if i['startTime'] else sys.maxsize,
+    'token': lambda i: int(i['tokenRange']['baseRange']['start']),
+}
+
+
+def repair_segments_list(r, args):
+    if args.watch:
+        if watch_conflicts(args):
+            return 1
+        watch(lambda: segment_table(r, args), args.watch)
+        return
+    print_segments(list_segments(r, args), args)
+
+
+def print_segments(segments, args):
+    now = datetime.now().timestamp() * 1000
+    fmt = output_format(args)
+    if fmt == 'json':
         print(json.dumps(segments, indent=4))
+    elif fmt == 'ndjson':
+        write_ndjson(segments)
+    elif fmt == 'csv':
+        header = ['start_token', 'end_token', 'id', 'fail_count', 'state', 'replicas',
+                  'start_time', 'end_time', 'duration_seconds']
+        write_csv(header, (segment_csv_row(s, now) for s in segments))
     else:
-        header = f"{'START_TOKEN':>22}{'END_TOKEN':>22}{'ID':>40}" if args.show_id else f"{'START_TOKEN':>22}{'END_TOKEN':>22}"
-        header = f"{header}{'FAIL_COUNT':^15}{'STATE':<15}{'REPLICAS':<92}{'SEGMENT_DURATION'}"
-        print(header)
-        for s in segments:
-            start_token = s['tokenRange']['baseRange']['start']
-            end_token = s['tokenRange']['baseRange']['end']
-            msg = f"{start_token:>22}{end_token:>22}\t{s['id']:<40}" if args.show_id else f"{start_token:>22}{end_token:>22}"
-            msg = f"{msg}{s['failCount']:^15}{s['state']:<15}{s['replicas']}"
-            if s['startTime']:
-                end_time = s['endTime'] if s['endTime'] else datetime.now(
-                ).timestamp() * 1000
-                segment_duration = timedelta(
-                    milliseconds=(end_time-s['startTime']))
-                msg = f"{msg}\t{segment_duration}"
-            print(msg)
-            if args.show_token_ranges:
-                print(f"{'RANGE_START':>30}{'RANGE_END':>22}")
-                for range in sorted(s['tokenRange']['tokenRanges'], key=lambda i: i['start']):
-                    print(f"{range['start']:30}{range['end']:22}")
-
-
-def repair_info(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
+        write_lines(segment_table_lines(segments, args, now))
+
+
+def repair_segments_find(r, args):
+    if args.token is None and args.host is None and args.state is None:
+        log.error('At least one of --token, --host and --state must be set')
+        return 1
+    segments = r.get_repair_segments(args.id)
+    start = time.perf_counter()
+    index = SegmentIndex(segments)
+    indexed = time.perf_counter()
+    found = index.find(args.token, args.host, args.state)
+    log.info(f"Found {len(found)} of {len(segments)} segments "
+             f"(index built in {(indexed - start) * 1000:.1f} ms, "
+             f"lookup {(time.perf_counter() - indexed) * 1000:.3f} ms)")
+    if not args.abort:
+        args.sort = 'token'
+        print_segments(found, args)
+        return 0
+    running = [s for s in found if s['state'] == 'RUNNING']
+    if len(running) < len(found):
+        log.info(f"Skipping {len(found) - len(running)} segments that are not RUNNING")
+    result = run_bulk(running, lambda s: r.abort_repair_segment(args.id, s['id']),
+                      lambda s: f"Aborting segment {s['id']} ({', '.join(s['replicas'])})",
+                      args.concurrency, RateLimiter(args.max_rps))
+    result.log_summary(f"Aborting segments of repair {args.id}")
+    return len(result.failed)
+
+
+def repair_segments_reap(r, args):
+    if bool(args.id) == bool(args.cluster):
+        log.error("Either repair ID or --cluster must be set")
+        return 1
+    args.limiter = RateLimiter(args.max_rps)
+    try:
+        while True:
+            try:
+                failed = reap_segments(r, args)
+            except Exception as e:
+                if not args.loop:
+                    raise
+                log.error(f"Reaping segments failed: {e}")
+            if not args.loop:
+                return failed
+            time.sleep(args.loop)
+    except KeyboardInterrupt:
+        return 0
+
+
+def reap_segments(r, args):
+    """ Abort stuck segments of the selected repairs once, return the number of failed aborts"""
+    if args.id:
+        repairs = [r.get_repair(args.id)]
+    else:
+        cluster = '' if is_cluster_pattern(args.cluster) else args.cluster
+        repairs = [i for i in r.get_repairs(cluster, ['RUNNING']) if fnmatchcase(i['cluster_name'], args.cluster)]
+    with ContextThreadPoolExecutor(max_workers=PARALLEL_FETCHES) as executor:
+        fetched = list(executor.map(lambda repair: r.get_repair_segments(repair['id']), repairs))
+    now = datetime.now().timestamp() * 1000
+    stuck = []
+    for repair, segments in zip(repairs, fetched):
+        threshold, found = stuck_segments(segments, now, args.factor, args.percentile, args.min_done,
+                                          args.max_duration)
+        what = f"{repair['cluster_name']} cluster {repair['keyspace_name']} keyspace repair {repair['id']}"
+        if threshold is None:
+            log.info(f"{what}: too few DONE segments for a threshold, set --max-duration to reap it anyway")
+        elif found:
+            log.warning(f"{what}: {len(found)} segments running longer than {format_duration(threshold)}")
+        stuck += [(repair, s, seconds) for s, seconds in found]
+    if not stuck:
+        log.info(f"No stuck segments in {len(repairs)} repairs")
+        return 0
+    result = bulk(args, stuck, lambda i: r.abort_repair_segment(i[0]['id'], i[1]['id']),
+                  lambda i: f"Aborting segment {i[1]['id']} of repair {i[0]['id']} running for "
+                            f"{format_duration(i[2])} ({', '.join(i[1]['replicas'])})",
+                  lambda i: f"repair-segment-abort {i[0]['id']} {i[1]['id']}")
+    result.log_summary('Aborting stuck segments')
+    return len(result.failed)
+
+
+def list_segments(r, args):
+    segments = r.get_repair_segments(args.id)
+    if args.sort != 'none':
+        segments.sort(key=SEGMENT_SORT_KEYS[args.sort])
+    return segments
+
+
+def segment_table(r, args):
+    """ Header and (id, signature, line) rows of segment list table, without token ranges"""
+    segments = list_segments(r, args)
+    now = datetime.now().timestamp() * 1000
+    return segment_header(args), [(s['id'], (s['state'], s['failCount']), segment_line(s, args, now))
+                                  for s in segments]
+
+
+def segment_duration(segment, now):
+    if not segment['startTime']:
+        return None
+    end_time = segment['endTime'] if segment['endTime'] else now
+    return timedelta(milliseconds=(end_time-segment['startTime']))
+
+
+def segment_csv_row(s, now):
+    base = s['tokenRange']['baseRange']
+    duration = segment_duration(s, now)
+    return [base['start'], base['end'], s['id'], s['failCount'], s['state'], ' '.join(s['replicas']),
+            s['startTime'] or '', s['endTime'] or '', duration.total_seconds() if duration is not None else '']
+
+
+def segment_header(args):
+    header = f"{'START_TOKEN':>22}{'END_TOKEN':>22}{'ID':>40}" if args.show_id else f"{'START_TOKEN':>22}{'END_TOKEN':>22}"
+    return f"{header}{'FAIL_COUNT':^15}{'STATE':<15}{'REPLICAS':<92}{'SEGMENT_DURATION'}"
+
+
+def segment_line(s, args, now):
+    base = s['tokenRange']['baseRange']
+    segment_id = f"\t{s['id']:<40}" if args.show_id else ''
+    duration = segment_duration(s, now)
+    duration = f"\t{duration}" if duration is not None else ''
+    return (f"{base['start']:>22}{base['end']:>22}{segment_id}{s['failCount']:^15}{s['state']:<15}{s['replicas']}"
+            f"{duration}")
+
+
+def segment_table_lines(segments, args, now):
+    yield segment_header(args)
+    for s in segments:
+        yield segment_line(s, args, now)
+        if args.show_token_ranges:
+            yield f"{'RANGE_START':>30}{'RANGE_END':>22}"
+            ranges = s['tokenRange']['tokenRanges']
+            if args.sort != 'none':
+                ranges = sorted(ranges, key=lambda i: i['start'])
+            for range in ranges:
+                yield f"{range['start']:30}{range['end']:22}"
+
+
+def format_duration(seconds):
+    return str(timedelta(seconds=round(seconds))) if seconds is not None else '-'
+
+
+def repair_segment_stats(r, args):
+    stats = segment_stats(r.get_repair_segments(args.id), datetime.now().timestamp() * 1000)
+    if args.json:
+        print(json.dumps(stats, indent=4))
+        return
+    print(f"{'SEGMENTS':14}{stats['segments']}")
+    print(f"{'STATES':14}{'  '.join(f'{k} {v}' for k, v in sorted(stats['states'].items()))}")
+    print(f"{'FAIL_COUNTS':14}{'  '.join(f'{k}: {v}' for k, v in stats['fail_counts'].items())}")
+    durations = '  '.join(f"p{p} {format_duration(stats['duration'][f'p{p}'])}" for p in PERCENTILES)
+    print(f"{'DURATION':14}{durations}  max {format_duration(stats['duration']['max'])}")
+    print(f"{'RUNNING':14}{stats['running']}  longest {format_duration(stats['running_max_duration'])}")
+    print()
+    print(f"{'HOST':40}{'SEGMENTS':>10}{'DONE':>10}{'SLOW(>=P90)':>13}{'MEAN_DURATION':>16}{'MAX_DURATION':>16}{'FAIL_COUNT':>12}")
+    for h in stats['hosts'][:args.top]:
+        print(f"{h['host']:40}{h['segments']:>10}{h['done']:>10}{h['slow_segments']:>13}"
+              f"{format_duration(h['mean_duration']):>16}{format_duration(h['max_duration']):>16}{h['fail_count']:>12}")
+
+
+def repair_info(r, args):
     info = r.get_repair(args.id)
     print(json.dumps(info, indent=4))
 
 
-def schedule_info(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
+def schedule_info(r, args):
     info = r.get_schedule(args.id)
     print(json.dumps(info, indent=4))
 
 
-def cluster_schedules_enable(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
-    schedules = r.get_cluster_schedules(args.cluster)
-    for schedule in schedules:
-        id = schedule['id']
-        keyspace = schedule['keyspace_name']
-        log.info(f"Enabling {keyspace} keyspace repair schedule...")
-        r.enable_schedule(id)
+def cluster_schedules_enable(r, args):
+    what = f"Enabling {args.cluster} cluster repair schedules"
+    schedules = needs_change(r.get_cluster_schedules(args.cluster), 'ACTIVE', what)
+    result = bulk(args, schedules, lambda s: r.enable_schedule(s['id']),
+                  lambda s: f"Enabling {s['cluster_name']} cluster {s['keyspace_name']} keyspace repair schedule",
+                  lambda s: f"schedule-enable {s['id']} --no-lookup")
+    result.log_summary(what)
+    return len(result.failed)
 
 
-def cluster_schedules_disable(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
+def cluster_schedules_disable(r, args):
     schedules = r.get_cluster_schedules(args.cluster)
-    for schedule in schedules:
-        id = schedule['id']
-        keyspace = schedule['keyspace_name']
-        log.info(f"Disabling {keyspace} keyspace repair schedule...")
-        r.disable_schedule(id)
+    return disable_schedules(r, args, schedules)
 
 
-def cluster_schedules_delete(args):
-    cluster_schedules_disable(args)
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
+def cluster_schedules_delete(r, args):
     schedules = r.get_cluster_schedules(args.cluster)
-    for schedule in schedules:
-        id = schedule['id']
-        keyspace = schedule['keyspace_name']
-        log.info(f"Deleting {keyspace} keyspace repair schedule...")
-        r.delete_schedule(id)
+    failed = disable_schedules(r, args, schedules)
+    result = bulk(args, schedules, lambda s: delete_schedule(r, s),
+                  lambda s: f"Deleting {s['cluster_name']} cluster {s['keyspace_name']} keyspace repair schedule",
+                  lambda s: f"schedule-delete {s['id']}")
+    result.log_summary(f"Deleting {args.cluster} cluster repair schedules")
+    return failed + len(result.failed)
 
 
-def cluster_repairs_resume(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
+def disable_schedules(r, args, schedules):
+    what = f"Disabling {args.cluster} cluster repair schedules"
+    result = bulk(args, needs_change(schedules, 'PAUSED', what), lambda s: r.disable_schedule(s['id']),
+                  lambda s: f"Disabling {s['cluster_name']} cluster {s['keyspace_name']} keyspace repair schedule",
+                  lambda s: f"schedule-disable {s['id']} --no-lookup")
+    result.log_summary(what)
+    return len(result.failed)
+
+
+def cluster_repairs_resume(r, args):
     repairs = r.get_repairs(args.cluster, ['PAUSED'])
     if len(repairs) == 0:
         log.info(f"No paused repairs of {args.cluster} cluster")
-    else:
-        for repair in repairs:
-            id = repair['id']
-            keyspace = repair['keyspace_name']
-            log.info(f"Resuming {keyspace} keyspace repair...")
-            r.resume_repair(id)
+        return 0
+    result = bulk(args, repairs, lambda repair: r.resume_repair(repair['id']),
+                  lambda repair: f"Resuming {repair['cluster_name']} cluster {repair['keyspace_name']} keyspace repair",
+                  lambda repair: f"repair-resume {repair['id']} --no-lookup")
+    result.log_summary(f"Resuming {args.cluster} cluster repairs")
+    return len(result.failed)
 
 
-def cluster_repairs_pause(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
-    repairs = r.get_repairs(args.cluster, ['RUNNING'])
+def cluster_repairs_pause(r, args):
+    return pause_repairs(r, args, r.get_repairs(args.cluster, ['RUNNING']))
+
+
+def pause_repairs(r, args, repairs):
     if len(repairs) == 0:
         log.info(f"No running repairs of {args.cluster} cluster")
-    else:
-        for repair in repairs:
-            id = repair['id']
-            keyspace = repair['keyspace_name']
-            log.info(f"Pausing {keyspace} keyspace repair...")
-            r.pause_repair(id)
+        return 0
+    result = bulk(args, repairs, lambda repair: r.pause_repair(repair['id']),
+                  lambda repair: f"Pausing {repair['cluster_name']} cluster {repair['keyspace_name']} keyspace repair",
+                  lambda repair: f"repair-pause {repair['id']} --no-lookup")
+    result.log_summary(f"Pausing {args.cluster} cluster repairs")
+    return len(result.failed)
 
 
-def cluster_repairs_abort(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
+def cluster_repairs_abort(r, args):
     repairs = r.get_repairs(args.cluster, ['RUNNING', 'PAUSED'])
     if len(repairs) == 0:
         log.info(f"No running or paused repairs of {args.cluster} cluster")
-    else:
-        for repair in repairs:
-            id = repair['id']
-            keyspace = repair['keyspace_name']
-            log.info(f"Aborting {keyspace} keyspace repair...")
-            r.abort_repair(id)
+        return 0
+    result = bulk(args, repairs, lambda repair: r.abort_repair(repair['id']),
+                  lambda repair: f"Aborting {repair['cluster_name']} cluster {repair['keyspace_name']} keyspace repair",
+                  lambda repair: f"repair-abort {repair['id']} --no-lookup")
+    result.log_summary(f"Aborting {args.cluster} cluster repairs")
+    return len(result.failed)
 
 
-def cluster_repairs_delete(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
+def cluster_repairs_intensity_change(r, args):
+    what = f"Changing {args.cluster} cluster repair intensity to {args.intensity}"
+    repairs = retry(lambda: r.get_repairs(args.cluster, ['RUNNING']), args.retries)
+    if len(repairs) == 0:
+        log.info(f"No running repairs of {args.cluster} cluster")
+        return 0
+    changed = [i for i in repairs if i['intensity'] != args.intensity]
+    if len(changed) < len(repairs):
+        log.info(f"{what}: {len(repairs) - len(changed)}/{len(repairs)} already have it, skipped")
+    result = bulk(args, changed,
+                  lambda repair: change_running_repair_intensity(r, repair, args.intensity, args.retries),
+                  lambda repair: f"Changing {repair['cluster_name']} cluster {repair['keyspace_name']} keyspace repair "
+                                 f"intensity from {repair['intensity']} to {args.intensity}",
+                  lambda repair: f"repair-pause {repair['id']} --no-lookup\n"
+                                 f"repair-intensity-change {repair['id']} {args.intensity} --no-lookup\n"
+                                 f"repair-resume {repair['id']} --no-lookup")
+    result.log_summary(what)
+    return len(result.failed)
+
+
+def change_running_repair_intensity(r, repair, intensity, retries):
+    """Pause a running repair, change its intensity and resume it.
+
+    Reaper changes intensity of paused repairs only. Whatever step fails, the
+    repair is resumed if it ended up PAUSED, and when that can't be done or
+    checked the error names the repair that may be left PAUSED.
+    """
+    name = f"{repair['cluster_name']} cluster {repair['keyspace_name']} keyspace repair {repair['id']}"
+    paused = False
+    try:
+        retry(lambda: r.pause_repair(repair['id']), retries)
+        paused = wait_repair_state(r, repair['id'], 'PAUSED', retries)
+        if not paused:
+            raise RuntimeError(f"{name} didn't get PAUSED")
+        retry(lambda: r.change_repair_intensity(repair['id'], intensity), retries)
+    except Exception:
+        if not paused:
+            # A failed pause request may still have paused the repair
+            try:
+                paused = retry(lambda: r.get_repair(repair['id']), retries)['state'] == 'PAUSED'
+            except Exception as e:
+                log.error(f"Can't check the state of {name}, it may be left PAUSED: {e}")
+        if paused:
+            # A failed resume is logged, the error of the failed step is the one to raise
+            with contextlib.suppress(Exception):
+                resume_paused_repair(r, repair['id'], name, retries)
+        raise
+    resume_paused_repair(r, repair['id'], name, retries)
+
+
+def resume_paused_repair(r, repair_id, name, retries):
+    """ Resume a repair paused by us and check it's RUNNING again"""
+    try:
+        retry(lambda: r.resume_repair(repair_id), retries)
+        if not wait_repair_state(r, repair_id, 'RUNNING', retries):
+            raise RuntimeError(f"{name} isn't RUNNING after resuming it")
+    except Exception as e:
+        log.error(f"Can't resume {name}, it may be left PAUSED: {e}")
+        raise
+
+
+def wait_repair_state(r, repair_id, state, attempts, delay=0.5):
+    """ Poll the repair with exponential backoff until it's in `state`, return whether it got there"""
+    for attempt in range(attempts):
+        if retry(lambda: r.get_repair(repair_id), attempts)['state'] == state:
+            return True
+        if attempt < attempts - 1:
+            time.sleep(delay * 2 ** attempt)
+    return False
+
+
+def cluster_repairs_delete(r, args):
     repairs = r.get_repairs(args.cluster)
     if len(repairs) == 0:
         log.info(f"{args.cluster} cluster has no repairs")
-    else:
-        for repair in repairs:
-            id = repair['id']
-            keyspace = repair['keyspace_name']
-            log.info(f"Deleting {keyspace} keyspace repair...")
-            r.delete_repair(id)
+        return 0
+    result = bulk(args, repairs, lambda repair: delete_repair(r, repair),
+                  lambda repair: f"Deleting {repair['cluster_name']} cluster {repair['keyspace_name']} keyspace repair",
+                  lambda repair: f"repair-delete {repair['id']}")
+    result.log_summary(f"Deleting {args.cluster} cluster repairs")
+    return len(result.failed)
 
 
-def repair_segment_abort(args):
-    r = CassandraReaper(args.url, args.username, args.password,
-                        not args.disable_ssl_verify)
+def repair_segment_abort(r, args):
     r.abort_repair_segment(args.id, args.segment_id)
 
 
@@ -0,0 +1,136 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import contextvars
+import io
+import json
+import shlex
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class ThreadOutput:
+    """Stream proxy that sends writes of a batch command to that command's buffer.
+
+    The buffer is a context variable, so threads of the command started with
+    ContextThreadPoolExecutor write to it as well.
+    """
+
+    def __init__(self, stream, name):
+        self.stream = stream
+        self.buffer = contextvars.ContextVar(f"batch_{name}", default=None)
+
+    @property
+    def target(self):
+        return self.buffer.get() or self.stream
+
+    def write(self, text):
+        return self.target.write(text)
+
+    def flush(self):
+        self.target.flush()
+
+    def isatty(self):
+        return self.target.isatty()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor running every call in a copy of the submitter's context, like asyncio does"""
+
+    def submit(self, fn, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def read_commands(lines):
+    """Yield (line number, text, argv, error) of every command in a batch file.
+
+    A line is either a shell-quoted command line or, when it starts with `[`
+    or `{`, JSON: an argv array or {"command": ..., "args": [...]}. Empty
+    lines and lines starting with # are skipped.
+    """
+    for n, line in enumerate(lines, 1):
+        text = line.strip()
+        if not text or text.startswith('#'):
+            continue
+        try:
+            if text[0] in '[{':
+                command = json.loads(text)
+                argv = command if isinstance(command, list) else [command['command'], *command.get('args', [])]
+                argv = [str(a) for a in argv]
+            else:
+                argv = shlex.split(text)
+        except (ValueError, KeyError, TypeError) as e:
+            yield n, text, None, f"Can't parse command: {e}"
+        else:
+            yield n, text, argv, None
+
+
+def run_command(execute, stdout, stderr, n, text, argv, error):
+    """Run one command with its output captured and return its result record"""
+    result = {'line': n, 'command': text, 'exit_code': 1, 'duration': 0.0, 'output': '', 'error': error}
+    if error:
+        return result
+    out, err = io.StringIO(), io.StringIO()
+    # Batch worker threads keep their context between commands, so the buffers are reset afterwards
+    tokens = stdout.buffer.set(out), stderr.buffer.set(err)
+    start = time.monotonic()
+    try:
+        result['exit_code'] = 1 if execute(argv) else 0
+    except SystemExit as e:
+        # argparse errors and handlers calling exit()
+        result['exit_code'] = e.code if isinstance(e.code, int) else int(e.code is not None)
+    except Exception as e:
+        result['error'] = str(e) or type(e).__name__
+    finally:
+        stdout.buffer.reset(tokens[0])
+        stderr.buffer.reset(tokens[1])
+    result['duration'] = round(time.monotonic() - start, 6)
+    result['output'] = out.getvalue()
+    if result['error'] is None and err.getvalue().strip():
+        # Last line of an argparse error is the message, the lines above are usage
+        result['error'] = err.getvalue().strip().splitlines()[-1]
+    return result
+
+
+def run_batch(commands, execute, parallel=1, fail_fast=False):
+    """Run commands with `execute(argv)` on `parallel` threads and yield results as they complete.
+
+    Commands are taken from the iterable as threads free up, so a batch can be
+    streamed in. stdout and stderr of every command (but not the log, which
+    keeps going to stderr) are captured into its result. With `fail_fast`
+    commands not started yet are skipped after the first failure.
+    """
+    stdout, stderr = ThreadOutput(sys.stdout, 'stdout'), ThreadOutput(sys.stderr, 'stderr')
+    sys.stdout, sys.stderr = stdout, stderr
+    commands = iter(commands)
+    try:
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            pending = set()
+            failed = False
+            while True:
+                for command in commands if not (failed and fail_fast) else ():
+                    pending.add(executor.submit(run_command, execute, stdout, stderr, *command))
+                    if len(pending) == parallel:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=lambda f: f.result()['line']):
+                    result = future.result()
+                    failed = failed or result['exit_code'] != 0
+                    yield result
+    finally:
+        sys.stdout, sys.stderr = stdout.stream, stderr.stream
+    for n, text, _, _ in commands:
+        yield {
+            'line': n,
+            'command': text,
+            'exit_code': None,
+            'duration': 0.0,
+            'output': '',
+            'error': 'Skipped after a failed command',
+        }
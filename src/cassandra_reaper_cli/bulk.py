@@ -0,0 +1,136 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import logging
+import random
+import re
+import threading
+import time
+
+from cassandra_reaper_cli.batch import ContextThreadPoolExecutor
+
+log = logging.getLogger('cassandra-reaper-cli')
+
+
+class RateLimiter:
+    """Spaces out calls so that no more than `rate` of them start per second"""
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_call = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Backoff:
+    """Exponential backoff delays with jitter.
+
+    Delays double from `initial` up to `maximum`, and each one is drawn from
+    its upper half, so many clients polling together don't stay in step.
+    """
+
+    def __init__(self, initial, maximum):
+        self.initial = initial
+        self.maximum = maximum
+        self.delay = initial
+
+    def next(self):
+        delay = self.delay
+        self.delay = min(self.maximum, self.delay * 2)
+        return random.uniform(delay / 2, delay)
+
+    def reset(self):
+        self.delay = self.initial
+
+
+def http_status(error):
+    """Status of an HTTPError raised by the API client, None for other errors"""
+    # requests is loaded by the API client by the time a call fails
+    from requests.exceptions import HTTPError
+
+    # The API client raises HTTPError with the status in the message only
+    status = re.search(r'Status: (\d+)', str(error)) if isinstance(error, HTTPError) else None
+    return int(status.group(1)) if status else None
+
+
+def is_transient(error):
+    """Connection errors, timeouts and 5xx responses, which are worth retrying"""
+    from requests.exceptions import ConnectionError, Timeout
+
+    if isinstance(error, (ConnectionError, Timeout)):
+        return True
+    status = http_status(error)
+    return status is not None and status >= 500
+
+
+def retry(call, attempts=3, delay=0.5):
+    """Return `call()`, retrying transient errors up to `attempts` times in total with exponential backoff"""
+    for attempt in range(attempts):
+        try:
+            return call()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_transient(e):
+                raise
+            log.warning(f"Retrying in {delay * 2 ** attempt:.1f}s after error: {e}")
+            time.sleep(delay * 2**attempt)
+
+
+class BulkResult:
+    def __init__(self, describe=str):
+        self.succeeded = []
+        self.failed = []
+        self.describe = describe
+        self.lock = threading.Lock()
+
+    def add(self, item, error=None):
+        with self.lock:
+            if error is None:
+                self.succeeded.append(item)
+            else:
+                self.failed.append((item, error))
+
+    def log_summary(self, what):
+        total = len(self.succeeded) + len(self.failed)
+        if not total:
+            return
+        if self.failed:
+            log.error(f"{what}: {len(self.succeeded)}/{total} succeeded, {len(self.failed)} failed")
+            # Errors of a large batch scroll away among the progress messages, so repeat them here
+            for item, error in self.failed:
+                log.error(f"  {self.describe(item)}: {error}")
+        else:
+            log.info(f"{what}: {total}/{total} succeeded")
+
+
+def run_bulk(items, action, describe, concurrency=1, limiter=None):
+    """Call `action` for every item on a pool of `concurrency` workers.
+
+    Failures are logged and collected instead of being raised, so one broken
+    item doesn't stop the rest of the batch.
+    """
+    result = BulkResult(describe)
+    limiter = limiter or RateLimiter()
+
+    def worker(item):
+        limiter.wait()
+        log.info(f"{describe(item)}...")
+        try:
+            action(item)
+        except Exception as e:
+            log.error(f"{describe(item)} failed: {e}")
+            result.add(item, e)
+        else:
+            result.add(item)
+
+    with ContextThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, items))
+    return result
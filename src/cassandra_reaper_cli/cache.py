@@ -0,0 +1,87 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+
+log = logging.getLogger('cassandra-reaper-cli')
+
+ACTIVE_REPAIR_STATES = ['RUNNING', 'PAUSED', 'NOT_STARTED']
+
+
+def cache_dir(url):
+    """Cache directory of a Reaper URL, shell completion functions compute the same path"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'cassandra-reaper-cli', re.sub('[^a-zA-Z0-9]', '_', url))
+
+
+class MetadataCache:
+    """On-disk cache of Reaper metadata.
+
+    Every entry is stored twice: as `<name>.json` with the full API response
+    for --cached list commands, and as plain `<name>` with one completion
+    value per line, so shell completion can read it without starting Python.
+    """
+
+    def __init__(self, url, ttl):
+        self.dir = cache_dir(url)
+        self.ttl = ttl
+
+    def get(self, name):
+        path = os.path.join(self.dir, f"{name}.json")
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, name, data, completions):
+        try:
+            self._write(f"{name}.json", json.dumps(data))
+            self._write(name, ''.join(f"{c}\n" for c in completions))
+        except OSError as e:
+            log.warning(f"Can't write {name} to cache: {e}")
+
+    def _write(self, name, text):
+        # Write to a temporary file and rename it, so readers never see a partial file
+        path = os.path.join(self.dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def clusters(self, r, cached=False):
+        clusters = self.get('clusters') if cached else None
+        if clusters is None:
+            clusters = r.get_clusters()
+            self.put('clusters', clusters, clusters)
+        return clusters
+
+    def tables(self, r, cluster, cached=False):
+        name = f"tables/{cluster}"
+        tables = self.get(name) if cached else None
+        if tables is None:
+            tables = r.get_cluster_tables(cluster)
+            self.put(name, tables, tables.keys())
+        return tables
+
+    def schedules(self, r, cached=False):
+        schedules = self.get('schedules') if cached else None
+        if schedules is None:
+            schedules = r.get_schedules()
+            self.put('schedules', schedules, (s['id'] for s in schedules))
+        return schedules
+
+    def repairs(self, r, cached=False):
+        repairs = self.get('repairs') if cached else None
+        if repairs is None:
+            repairs = r.get_repairs('', ACTIVE_REPAIR_STATES)
+            self.put('repairs', repairs, (i['id'] for i in repairs))
+        return repairs
@@ -0,0 +1,57 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import argparse
+
+# Completion functions only read files written by the metadata cache (see cache.py),
+# so a tab press never waits for Reaper. The cache is located by $REAPER_URL.
+PREAMBLE = {
+    'bash': r'''
+_reaper_cache_dir() {
+  echo "${XDG_CACHE_HOME:-$HOME/.cache}/cassandra-reaper-cli/${REAPER_URL//[^a-zA-Z0-9]/_}"
+}
+_reaper_cached() {
+  compgen -W "$(cat "$(_reaper_cache_dir)/$1" 2>/dev/null)" -- "$2"
+}
+_reaper_clusters() { _reaper_cached clusters "$1"; }
+_reaper_keyspaces() { _reaper_cached "tables/${COMP_WORDS[COMP_CWORD-1]}" "$1"; }
+_reaper_schedules() { _reaper_cached schedules "$1"; }
+_reaper_repairs() { _reaper_cached repairs "$1"; }
+''',
+    'zsh': r'''
+_reaper_cache_dir() {
+  echo "${XDG_CACHE_HOME:-$HOME/.cache}/cassandra-reaper-cli/${REAPER_URL//[^a-zA-Z0-9]/_}"
+}
+_reaper_cached() {
+  local -a items
+  items=(${(f)"$(cat "$(_reaper_cache_dir)/$1" 2>/dev/null)"})
+  compadd -a items
+}
+_reaper_clusters() { _reaper_cached clusters; }
+_reaper_keyspaces() { _reaper_cached "tables/${words[CURRENT-1]}"; }
+_reaper_schedules() { _reaper_cached schedules; }
+_reaper_repairs() { _reaper_cached repairs; }
+''',
+}
+
+COMPLETE_CLUSTER = {'bash': '_reaper_clusters', 'zsh': '_reaper_clusters'}
+COMPLETE_KEYSPACE = {'bash': '_reaper_keyspaces', 'zsh': '_reaper_keyspaces'}
+COMPLETE_SCHEDULE = {'bash': '_reaper_schedules', 'zsh': '_reaper_schedules'}
+COMPLETE_REPAIR = {'bash': '_reaper_repairs', 'zsh': '_reaper_repairs'}
+
+
+def add_completions(parser):
+    """Attach cache-backed completion functions to cluster, keyspace and ID arguments"""
+    for action in parser._actions:
+        if isinstance(action, argparse._SubParsersAction):
+            for subparser in action.choices.values():
+                add_completions(subparser)
+        elif action.dest == 'cluster':
+            action.complete = COMPLETE_CLUSTER
+        elif action.dest == 'keyspace' and not action.option_strings:
+            # Keyspaces are completed for the cluster argument before them, which options don't have
+            action.complete = COMPLETE_KEYSPACE
+        elif action.dest == 'id' and action.help == 'Schedule ID':
+            action.complete = COMPLETE_SCHEDULE
+        elif action.dest == 'id' and action.help == 'Repair ID':
+            action.complete = COMPLETE_REPAIR
@@ -0,0 +1,220 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cassandra_reaper_cli.query import parse_timestamp
+
+log = logging.getLogger('cassandra-reaper-cli')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def labels(**values):
+    return ','.join(f'{k}="{label_value(v)}"' for k, v in values.items())
+
+
+class Metrics:
+    """Prometheus text format of metric families and their samples"""
+
+    def __init__(self):
+        self.families = {}
+
+    def family(self, name, kind, description):
+        self.families[name] = (kind, description, [])
+
+    def sample(self, name, value, **sample_labels):
+        if value is not None:
+            sample = f"{name}{{{labels(**sample_labels)}}} {value}" if sample_labels else f"{name} {value}"
+            self.families[name][2].append(sample)
+
+    def text(self):
+        lines = []
+        for name, (kind, description, samples) in self.families.items():
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+            lines += samples
+        return '\n'.join(lines) + '\n'
+
+
+class Exporter:
+    """Repair state of a Reaper polled in the background and served as Prometheus metrics.
+
+    Every `interval` one list call fetches repairs in `states` and one fetches
+    all schedules. Segments are fetched only for RUNNING repairs and at most
+    every `segments_interval`, as they are the biggest responses. Metrics are
+    rendered once per poll, so scrapes only return the cached text and the
+    load on Reaper doesn't depend on how often Prometheus scrapes.
+    """
+
+    def __init__(self, r, states, interval, segments_interval, parallel_fetches):
+        self.r = r
+        self.states = states
+        self.interval = interval
+        self.segments_interval = segments_interval
+        self.parallel_fetches = parallel_fetches
+        self.repairs = []
+        self.schedules = []
+        # Repair ID: (fetch time, segment summary) of RUNNING repairs
+        self.segments = {}
+        self.polls = 0
+        self.errors = 0
+        self.up = 0
+        self.poll_duration = None
+        self.last_success = None
+        self.payload = self.render().encode()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            start = time.monotonic()
+            self.poll()
+            self.stopped.wait(max(0.0, self.interval - (time.monotonic() - start)))
+
+    def poll(self):
+        start = time.monotonic()
+        self.polls += 1
+        try:
+            self.repairs = self.r.get_repairs('', self.states)
+            self.schedules = self.r.get_schedules()
+            self.refresh_segments()
+        except Exception as e:
+            # Keep serving the last fetched state, reaper_up tells it's stale
+            self.errors += 1
+            self.up = 0
+            log.error(f"Polling Reaper failed: {e}")
+        else:
+            self.up = 1
+            self.last_success = time.time()
+        self.poll_duration = time.monotonic() - start
+        self.payload = self.render().encode()
+
+    def refresh_segments(self):
+        running = {i['id'] for i in self.repairs if i['state'] == 'RUNNING'}
+        now = time.monotonic()
+        self.segments = {k: v for k, v in self.segments.items() if k in running}
+        due = [i for i in running if i not in self.segments or now - self.segments[i][0] >= self.segments_interval]
+        with ThreadPoolExecutor(max_workers=self.parallel_fetches) as executor:
+            for repair_id, summary in zip(due, executor.map(self.segment_summary, due)):
+                self.segments[repair_id] = (now, summary)
+
+    def segment_summary(self, repair_id):
+        segments = self.r.get_repair_segments(repair_id)
+        now = time.time() * 1000
+        running = [now - s['startTime'] for s in segments if s['state'] == 'RUNNING' and s['startTime']]
+        return {
+            'states': Counter(s['state'] for s in segments),
+            'fail_count': sum(s['failCount'] for s in segments),
+            'running_max': max(running) / 1000 if running else None,
+        }
+
+    def render(self):
+        m = Metrics()
+        exporter = [
+            ('reaper_up', 'gauge', 'Whether the last poll of Reaper succeeded.', self.up),
+            ('reaper_exporter_polls_total', 'counter', 'Polls of Reaper.', self.polls),
+            ('reaper_exporter_poll_errors_total', 'counter', 'Failed polls of Reaper.', self.errors),
+            ('reaper_exporter_poll_duration_seconds', 'gauge', 'Duration of the last poll.', self.poll_duration),
+            (
+                'reaper_exporter_last_success_timestamp_seconds',
+                'gauge',
+                'End time of the last successful poll.',
+                self.last_success,
+            ),
+        ]
+        for name, kind, description, value in exporter:
+            m.family(name, kind, description)
+            m.sample(name, value)
+
+        m.family('reaper_repairs', 'gauge', 'Repairs by cluster, keyspace and state.')
+        for (cluster, keyspace, state), n in sorted(
+            Counter((i['cluster_name'], i['keyspace_name'], i['state']) for i in self.repairs).items()
+        ):
+            m.sample('reaper_repairs', n, cluster=cluster, keyspace=keyspace, state=state)
+        per_repair = [
+            ('reaper_repair_segments_repaired', 'Repaired segments of a repair.', 'segments_repaired'),
+            ('reaper_repair_segments_total', 'Segments of a repair.', 'total_segments'),
+            ('reaper_repair_intensity', 'Intensity of a repair.', 'intensity'),
+        ]
+        for name, description, key in per_repair:
+            m.family(name, 'gauge', description)
+            for i in self.repairs:
+                m.sample(
+                    name, i[key], cluster=i['cluster_name'], keyspace=i['keyspace_name'], id=i['id'], state=i['state']
+                )
+
+        m.family('reaper_repair_segments', 'gauge', 'Segments of a running repair by segment state.')
+        m.family('reaper_repair_segment_failures', 'gauge', 'Sum of segment fail counts of a running repair.')
+        m.family(
+            'reaper_repair_running_segment_max_seconds',
+            'gauge',
+            'Duration of the longest running segment of a running repair.',
+        )
+        for i in self.repairs:
+            if i['id'] not in self.segments:
+                continue
+            summary = self.segments[i['id']][1]
+            repair = dict(cluster=i['cluster_name'], keyspace=i['keyspace_name'], id=i['id'])
+            for state, n in sorted(summary['states'].items()):
+                m.sample('reaper_repair_segments', n, **repair, segment_state=state)
+            m.sample('reaper_repair_segment_failures', summary['fail_count'], **repair)
+            m.sample('reaper_repair_running_segment_max_seconds', summary['running_max'], **repair)
+
+        m.family('reaper_schedules', 'gauge', 'Repair schedules by cluster and state.')
+        for (cluster, state), n in sorted(Counter((s['cluster_name'], s['state']) for s in self.schedules).items()):
+            m.sample('reaper_schedules', n, cluster=cluster, state=state)
+        m.family(
+            'reaper_schedule_next_activation_timestamp_seconds', 'gauge', 'Next activation time of a repair schedule.'
+        )
+        for s in self.schedules:
+            m.sample(
+                'reaper_schedule_next_activation_timestamp_seconds',
+                parse_timestamp(s.get('next_activation')),
+                cluster=s['cluster_name'],
+                keyspace=s['keyspace_name'],
+                id=s['id'],
+                state=s['state'],
+            )
+        return m.text()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] == '/metrics':
+            body, content_type = self.server.exporter.payload, CONTENT_TYPE
+        else:
+            body, content_type = b'<html><body><a href="/metrics">Metrics</a></body></html>\n', 'text/html'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.debug(f"{self.address_string()} {format % args}")
+
+
+def serve(exporter, host, port):
+    """Poll Reaper in a background thread and serve its metrics until interrupted"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.exporter = exporter
+    poller = threading.Thread(target=exporter.run, name='reaper-poller', daemon=True)
+    poller.start()
+    log.info(f"Serving metrics on http://{host or '0.0.0.0'}:{server.server_address[1]}/metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exporter.stopped.set()
+        server.server_close()
@@ -0,0 +1,185 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import argparse
+import json
+import os
+import re
+import time
+from datetime import datetime, timezone
+
+from cassandra_reaper_cli.query import parse_duration, parse_timestamp
+
+TERMINAL_STATES = ['DONE', 'ERROR', 'ABORTED']
+
+COLUMNS = [
+    'id',
+    'creation_time',
+    'cluster_name',
+    'keyspace_name',
+    'state',
+    'cause',
+    'owner',
+    'intensity',
+    'segments_repaired',
+    'total_segments',
+    'start_time',
+    'end_time',
+    'duration',
+    'last_event',
+    'data',
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS repairs (
+    id TEXT PRIMARY KEY,
+    creation_time INTEGER,
+    cluster_name TEXT NOT NULL,
+    keyspace_name TEXT NOT NULL,
+    state TEXT NOT NULL,
+    cause TEXT,
+    owner TEXT,
+    intensity REAL,
+    segments_repaired INTEGER,
+    total_segments INTEGER,
+    start_time INTEGER,
+    end_time INTEGER,
+    duration INTEGER,
+    last_event TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS repairs_creation_time ON repairs (creation_time);
+CREATE INDEX IF NOT EXISTS repairs_end_time ON repairs (end_time);
+CREATE INDEX IF NOT EXISTS repairs_duration ON repairs (duration);
+CREATE INDEX IF NOT EXISTS repairs_keyspace ON repairs (cluster_name, keyspace_name, state, end_time, duration);
+"""
+
+
+def iso(column):
+    return f"strftime('%Y-%m-%dT%H:%M:%SZ', {column}, 'unixepoch')"
+
+
+# Query name: (description, SQL with {where} for the --cluster, --keyspace and --since conditions)
+QUERIES = {
+    'durations': (
+        'Repair duration per keyspace, slowest on average first',
+        f"""
+        SELECT cluster_name, keyspace_name, COUNT(*) AS repairs, CAST(AVG(duration) AS INTEGER) AS avg_duration,
+               MAX(duration) AS max_duration, {iso('MAX(end_time)')} AS last_end_time
+        FROM repairs WHERE state = 'DONE' AND {{where}}
+        GROUP BY cluster_name, keyspace_name ORDER BY AVG(duration) DESC LIMIT ?""",
+    ),
+    'failures': (
+        'Share of repairs ending in ERROR or ABORTED per cluster, highest first',
+        """
+        SELECT cluster_name, COUNT(*) AS repairs, SUM(state = 'DONE') AS done, SUM(state = 'ERROR') AS error,
+               SUM(state = 'ABORTED') AS aborted, ROUND(100.0 * SUM(state != 'DONE') / COUNT(*), 1) AS failure_pct
+        FROM repairs WHERE {where}
+        GROUP BY cluster_name ORDER BY failure_pct DESC, repairs DESC LIMIT ?""",
+    ),
+    'slowest': (
+        'Slowest repairs, ending since the start of this month unless --since is set',
+        f"""
+        SELECT id, cluster_name, keyspace_name, state, {iso('start_time')} AS start_time,
+               {iso('end_time')} AS end_time, duration
+        FROM repairs WHERE duration IS NOT NULL AND {{where}}
+        ORDER BY duration DESC LIMIT ?""",
+    ),
+}
+
+
+def history_path(url):
+    """Default history database of a Reaper URL, next to other user data"""
+    base = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(base, 'cassandra-reaper-cli', re.sub('[^a-zA-Z0-9]', '_', url), 'history.sqlite')
+
+
+def since_timestamp(text):
+    """Type function for argparse - a date (2023-05-01), a time or a duration ago (30d) to seconds since epoch"""
+    try:
+        return time.time() - parse_duration(text)
+    except ValueError:
+        pass
+    try:
+        moment = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"{text} is neither a date like 2023-05-01 nor a duration like 30d") from e
+    return (moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def month_start():
+    return datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+def row(repair, data):
+    start, end = parse_timestamp(repair.get('start_time')), parse_timestamp(repair.get('end_time'))
+    values = dict(repair, data=data, duration=round(end - start) if start and end else None)
+    for name in ('creation_time', 'start_time', 'end_time'):
+        timestamp = parse_timestamp(repair.get(name))
+        values[name] = round(timestamp) if timestamp is not None else None
+    return [values.get(c) for c in COLUMNS]
+
+
+class History:
+    """Local SQLite store of repair runs in terminal states.
+
+    Reaper only lists all runs, so every sync downloads them, but runs are
+    compared with the stored ones and only new or changed rows are written.
+    Runs stay in the store after Reaper purges them from its own history.
+    """
+
+    def __init__(self, path, readonly=False):
+        # sqlite3 loads a shared library, so it's imported only by the history commands
+        import sqlite3
+
+        self.error = sqlite3.Error
+        if readonly:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No repair history in {path}, run history-sync first")
+            self.db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.db = sqlite3.connect(path)
+            self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def store(self, cluster, repairs):
+        """Write new and changed runs of a cluster in one transaction and return their numbers"""
+        stored = dict(self.db.execute('SELECT id, data FROM repairs WHERE cluster_name = ?', (cluster,)))
+        rows = []
+        inserted = 0
+        for repair in repairs:
+            data = json.dumps(repair, sort_keys=True, separators=(',', ':'))
+            if stored.get(repair['id']) != data:
+                inserted += repair['id'] not in stored
+                rows.append(row(repair, data))
+        with self.db:
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO repairs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                rows,
+            )
+        return inserted, len(rows) - inserted
+
+    def query(self, name, cluster=None, keyspace=None, since=None, limit=None):
+        conditions, params = ['1'], []
+        for column, value in (('cluster_name', cluster), ('keyspace_name', keyspace)):
+            if value:
+                conditions.append(f"{column} GLOB ?")
+                params.append(value)
+        if since is None and name == 'slowest':
+            since = month_start()
+        if since is not None:
+            conditions.append('end_time >= ?')
+            params.append(since)
+        return self.sql(QUERIES[name][1].format(where=' AND '.join(conditions)), params + [limit or -1])
+
+    def sql(self, statement, params=()):
+        """Rows of a query as dicts, with column names of the result even when it's empty"""
+        try:
+            cursor = self.db.execute(statement, params)
+        except self.error as e:
+            raise ValueError(f"Query failed: {e}") from e
+        columns = [c[0] for c in cursor.description or ()]
+        return columns, [dict(zip(columns, r)) for r in cursor]
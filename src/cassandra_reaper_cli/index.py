@@ -0,0 +1,109 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import accumulate
+
+# Beyond any Murmur3 or RandomPartitioner token, the ends of split wraparound ranges
+RING_MIN = -(2**128)
+RING_MAX = 2**128
+
+
+def contains(positions, p):
+    i = bisect_left(positions, p)
+    return i < len(positions) and positions[i] == p
+
+
+class SegmentIndex:
+    """Token range index over the segments of a repair.
+
+    Token ranges, with wraparound ranges split in two, are kept as parallel
+    lists sorted by start, plus the running maximum of their ends. Ranges
+    containing a token are found by bisecting for the last range starting
+    before it and walking back while the running maximum still reaches the
+    token, which is a single step when ranges don't overlap, as in a repair.
+
+    Segments are numbered by position in token order, and positions of every
+    host and every state are kept in sorted lists. A lookup walks the shortest
+    list of the given criteria and keeps the positions found in the others,
+    by bisecting them or through their sets, so its cost depends on the
+    matches and not on the number of segments.
+    """
+
+    def __init__(self, segments):
+        self.segments = segments
+        ranges = []
+        for n, s in enumerate(segments):
+            token_range = s['tokenRange']
+            for r in token_range.get('tokenRanges') or [token_range['baseRange']]:
+                start, end = int(r['start']), int(r['end'])
+                # Cassandra ranges are (start, end], a range with end <= start wraps around the ring
+                if start < end:
+                    ranges.append((start, end, n))
+                else:
+                    ranges.append((start, RING_MAX, n))
+                    ranges.append((RING_MIN, end, n))
+        # Reaper returns ranges of a repair in token order, so this sort is mostly a linear pass
+        ranges.sort()
+        self.starts = [r[0] for r in ranges]
+        self.ends = [r[1] for r in ranges]
+        self.owners = [r[2] for r in ranges]
+        self.max_ends = list(accumulate(self.ends, max))
+        # Segments are in token order of their first range, not counting wrapped tails
+        order, seen = [], bytearray(len(segments))
+        for start, _, n in ranges:
+            if start != RING_MIN and not seen[n]:
+                seen[n] = 1
+                order.append(n)
+        self.ordered = [segments[n] for n in order]
+        self.position = [0] * len(segments)
+        for p, n in enumerate(order):
+            self.position[n] = p
+        self.by_host, self.by_state = defaultdict(list), defaultdict(list)
+        for p, s in enumerate(self.ordered):
+            self.by_state[s['state']].append(p)
+            for host in s['replicas']:
+                self.by_host[host].append(p)
+        # Sets of the position lists, made when a lookup combines them with a shorter one
+        self.sets = {}
+
+    def by_token(self, token):
+        """Positions of segments whose ranges contain `token`, in token order"""
+        found = set()
+        i = bisect_left(self.starts, token) - 1
+        while i >= 0 and self.max_ends[i] >= token:
+            if self.ends[i] >= token:
+                found.add(self.position[self.owners[i]])
+            i -= 1
+        return sorted(found)
+
+    def members(self, key, positions):
+        """Set of a host or state position list, kept for later lookups"""
+        if key is None:
+            return set(positions)
+        if key not in self.sets:
+            self.sets[key] = set(positions)
+        return self.sets[key]
+
+    def find(self, token=None, host=None, state=None):
+        """Segments matching all given criteria, in token order"""
+        criteria = []
+        if token is not None:
+            criteria.append((None, self.by_token(token)))
+        if host is not None:
+            criteria.append((('host', host), self.by_host.get(host, [])))
+        if state is not None:
+            criteria.append((('state', state), self.by_state.get(state, [])))
+        if not criteria:
+            return list(self.ordered)
+        criteria.sort(key=lambda c: len(c[1]))
+        positions = criteria[0][1]
+        for key, other in criteria[1:]:
+            if len(positions) * 16 < len(other):
+                # A few bisects in a long sorted list are cheaper than making its set
+                positions = [p for p in positions if contains(other, p)]
+            else:
+                members = self.members(key, other)
+                positions = [p for p in positions if p in members]
+        return list(map(self.ordered.__getitem__, positions))
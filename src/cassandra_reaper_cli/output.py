@@ -0,0 +1,69 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import csv
+import json
+import sys
+
+FORMATS = ['table', 'json', 'ndjson', 'csv']
+
+# Rows are written in chunks of this size and flushed, so the first rows reach
+# a pipe right away while large outputs don't pay for one write per row
+CHUNK_SIZE = 256
+
+
+def output_format(args):
+    return 'json' if getattr(args, 'json', False) else args.format
+
+
+def write_lines(lines, out=None):
+    out = out or sys.stdout
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == CHUNK_SIZE:
+            out.write('\n'.join(chunk) + '\n')
+            out.flush()
+            chunk.clear()
+    if chunk:
+        out.write('\n'.join(chunk) + '\n')
+    out.flush()
+
+
+def write_ndjson(items, out=None):
+    write_lines((json.dumps(i, separators=(',', ':')) for i in items), out)
+
+
+def write_csv(header, rows, out=None):
+    out = out or sys.stdout
+    writer = csv.writer(out, lineterminator='\n')
+    writer.writerow(header)
+    for n, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if n % CHUNK_SIZE == 0:
+            out.flush()
+    out.flush()
+
+
+def cell(value):
+    """Text of a field value in csv and table output, nested values as compact JSON"""
+    if value is None:
+        return ''
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, separators=(',', ':'))
+    return str(value)
+
+
+def write_items(items, fields, fmt, out=None):
+    """Write API items, already projected to `fields`, in a FORMATS format with compact JSON"""
+    if fmt == 'json':
+        (out or sys.stdout).write(json.dumps(items, separators=(',', ':')) + '\n')
+    elif fmt == 'ndjson':
+        write_ndjson(items, out)
+    elif fmt == 'csv':
+        write_csv(fields, ([cell(i[f]) for f in fields] for i in items), out)
+    else:
+        rows = [[cell(i[f]) for f in fields] for i in items]
+        widths = [max([len(f)] + [len(row[n]) for row in rows]) + 2 for n, f in enumerate(fields)]
+        header = ''.join(f"{f.upper():{w}}" for f, w in zip(fields, widths)).rstrip()
+        write_lines([header] + [''.join(f"{v:{w}}" for v, w in zip(row, widths)).rstrip() for row in rows], out)
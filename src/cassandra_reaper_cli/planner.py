@@ -0,0 +1,193 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import json
+import logging
+import math
+import statistics
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from cassandra_reaper_cli.query import parse_timestamp
+
+log = logging.getLogger('cassandra-reaper-cli')
+
+DAY = 86400
+
+
+def estimate_durations(repairs, recent=10):
+    """Median duration in seconds of the `recent` last DONE repairs of every (cluster, keyspace)"""
+    runs = defaultdict(list)
+    for repair in repairs:
+        start, end = parse_timestamp(repair.get('start_time')), parse_timestamp(repair.get('end_time'))
+        if repair['state'] == 'DONE' and start and end and end > start:
+            runs[(repair['cluster_name'], repair['keyspace_name'])].append((end, end - start))
+    return {key: statistics.median(d for _, d in sorted(values)[-recent:]) for key, values in runs.items()}
+
+
+class Timeline:
+    """Repairs a cluster runs in every `bucket` seconds from `start` until `end`.
+
+    A schedule fires at its next activation and then every period, and each
+    run occupies every bucket it overlaps for its estimated duration.
+    """
+
+    def __init__(self, start, end, bucket):
+        self.start = start
+        self.end = end
+        self.bucket = bucket
+        self.size = int(math.ceil((end - start) / bucket))
+        self.keyspaces = defaultdict(list)
+
+    def buckets(self, first, period, duration):
+        occupied = []
+        activation = max(first, self.start)
+        while activation < self.end:
+            begin = int((activation - self.start) // self.bucket)
+            finish = int(math.ceil((activation + duration - self.start) / self.bucket))
+            occupied += range(begin, min(finish, self.size))
+            activation += period
+        return occupied
+
+    def add(self, buckets, keyspace):
+        for b in buckets:
+            self.keyspaces[b].append(keyspace)
+
+    def excess(self, buckets, limit):
+        """Repairs over `limit` that one more run in `buckets` would add up to"""
+        return sum(max(0, len(self.keyspaces[b]) + 1 - limit) for b in buckets)
+
+    def hot_spots(self, limit):
+        """Windows of consecutive buckets with more than `limit` repairs, with their peak and keyspaces"""
+        windows = []
+        for b in sorted(b for b, keyspaces in self.keyspaces.items() if len(keyspaces) > limit):
+            if windows and windows[-1]['last'] == b - 1:
+                window = windows[-1]
+            else:
+                window = {'first': b, 'peak': 0, 'keyspaces': set()}
+                windows.append(window)
+            window['last'] = b
+            window['peak'] = max(window['peak'], len(self.keyspaces[b]))
+            window['keyspaces'].update(self.keyspaces[b])
+        return [
+            {
+                'start': self.start + w['first'] * self.bucket,
+                'end': self.start + (w['last'] + 1) * self.bucket,
+                'peak': w['peak'],
+                'keyspaces': sorted(w['keyspaces']),
+            }
+            for w in windows
+        ]
+
+    def peak(self):
+        return max((len(k) for k in self.keyspaces.values()), default=0)
+
+
+def plan_cluster(schedules, durations, default_duration, now, horizon, bucket, limit):
+    """Project ACTIVE schedules of a cluster and propose activations that level the load.
+
+    Schedules are placed longest repair first, each at the smallest shift
+    (in whole buckets, less than its period) that adds the fewest repairs
+    over `limit` running at once, so schedules that fit stay where they are.
+    """
+    items = []
+    for s in schedules:
+        if s['state'] != 'ACTIVE' or not s.get('next_activation'):
+            continue
+        duration = durations.get((s['cluster_name'], s['keyspace_name']), default_duration)
+        period = max(1, s['scheduled_days_between']) * DAY
+        items.append((s, parse_timestamp(s['next_activation']), period, duration))
+
+    current = Timeline(now, now + horizon, bucket)
+    for s, first, period, duration in items:
+        current.add(current.buckets(first, period, duration), s['keyspace_name'])
+
+    planned = Timeline(now, now + horizon, bucket)
+    moves = []
+    for s, first, period, duration in sorted(items, key=lambda i: (-i[3], i[1])):
+        start = max(first, now)
+        best = None
+        for n in range(int(period // bucket)):
+            shift = n * bucket
+            buckets = planned.buckets(start + shift, period, duration)
+            excess = planned.excess(buckets, limit)
+            if best is None or excess < best[0]:
+                best = (excess, shift, buckets)
+            if excess == 0:
+                break
+        planned.add(best[2], s['keyspace_name'])
+        if best[1]:
+            moves.append(
+                {
+                    'schedule': s,
+                    'duration': duration,
+                    'shift': best[1],
+                    'next_activation': first,
+                    'proposed_activation': start + best[1],
+                }
+            )
+    return {
+        'schedules': len(items),
+        'peak': current.peak(),
+        'hot_spots': current.hot_spots(limit),
+        'planned_peak': planned.peak(),
+        'planned_hot_spots': planned.hot_spots(limit),
+        'moves': sorted(moves, key=lambda m: m['proposed_activation']),
+    }
+
+
+def schedule_settings(s):
+    """add_schedule() arguments that recreate schedule `s`, but its trigger time"""
+    return dict(
+        cluster=s['cluster_name'],
+        keyspace=s['keyspace_name'],
+        owner=s['owner'],
+        schedule_days_between=s['scheduled_days_between'],
+        segment_count_per_node=s.get('segment_count_per_node') or 0,
+        intensity=s.get('intensity') or 0.0,
+        repair_parallelism=s.get('repair_parallelism') or 'DATACENTER_AWARE',
+        repair_thread_count=s.get('repair_thread_count') or 1,
+        nodes=s.get('nodes') or [],
+        datacenters=s.get('datacenters') or [],
+        tables=s.get('column_families') or [],
+        blacklisted_tables=s.get('blacklisted_tables') or [],
+        incremental_repair=bool(s.get('incremental_repair')),
+        adaptive=bool(s.get('adaptive')),
+        percent_unrepaired_threshold=s.get('percent_unrepaired_threshold', -1),
+    )
+
+
+def apply_move(r, move, delete_schedule):
+    """Recreate a schedule with its proposed trigger time.
+
+    Reaper can't change the trigger time of a schedule and rejects a second
+    schedule of the same keyspace, so the old one is disabled and deleted
+    first. `delete_schedule(r, schedule)` deletes with the known owner. When
+    adding the moved schedule fails, the original is added back, and its
+    settings are logged in case that fails too.
+    """
+    s = move['schedule']
+    settings = schedule_settings(s)
+    what = f"{s['cluster_name']} cluster {s['keyspace_name']} keyspace repair schedule {s['id']}"
+    r.disable_schedule(s['id'])
+    delete_schedule(r, s)
+    try:
+        r.add_schedule(
+            **settings, schedule_trigger_time=datetime.fromtimestamp(move['proposed_activation'], timezone.utc)
+        )
+    except Exception as e:
+        log.error(
+            f"Adding moved {what} failed: {e}. Adding it back with its next activation "
+            f"{s['next_activation']} and settings {json.dumps(settings)}"
+        )
+        # Reaper refuses trigger times in the past, an overdue schedule fires now
+        original = max(move['next_activation'], time.time())
+        try:
+            r.add_schedule(**settings, schedule_trigger_time=datetime.fromtimestamp(original, timezone.utc))
+        except Exception as restore_error:
+            log.error(
+                f"Adding back {what} failed: {restore_error}. The keyspace has no repair schedule, "
+                f"recreate it with the settings above"
+            )
+        raise
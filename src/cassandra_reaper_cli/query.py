@@ -0,0 +1,157 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import argparse
+import heapq
+import re
+import time
+from datetime import datetime, timezone
+from fnmatch import fnmatchcase
+
+# Short names of item fields usable in --filter, --fields and --sort
+ALIASES = {'cluster': 'cluster_name', 'keyspace': 'keyspace_name'}
+
+# Age in seconds since creation, computed for filters
+AGE = 'age'
+
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+FILTER_RE = re.compile(r'^\s*([A-Za-z_]+)\s*(!=|!~|<=|>=|=|~|<|>)\s*(.*?)\s*$')
+
+
+def parse_timestamp(value):
+    """Seconds since epoch of a Reaper timestamp like 2023-05-01T10:00:00Z, None when it's not set"""
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return (moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def parse_duration(text):
+    """Seconds of a duration like 90, 30m, 12h, 7d or 2w"""
+    unit = text[-1:].lower()
+    if unit in DURATION_UNITS:
+        return float(text[:-1]) * DURATION_UNITS[unit]
+    return float(text)
+
+
+def field_name(name):
+    return ALIASES.get(name, name)
+
+
+class Filter:
+    """One --filter expression: FIELD OP VALUE.
+
+    `=` and `!=` match glob patterns, a comma separated list matches any of
+    them. `~` and `!~` search a regular expression. `<`, `>`, `<=` and `>=`
+    compare numbers, or strings such as timestamps. The `age` field is the
+    time since creation_time and takes durations like 12h or 7d.
+    """
+
+    def __init__(self, text):
+        match = FILTER_RE.match(text)
+        if not match:
+            raise argparse.ArgumentTypeError(f"{text} is not a FIELD OP VALUE expression, e.g. keyspace~^audit")
+        name, self.op, self.value = match.groups()
+        self.field = field_name(name)
+        try:
+            if self.op in ('~', '!~'):
+                self.regex = re.compile(self.value)
+            elif self.op in ('=', '!='):
+                self.patterns = self.value.split(',')
+            elif self.field == AGE:
+                self.bound = parse_duration(self.value)
+            else:
+                self.bound = float(self.value)
+        except re.error as e:
+            raise argparse.ArgumentTypeError(f"{text}: {e}") from e
+        except ValueError as e:
+            if self.field == AGE:
+                raise argparse.ArgumentTypeError(f"{text}: age must be a duration like 12h or 7d") from e
+            self.bound = self.value
+
+    def exact_values(self, field):
+        """Values this filter requires `field` to have, None when it's not such an equality"""
+        if self.field != field or self.op != '=' or any(c in self.value for c in '*?['):
+            return None
+        return self.patterns
+
+    def __call__(self, item, now):
+        if self.field == AGE:
+            created = parse_timestamp(item.get('creation_time'))
+            value = now - created if created is not None else None
+        else:
+            value = item.get(self.field)
+        if self.op in ('=', '!='):
+            text = '' if value is None else str(value)
+            return any(fnmatchcase(text, p) for p in self.patterns) == (self.op == '=')
+        if self.op in ('~', '!~'):
+            return bool(self.regex.search('' if value is None else str(value))) == (self.op == '~')
+        if value is None:
+            return False
+        if isinstance(self.bound, float):
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return False
+        else:
+            value = str(value)
+        return {'<': value < self.bound, '>': value > self.bound, '<=': value <= self.bound, '>=': value >= self.bound}[
+            self.op
+        ]
+
+
+def pushed_down(filters, field):
+    """Values of `field` every matching item has, to pass as a query parameter, None if not known"""
+    for f in filters or ():
+        values = f.exact_values(field)
+        if values is not None:
+            return values
+    return None
+
+
+def sort_keys(text):
+    """Type function for argparse - FIELD[,-FIELD...] to [(field, descending)]"""
+    keys = [(field_name(k.lstrip('-')), k.startswith('-')) for k in text.split(',') if k.strip('-')]
+    if not keys:
+        raise argparse.ArgumentTypeError(f"{text} has no fields")
+    return keys
+
+
+def field_list(text):
+    return [field_name(f) for f in text.split(',') if f]
+
+
+def sort_value(item, field, descending=False):
+    # Missing values sort last in both directions, and numbers and strings never get compared with each other
+    value = item.get(field)
+    return ((value is None) != descending, isinstance(value, str), value if value is not None else 0)
+
+
+def select(items, filters=None, keys=None, limit=None):
+    """Filter, sort and cut items in one pass over them.
+
+    With a limit and sort keys in one direction only the best `limit` items are
+    kept on a heap, instead of sorting everything that matched.
+    """
+    now = time.time()
+    matching = (i for i in items if all(f(i, now) for f in filters or ()))
+    if not keys:
+        return list(matching)[:limit] if limit else list(matching)
+
+    def key(item):
+        return tuple(sort_value(item, field, descending) for field, descending in keys)
+
+    directions = {descending for _, descending in keys}
+    if limit and len(directions) == 1:
+        return (heapq.nlargest if True in directions else heapq.nsmallest)(limit, matching, key=key)
+    matching = list(matching)
+    # Stable sorts from the last key to the first, each in its own direction
+    for field, descending in reversed(keys):
+        matching.sort(key=lambda i: sort_value(i, field, descending), reverse=descending)
+    return matching[:limit] if limit else matching
+
+
+def project(items, fields):
+    """Items with only `fields`, in that order"""
+    return [{f: i.get(f) for f in fields} for i in items]
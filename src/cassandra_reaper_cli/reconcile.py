@@ -0,0 +1,135 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import json
+from fnmatch import fnmatchcase
+
+STATES = ('ACTIVE', 'PAUSED', 'ABSENT')
+
+# Schedule fields that a repair schedule PATCH can change, with their types
+SETTINGS = {
+    'owner': str,
+    'repair_parallelism': str,
+    'intensity': float,
+    'scheduled_days_between': int,
+    'segment_count_per_node': int,
+    'percent_unrepaired_threshold': int,
+    'adaptive': bool,
+}
+
+
+def load_desired(f):
+    """Read a desired state file, YAML when PyYAML is installed or JSON.
+
+    The file has a list of rules under `schedules`. A rule selects schedules
+    by `cluster` and `keyspace` glob patterns (default "*") and sets `state`
+    (ACTIVE, PAUSED or ABSENT to delete) and any of SETTINGS. Rules are
+    applied in order, so later rules override earlier ones. Schedules not
+    selected by any rule are left as they are.
+    """
+    text = f.read()
+    try:
+        import yaml
+    except ImportError:
+        try:
+            desired = json.loads(text)
+        except ValueError as e:
+            raise ValueError(f"Can't parse {f.name} as JSON ({e}), install cassandra-reaper-cli[yaml] for YAML") from e
+    else:
+        try:
+            desired = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Can't parse {f.name}: {e}") from e
+    if not isinstance(desired, dict) or not isinstance(desired.get('schedules'), list):
+        raise ValueError(f"{f.name} must have a list of rules under `schedules`")
+    return [validate_rule(n, rule) for n, rule in enumerate(desired['schedules'], 1)]
+
+
+def validate_rule(n, rule):
+    if not isinstance(rule, dict):
+        raise ValueError(f"Rule {n} must be a mapping")
+    unknown = set(rule) - {'cluster', 'keyspace', 'state'} - set(SETTINGS)
+    if unknown:
+        raise ValueError(f"Rule {n} has unknown fields: {', '.join(sorted(unknown))}")
+    if 'state' in rule and rule['state'] not in STATES:
+        raise ValueError(f"Rule {n} state must be one of {', '.join(STATES)}")
+    rule = dict(rule)
+    for name, kind in SETTINGS.items():
+        if name in rule:
+            if kind is bool and not isinstance(rule[name], bool):
+                raise ValueError(f"Rule {n} {name} must be true or false")
+            try:
+                rule[name] = kind(rule[name])
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Rule {n} {name} must be {kind.__name__}") from e
+    rule['cluster'] = str(rule.get('cluster', '*'))
+    rule['keyspace'] = str(rule.get('keyspace', '*'))
+    return rule
+
+
+def desired_schedule(rules, schedule):
+    """Merged fields of all rules selecting the schedule, None when no rule does"""
+    desired = None
+    for rule in rules:
+        if fnmatchcase(schedule['cluster_name'], rule['cluster']) and fnmatchcase(
+            schedule['keyspace_name'], rule['keyspace']
+        ):
+            desired = desired or {}
+            desired.update((k, v) for k, v in rule.items() if k not in ('cluster', 'keyspace'))
+    return desired
+
+
+def plan(schedules, rules):
+    """Minimal changes that bring schedules to the desired state.
+
+    Every change is a dict with the schedule, `settings` as {field: (current,
+    desired)} to update, and `state` as (current, desired) when
+    the schedule has to be enabled, disabled or deleted (desired ABSENT).
+    """
+    changes = []
+    for s in sorted(schedules, key=lambda s: (s['cluster_name'], s['keyspace_name'], s['id'])):
+        desired = desired_schedule(rules, s)
+        if desired is None:
+            continue
+        state = desired.get('state', s['state'])
+        settings = (
+            {}
+            if state == 'ABSENT'
+            else {k: (s.get(k), v) for k, v in desired.items() if k in SETTINGS and s.get(k) != v}
+        )
+        if settings or state != s['state']:
+            changes.append(
+                {'schedule': s, 'settings': settings, 'state': (s['state'], state) if state != s['state'] else None}
+            )
+    return changes
+
+
+def describe_change(change):
+    parts = [f"{k}: {old} -> {new}" for k, (old, new) in change['settings'].items()]
+    if change['state']:
+        parts.append(f"state: {change['state'][0]} -> {change['state'][1]}")
+    return ', '.join(parts)
+
+
+def apply_change(r, change, update_schedule, delete_schedule):
+    """Apply one schedule change, settings first so a schedule is enabled with them.
+
+    `update_schedule(r, id, fields)` sends the current settings Reaper
+    returned with the desired ones, and never the settings it omitted, which
+    would be sent as null. A schedule is disabled before it's deleted, Reaper
+    deletes only paused schedules. `delete_schedule(r, schedule)` deletes
+    with the known owner.
+    """
+    s = change['schedule']
+    if change['settings']:
+        fields = {k: s[k] for k in SETTINGS if s.get(k) is not None}
+        fields.update((k, new) for k, (_, new) in change['settings'].items())
+        update_schedule(r, s['id'], fields)
+    if change['state']:
+        current, desired = change['state']
+        if desired == 'ACTIVE':
+            r.enable_schedule(s['id'])
+        elif current == 'ACTIVE':
+            r.disable_schedule(s['id'])
+        if desired == 'ABSENT':
+            delete_schedule(r, s)
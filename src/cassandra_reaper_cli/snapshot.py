@@ -0,0 +1,49 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import json
+import os
+import re
+import tempfile
+import time
+
+
+def snapshot_path(url, cluster):
+    """Snapshot file of a cluster of a Reaper URL, under $XDG_STATE_HOME as it outlives any cache"""
+    base = os.environ.get('XDG_STATE_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'state')
+    return os.path.join(
+        base,
+        'cassandra-reaper-cli',
+        re.sub('[^a-zA-Z0-9]', '_', url),
+        'snapshots',
+        f"{re.sub('[^a-zA-Z0-9_.-]', '_', cluster)}.json",
+    )
+
+
+def load_snapshot(path):
+    """Saved snapshot, None when there is none"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_snapshot(path, cluster, schedules, repairs):
+    """Save IDs of the ACTIVE `schedules` and RUNNING `repairs` of a cluster.
+
+    Items of a snapshot that was never restored are kept, so disabling a
+    cluster twice doesn't lose what the first disable paused. Returns the
+    saved snapshot.
+    """
+    snapshot = load_snapshot(path) or {'cluster': cluster, 'schedules': [], 'repairs': []}
+    for key, items in (('schedules', schedules), ('repairs', repairs)):
+        known = {i['id'] for i in snapshot[key]}
+        snapshot[key] += [{'id': i['id'], 'keyspace_name': i['keyspace_name']} for i in items if i['id'] not in known]
+    snapshot['time'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'w') as f:
+        json.dump(snapshot, f, indent=4)
+    os.replace(tmp, path)
+    return snapshot
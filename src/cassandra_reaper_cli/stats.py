@@ -0,0 +1,205 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import math
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from cassandra_reaper_cli.query import parse_timestamp
+
+PERCENTILES = (50, 90, 99)
+
+# A gap between segment completions this many times the mean of the other intervals, and this many times the
+# longest segment with the wait after it at the current intensity, is taken for a pause
+PAUSE_GAP_FACTOR = 10
+PAUSE_CYCLES = 2
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted sequence"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def segment_stats(segments, now, slow_percentile=90):
+    """Aggregate repair segments in a single pass.
+
+    Durations of completed segments are collected into flat float arrays,
+    once for the whole repair and once per replica host, so percentiles and
+    per-host slow-segment counts are computed on sorted arrays with bisect
+    instead of re-walking the segment dicts.
+    """
+    states = Counter()
+    fail_counts = Counter()
+    host_segments = Counter()
+    host_fails = Counter()
+    host_durations = defaultdict(lambda: array('d'))
+    durations = array('d')
+    running = array('d')
+    for s in segments:
+        states[s['state']] += 1
+        fail_counts[s['failCount']] += 1
+        for host in s['replicas']:
+            host_segments[host] += 1
+            host_fails[host] += s['failCount']
+        if not s['startTime']:
+            continue
+        if s['state'] == 'DONE' and s['endTime']:
+            duration = (s['endTime'] - s['startTime']) / 1000
+            durations.append(duration)
+            for host in s['replicas']:
+                host_durations[host].append(duration)
+        elif s['state'] == 'RUNNING':
+            running.append((now - s['startTime']) / 1000)
+
+    durations = array('d', sorted(durations))
+    slow_threshold = percentile(durations, slow_percentile)
+    duration_stats = {f"p{p}": percentile(durations, p) for p in PERCENTILES}
+    duration_stats['max'] = durations[-1] if durations else None
+    duration_stats['mean'] = sum(durations) / len(durations) if durations else None
+
+    hosts = []
+    for host, count in host_segments.items():
+        values = array('d', sorted(host_durations[host]))
+        hosts.append(
+            {
+                'host': host,
+                'segments': count,
+                'done': len(values),
+                'slow_segments': len(values) - bisect_left(values, slow_threshold) if values else 0,
+                'mean_duration': sum(values) / len(values) if values else None,
+                'max_duration': values[-1] if values else None,
+                'fail_count': host_fails[host],
+            }
+        )
+    hosts.sort(key=lambda h: (-h['slow_segments'], -(h['mean_duration'] or 0)))
+
+    return {
+        'segments': sum(states.values()),
+        'states': dict(states),
+        'fail_counts': {str(k): v for k, v in sorted(fail_counts.items())},
+        'duration': duration_stats,
+        'slow_threshold': slow_threshold,
+        'running': len(running),
+        'running_max_duration': max(running) if running else None,
+        'hosts': hosts,
+    }
+
+
+def since_last_pause(ends, pause_time=None, window=100, cycle=0.0):
+    """The last `window` segment completion times after the last pause of a repair.
+
+    Reaper changes intensity of paused repairs only, so completions before
+    the last pause ran at another intensity or load. The pause is the repair's
+    pause_time in ms when Reaper reports it. Reaper clears it on resume, so
+    otherwise it's the last gap in the window much longer than the other
+    intervals on average and than PAUSE_CYCLES times `cycle`, the longest a
+    segment and the wait after it take in ms. Running segments never leave
+    such a gap, a pause shorter than that can't be told apart and is ignored.
+    """
+    if pause_time:
+        return ends[bisect_left(ends, pause_time) :][-window:]
+    ends = ends[-window:]
+    intervals = [b - a for a, b in zip(ends, ends[1:])]
+    total = sum(intervals)
+    for i in range(len(intervals) - 1, -1, -1) if len(intervals) >= 4 else ():
+        if intervals[i] > max(PAUSE_GAP_FACTOR * (total - intervals[i]) / (len(intervals) - 1), PAUSE_CYCLES * cycle):
+            return ends[i + 1 :]
+    return ends
+
+
+def repair_progress(repair, segments, now, concurrent_repairs=0, window=100):
+    """Project repair completion from its own segment throughput.
+
+    The observed rate comes from intervals between the last `window` segment
+    completions since the last pause or intensity change, its variance gives
+    the confidence band of the remaining time. A model rate from the current
+    intensity, the number of segments running now and the mean segment
+    duration is used when too few segments have finished since. Neither
+    knows the load of other repairs, so projections assume the
+    `concurrent_repairs` other repairs of the cluster keep running as they did.
+    """
+    total = len(segments)
+    ends = sorted(s['endTime'] for s in segments if s['state'] == 'DONE' and s['endTime'])
+    running = sum(1 for s in segments if s['state'] == 'RUNNING')
+    remaining = total - len(ends)
+    # Segment durations don't depend on intensity, which only adds waits between segments
+    last = ends[-window:]
+    durations = array(
+        'd',
+        (
+            (s['endTime'] - s['startTime']) / 1000
+            for s in segments
+            if s['state'] == 'DONE' and s['endTime'] and s['startTime'] and last and s['endTime'] >= last[0]
+        ),
+    )
+    # A paused repair will go on at the rate it had before that pause
+    paused = parse_timestamp(repair.get('pause_time')) if repair['state'] == 'RUNNING' else None
+    # Reaper waits for a segment's duration times (1 / intensity - 1) after it
+    cycle = max(durations) * 1000 / repair['intensity'] if durations else 0.0
+    recent = since_last_pause(ends, paused * 1000 if paused else None, window, cycle)
+
+    progress = {
+        'total': total,
+        'done': len(ends),
+        'running': running,
+        'remaining': remaining,
+        'intensity': repair['intensity'],
+        'concurrent_repairs': concurrent_repairs,
+        'observed': len(recent),
+        'observed_since': recent[0] / 1000 if len(recent) < len(ends) and recent else None,
+        'rate': None,
+        'model_rate': None,
+        'remaining_seconds': None,
+        'remaining_seconds_low': None,
+        'remaining_seconds_high': None,
+        'eta': None,
+        'eta_low': None,
+        'eta_high': None,
+    }
+    if durations and running:
+        progress['model_rate'] = running * repair['intensity'] * 3600 / (sum(durations) / len(durations))
+
+    intervals = array('d', ((b - a) / 1000 for a, b in zip(recent, recent[1:])))
+    mean_interval = sum(intervals) / len(intervals) if intervals else 0
+    if mean_interval and len(intervals) >= 4:
+        progress['rate'] = 3600 / mean_interval
+        deviation = math.sqrt(sum((i - mean_interval) ** 2 for i in intervals) / len(intervals))
+        seconds = remaining * mean_interval
+        # Variance of a sum of `remaining` intervals plus the uncertainty of their mean
+        spread = 1.96 * deviation * math.sqrt(remaining + remaining**2 / len(intervals))
+        progress['remaining_seconds'] = seconds
+        progress['remaining_seconds_low'] = max(0.0, seconds - spread)
+        progress['remaining_seconds_high'] = seconds + spread
+    elif progress['model_rate']:
+        progress['remaining_seconds'] = remaining * 3600 / progress['model_rate']
+
+    if repair['state'] == 'RUNNING' and progress['remaining_seconds'] is not None:
+        for key in ('', '_low', '_high'):
+            if progress[f"remaining_seconds{key}"] is not None:
+                progress[f"eta{key}"] = now / 1000 + progress[f"remaining_seconds{key}"]
+    return progress
+
+
+def stuck_segments(segments, now, factor=3.0, slow_percentile=90, min_done=20, cap=None):
+    """RUNNING segments that run far longer than the repair's completed segments.
+
+    The threshold is `factor` times the `slow_percentile` duration of DONE
+    segments, once at least `min_done` of them give a stable percentile, and
+    never more than `cap` seconds. Returns the threshold (None when neither
+    applies) and (segment, running seconds) pairs, longest running first.
+    """
+    durations = sorted(
+        (s['endTime'] - s['startTime']) / 1000
+        for s in segments
+        if s['state'] == 'DONE' and s['startTime'] and s['endTime']
+    )
+    threshold = factor * percentile(durations, slow_percentile) if len(durations) >= min_done else None
+    if cap is not None:
+        threshold = cap if threshold is None else min(threshold, cap)
+    if threshold is None:
+        return None, []
+    running = ((s, (now - s['startTime']) / 1000) for s in segments if s['state'] == 'RUNNING' and s['startTime'])
+    return threshold, sorted(((s, d) for s, d in running if d > threshold), key=lambda i: -i[1])
@@ -0,0 +1,204 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlparse
+
+from cassandra_reaper_cli.stats import percentile
+
+# Latency histogram bucket bounds in seconds, the default Prometheus buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Path parts of Reaper endpoints, other parts (IDs, cluster names, intensities) are parameters
+ENDPOINT_WORDS = {
+    'login',
+    'jwt',
+    'cluster',
+    'tables',
+    'repair_run',
+    'state',
+    'intensity',
+    'segments',
+    'abort',
+    'repair_schedule',
+    'start',
+    'snapshot',
+}
+
+
+def endpoint(method, url):
+    """Method and path of a request with parameters replaced by {}, e.g. GET repair_run/{}/segments"""
+    parts = urlparse(url).path.strip('/').split('/')
+    return f"{method} {'/'.join(p if p in ENDPOINT_WORDS or p.isupper() else '{}' for p in parts)}"
+
+
+class Timings:
+    """Time spent in CLI phases and in every Reaper API request.
+
+    Requests are timed by wrapping the `request` method of the client's
+    requests session, so the time includes reading the response body.
+    The wall time with at least one request in flight is the API time of
+    a command, the rest of the command's time is spent in the CLI.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def add_phase(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def instrument(self, session):
+        request = session.request
+
+        def timed_request(method, url, *args, **kwargs):
+            start = time.perf_counter()
+            status, size = None, 0
+            try:
+                response = request(method, url, *args, **kwargs)
+                status, size = response.status_code, len(response.content)
+                return response
+            finally:
+                end = time.perf_counter()
+                full_url = response.url if status is not None else url
+                with self.lock:
+                    self.requests.append((method.upper(), full_url, start, end, status, size))
+
+        session.request = timed_request
+
+    def api_wall_time(self):
+        """Length of the union of request intervals"""
+        total, covered_until = 0.0, None
+        for _, _, start, end, _, _ in sorted(self.requests, key=lambda r: r[2]):
+            if covered_until is None or start > covered_until:
+                total += end - start
+                covered_until = end
+            elif end > covered_until:
+                total += end - covered_until
+                covered_until = end
+        return total
+
+    def report(self):
+        endpoints = defaultdict(list)
+        for method, url, start, end, status, size in self.requests:
+            endpoints[endpoint(method, url)].append((end - start, status, size))
+        phases = dict(self.phases)
+        if 'command' in phases:
+            phases['api'] = self.api_wall_time()
+            phases['cli'] = max(0.0, phases['command'] - phases['api'])
+
+        report = {'phases': phases, 'requests': len(self.requests), 'endpoints': {}, 'duplicates': []}
+        for name, calls in sorted(endpoints.items()):
+            durations = sorted(c[0] for c in calls)
+            histogram = [sum(1 for d in durations if d <= b) for b in BUCKETS] + [len(durations)]
+            report['endpoints'][name] = {
+                'calls': len(calls),
+                'errors': sum(1 for c in calls if c[1] is None or c[1] >= 400),
+                'bytes': sum(c[2] for c in calls),
+                'seconds': sum(durations),
+                'p50': percentile(durations, 50),
+                'p99': percentile(durations, 99),
+                'max': durations[-1],
+                # Cumulative counts of requests not slower than every bucket bound, the last one is +Inf
+                'histogram': histogram,
+            }
+        # The same GET more than once in one run is a redundant call
+        gets = Counter(url for method, url, *_ in self.requests if method == 'GET')
+        report['duplicates'] = [{'url': url, 'calls': n} for url, n in gets.most_common() if n > 1]
+        return report
+
+    def print_report(self, out=None):
+        out = out or sys.stderr
+        report = self.report()
+        out.write(f"\n{'PHASE':12}{'SECONDS':>10}\n")
+        for name, seconds in report['phases'].items():
+            out.write(f"{name:12}{seconds:>10.3f}\n")
+        if report['endpoints']:
+            bounds = ''.join(f"{format_bound(b):>7}" for b in BUCKETS + (float('inf'),))
+            out.write(
+                f"\n{'ENDPOINT':45}{'CALLS':>7}{'ERRORS':>7}{'KBYTES':>9}{'TOTAL_S':>9}{'P50_MS':>8}"
+                f"{'P99_MS':>8}{'MAX_MS':>8}  LATENCY HISTOGRAM (calls <= bound)\n"
+            )
+            out.write(f"{'':113}{bounds}\n")
+            for name, e in report['endpoints'].items():
+                buckets = ''.join(f"{n - previous:>7}" for previous, n in zip([0] + e['histogram'], e['histogram']))
+                out.write(
+                    f"{name:45}{e['calls']:>7}{e['errors']:>7}{e['bytes'] / 1024:>9.1f}{e['seconds']:>9.3f}"
+                    f"{e['p50'] * 1000:>8.1f}{e['p99'] * 1000:>8.1f}{e['max'] * 1000:>8.1f}  {buckets}\n"
+                )
+        if report['duplicates']:
+            redundant = sum(d['calls'] - 1 for d in report['duplicates'])
+            out.write(f"\n{redundant} redundant GET requests:\n")
+            for d in report['duplicates']:
+                out.write(f"{d['calls']:>5}x {d['url']}\n")
+        out.flush()
+
+    def prometheus(self, command, exit_code):
+        """Report in Prometheus text format, e.g. for the node exporter textfile collector"""
+        report = self.report()
+        labels = f'command="{command}"'
+        lines = [
+            '# HELP reaper_cli_last_run_timestamp_seconds End time of the last run.',
+            '# TYPE reaper_cli_last_run_timestamp_seconds gauge',
+            f"reaper_cli_last_run_timestamp_seconds{{{labels}}} {time.time():.3f}",
+            '# HELP reaper_cli_exit_code Exit code of the last run.',
+            '# TYPE reaper_cli_exit_code gauge',
+            f"reaper_cli_exit_code{{{labels}}} {exit_code}",
+            '# HELP reaper_cli_phase_seconds Time spent in CLI phases of the last run.',
+            '# TYPE reaper_cli_phase_seconds gauge',
+        ]
+        lines += [
+            f'reaper_cli_phase_seconds{{{labels},phase="{name}"}} {seconds:.6f}'
+            for name, seconds in report['phases'].items()
+        ]
+        lines += [
+            '# HELP reaper_cli_duplicate_requests Redundant GET requests of the last run.',
+            '# TYPE reaper_cli_duplicate_requests gauge',
+            f"reaper_cli_duplicate_requests{{{labels}}} {sum(d['calls'] - 1 for d in report['duplicates'])}",
+        ]
+        metrics = [
+            ('reaper_cli_api_requests', 'API requests of the last run.', 'calls'),
+            ('reaper_cli_api_request_errors', 'Failed API requests of the last run.', 'errors'),
+            ('reaper_cli_api_response_bytes', 'API response bytes of the last run.', 'bytes'),
+        ]
+        for name, description, key in metrics:
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} gauge"]
+            lines += [f'{name}{{{labels},endpoint="{e}"}} {v[key]}' for e, v in report['endpoints'].items()]
+        lines += [
+            '# HELP reaper_cli_api_request_duration_seconds API request latency of the last run.',
+            '# TYPE reaper_cli_api_request_duration_seconds histogram',
+        ]
+        for e, v in report['endpoints'].items():
+            for bound, n in zip(BUCKETS + ('+Inf',), v['histogram']):
+                lines.append(
+                    f'reaper_cli_api_request_duration_seconds_bucket{{{labels},endpoint="{e}",le="{bound}"}} {n}'
+                )
+            lines.append(f'reaper_cli_api_request_duration_seconds_sum{{{labels},endpoint="{e}"}} {v["seconds"]:.6f}')
+            lines.append(f'reaper_cli_api_request_duration_seconds_count{{{labels},endpoint="{e}"}} {v["calls"]}')
+        return '\n'.join(lines) + '\n'
+
+    def save(self, path, command, exit_code):
+        """Write the report to `path`, in Prometheus text format when it ends with .prom, JSON otherwise"""
+        if path.endswith('.prom'):
+            text = self.prometheus(command, exit_code)
+        else:
+            text = json.dumps(dict(self.report(), command=command, exit_code=exit_code), indent=4)
+        # Replace the file at once, a textfile collector must never read a partial file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+
+
+def format_bound(seconds):
+    if seconds == float('inf'):
+        return '+Inf'
+    return f"{seconds * 1000:g}ms" if seconds < 1 else f"{seconds:g}s"
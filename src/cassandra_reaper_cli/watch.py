@@ -0,0 +1,110 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import logging
+import shutil
+import sys
+import time
+from datetime import datetime
+
+HIGHLIGHT = '\033[7m'
+RESET = '\033[0m'
+
+log = logging.getLogger('cassandra-reaper-cli')
+
+
+class Screen:
+    """Table on a terminal that is redrawn row by row.
+
+    Rows are (key, signature, line) tuples. A row whose signature changed is
+    rewritten highlighted, a row whose text only changed (e.g. a running
+    duration) is rewritten plainly. The whole screen is redrawn only when the
+    set or order of rows changes or they don't fit on the terminal. When the
+    output is not a terminal, only changed rows are printed.
+    """
+
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+        self.tty = self.out.isatty()
+        self.header = None
+        self.rows = None
+        self.highlighted = set()
+
+    def update(self, header, rows):
+        """Draw rows and return number of rows with a changed signature"""
+        previous = self.rows
+        self.rows = {key: (signature, line) for key, signature, line in rows}
+        changed = (
+            set()
+            if previous is None
+            else {key for key, signature, _ in rows if key not in previous or previous[key][0] != signature}
+        )
+        if not self.tty:
+            self._print_changes(header, rows, previous, changed)
+        elif (
+            previous is None
+            or header != self.header
+            or list(previous) != list(self.rows)
+            or len(rows) + 2 > shutil.get_terminal_size().lines
+        ):
+            self._redraw(header, rows, changed)
+        else:
+            self._update_rows(rows, previous, changed)
+        self.header = header
+        self.highlighted = changed
+        self.out.flush()
+        return len(changed)
+
+    def status(self, text):
+        if self.tty:
+            self.out.write(f"\033[{len(self.rows) + 2};1H\033[2K{text}")
+            self.out.flush()
+
+    def _print_changes(self, header, rows, previous, changed):
+        if previous is None:
+            self.out.write(f"{header}\n")
+            self.out.writelines(f"{line}\n" for _, _, line in rows)
+        elif changed:
+            self.out.write(f"--- {datetime.now().strftime('%H:%M:%S')}\n")
+            self.out.writelines(f"{line}\n" for key, _, line in rows if key in changed)
+
+    def _redraw(self, header, rows, changed):
+        self.out.write(f"\033[H\033[2J{header}\n")
+        self.out.writelines(f"{HIGHLIGHT}{line}{RESET}\n" if key in changed else f"{line}\n" for key, _, line in rows)
+
+    def _update_rows(self, rows, previous, changed):
+        for n, (key, _, line) in enumerate(rows, 2):
+            if key in changed:
+                self.out.write(f"\033[{n};1H\033[2K{HIGHLIGHT}{line}{RESET}")
+            elif key in self.highlighted or previous[key][1] != line:
+                self.out.write(f"\033[{n};1H\033[2K{line}")
+
+
+def watch(fetch, interval):
+    """Redraw the table returned by `fetch` until interrupted.
+
+    Polling speeds up to a quarter of `interval` while rows keep changing and
+    backs off to four times `interval` while nothing changes.
+    """
+    screen = Screen()
+    delay = interval
+    try:
+        while True:
+            try:
+                header, rows = fetch()
+            except Exception as e:
+                delay = min(interval * 4, delay * 1.5)
+                if screen.tty and screen.rows is not None:
+                    screen.status(f"{datetime.now().strftime('%H:%M:%S')} refresh failed: {e}, retry in {delay:.1f}s")
+                else:
+                    log.error(f"Refresh failed: {e}")
+            else:
+                changed = screen.update(header, rows)
+                delay = max(interval / 4, delay / 2) if changed else min(interval * 4, delay * 1.5)
+                screen.status(
+                    f"{datetime.now().strftime('%H:%M:%S')} {changed} rows changed, next refresh in {delay:.1f}s"
+                )
+            time.sleep(delay)
+    except KeyboardInterrupt:
+        if screen.tty and screen.rows is not None:
+            screen.out.write('\n')
@@ -0,0 +1,52 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import argparse
+import io
+import json
+
+from cassandra_reaper_cli import batch
+
+
+class FakeReaper:
+
+    def get_repairs(self, cluster, states):
+        return [
+            {'id': f"{cluster}-r{n}", 'cluster_name': cluster, 'keyspace_name': f"ks{n}", 'state': states[0]}
+            for n in range(3)
+        ]
+
+
+def run(lines, capsys, parallel=1):
+    args = argparse.Namespace(
+        file=io.StringIO('\n'.join(lines)),
+        parallel=parallel,
+        fail_fast=False,
+        url='http://reaper',
+        username='u',
+        password='p',
+        disable_ssl_verify=False,
+        cache_ttl=300,
+    )
+    failed = batch(FakeReaper(), args)
+    return failed, [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_batch_captures_dry_run_output_of_cluster_threads(capsys):
+    failed, results = run(
+        ['cluster-repair-pause c1 --dry-run --concurrency 4', 'cluster-repair-pause "c*" --cluster-regex x'], capsys
+    )
+    assert failed == 1
+    assert [r['line'] for r in results] == [1, 2]
+    assert results[0]['exit_code'] == 0
+    assert results[0]['output'].splitlines() == [f"repair-pause c1-r{n} --no-lookup" for n in range(3)]
+    assert results[1]['output'] == ''
+
+
+def test_batch_keeps_output_of_parallel_commands_apart(capsys):
+    lines = [f"cluster-repair-pause c{n} --dry-run --parallel-clusters 2" for n in range(8)]
+    failed, results = run(lines, capsys, parallel=4)
+    assert failed == 0
+    for result in results:
+        cluster = result['command'].split()[1]
+        assert result['output'].splitlines() == [f"repair-pause {cluster}-r{n} --no-lookup" for n in range(3)]
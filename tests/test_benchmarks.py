@@ -0,0 +1,44 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import os
+import sys
+import threading
+
+import pytest
+import requests
+from cassandra_reaper_api import CassandraReaper
+
+# The benchmarks aren't a package, bench.py imports fake_reaper from its own directory too
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'benchmarks'))
+from fake_reaper import FakeReaper, find_route
+
+FLEET = {'clusters': 3, 'repairs': 20, 'segments': 120, 'large_repair_segments': 40, 'keyspaces': 2}
+
+
+@pytest.fixture
+def server():
+    server = FakeReaper(('127.0.0.1', 0), FLEET)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_routes():
+    name, pattern, match = find_route('GET', 'repair_run/r1/segments')
+    assert (name, match.groups()) == ('segments', ('r1',))
+    assert pattern.pattern == r'repair_run/([^/]+)/segments'
+    assert find_route('PATCH', 'repair_run/r1/segments') is None
+
+
+def test_api_client_against_the_fake_fleet(server):
+    r = CassandraReaper(server.url, 'u', 'p')
+    assert len(r.get_clusters()) == FLEET['clusters']
+    repairs = r.get_repairs('', ['RUNNING', 'PAUSED', 'DONE', 'ERROR', 'ABORTED', 'NOT_STARTED'])
+    assert len(repairs) == FLEET['repairs']
+    assert len(r.get_repair_segments(server.describe()['large_repair'])) == FLEET['large_repair_segments']
+    stats = server.stats()
+    assert stats['requests'] >= 4
+    assert stats['errors'] == 0
+    assert requests.get(f"{server.url}no/such/route", timeout=10).status_code == 404
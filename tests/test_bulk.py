@@ -0,0 +1,96 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import logging
+import random
+import threading
+import time
+
+from cassandra_reaper_cli.bulk import Backoff, RateLimiter, run_bulk
+
+ITEMS = [{'id': f"r{n}", 'keyspace_name': f"ks{n}"} for n in range(1, 4)]
+
+
+def pause(item):
+    if item['id'] != 'r2':
+        msg = f"Status: 409, {item['id']} is not running"
+        raise RuntimeError(msg)
+
+
+def describe(item):
+    return f"Pausing {item['keyspace_name']} keyspace repair {item['id']}"
+
+
+def test_summary_lists_failed_items(caplog):
+    result = run_bulk(ITEMS, pause, describe)
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger='cassandra-reaper-cli'):
+        result.log_summary('Pausing c1 cluster repairs')
+    assert [r.getMessage() for r in caplog.records] == [
+        'Pausing c1 cluster repairs: 1/3 succeeded, 2 failed',
+        '  Pausing ks1 keyspace repair r1: Status: 409, r1 is not running',
+        '  Pausing ks3 keyspace repair r3: Status: 409, r3 is not running',
+    ]
+
+
+def test_summary_of_successful_batch(caplog):
+    result = run_bulk(ITEMS[1:2], pause, describe, concurrency=4)
+    with caplog.at_level(logging.INFO, logger='cassandra-reaper-cli'):
+        result.log_summary('Pausing c1 cluster repairs')
+    assert caplog.records[-1].getMessage() == 'Pausing c1 cluster repairs: 1/1 succeeded'
+    assert result.failed == []
+
+
+class Clock:
+    """time.monotonic() and time.sleep() that only advance on sleep"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_rate_limiter_spaces_out_calls(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(time, 'sleep', clock.sleep)
+    limiter = RateLimiter(4)
+    for _ in range(3):
+        limiter.wait()
+    assert clock.sleeps == [0.25, 0.25]
+    # A pause longer than the interval doesn't build up a burst allowance
+    clock.now += 10
+    limiter.wait()
+    limiter.wait()
+    assert clock.sleeps == [0.25, 0.25, 0.25]
+
+
+def test_rate_limiter_without_rate_never_waits(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, 'sleep', clock.sleep)
+    limiter = RateLimiter()
+    for _ in range(100):
+        limiter.wait()
+    assert clock.sleeps == []
+
+
+def test_backoff_doubles_up_to_the_maximum_with_jitter(monkeypatch):
+    monkeypatch.setattr(random, 'uniform', lambda low, high: (low, high))
+    backoff = Backoff(2, 10)
+    assert [backoff.next() for _ in range(5)] == [(1, 2), (2, 4), (4, 8), (5, 10), (5, 10)]
+    backoff.reset()
+    assert backoff.next() == (1, 2)
+
+
+def test_items_run_concurrently():
+    # Every worker waits for all the others, so this completes only with all items in flight at once
+    barrier = threading.Barrier(len(ITEMS), timeout=5)
+    result = run_bulk(ITEMS, lambda _: barrier.wait(), describe, concurrency=len(ITEMS))
+    assert sorted(i['id'] for i in result.succeeded) == ['r1', 'r2', 'r3']
+    assert result.failed == []
@@ -0,0 +1,88 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import os
+import time
+
+import pytest
+
+from cassandra_reaper_cli.cache import ACTIVE_REPAIR_STATES, MetadataCache, cache_dir
+
+URL = 'http://reaper:8080/'
+
+
+class FakeReaper:
+    def __init__(self):
+        self.calls = []
+
+    def get_clusters(self):
+        self.calls.append('clusters')
+        return ['c1', 'c2']
+
+    def get_cluster_tables(self, cluster):
+        self.calls.append(f"tables/{cluster}")
+        return {'ks1': ['t1'], 'ks2': ['t2']}
+
+    def get_repairs(self, cluster, states):
+        self.calls.append(('repairs', cluster, tuple(states)))
+        return [{'id': 'r1'}]
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    return MetadataCache(URL, 300)
+
+
+def age(cache, name, seconds):
+    path = os.path.join(cache.dir, name)
+    os.utime(path, (time.time() - seconds, time.time() - seconds))
+
+
+def test_cache_dir_of_a_url(monkeypatch, tmp_path):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    assert cache_dir(URL) == str(tmp_path / 'cassandra-reaper-cli' / 'http___reaper_8080_')
+
+
+def test_entries_are_fresh_until_the_ttl(cache):
+    r = FakeReaper()
+    assert cache.clusters(r, cached=True) == ['c1', 'c2']
+    assert cache.clusters(r, cached=True) == ['c1', 'c2']
+    assert r.calls == ['clusters']
+    age(cache, 'clusters.json', 299)
+    cache.clusters(r, cached=True)
+    assert r.calls == ['clusters']
+    age(cache, 'clusters.json', 301)
+    cache.clusters(r, cached=True)
+    assert r.calls == ['clusters', 'clusters']
+
+
+def test_without_cached_reaper_is_always_called_and_the_cache_refreshed(cache):
+    r = FakeReaper()
+    cache.tables(r, 'c1')
+    cache.tables(r, 'c1')
+    assert r.calls == ['tables/c1', 'tables/c1']
+    assert cache.get('tables/c1') == {'ks1': ['t1'], 'ks2': ['t2']}
+
+
+def test_completion_values_next_to_the_json(cache):
+    cache.repairs(FakeReaper())
+    cache.tables(FakeReaper(), 'c1')
+    with open(os.path.join(cache.dir, 'repairs')) as f:
+        assert f.read() == 'r1\n'
+    with open(os.path.join(cache.dir, 'tables', 'c1')) as f:
+        assert f.read() == 'ks1\nks2\n'
+
+
+def test_active_repairs_are_cached(cache):
+    r = FakeReaper()
+    cache.repairs(r)
+    assert r.calls == [('repairs', '', tuple(ACTIVE_REPAIR_STATES))]
+
+
+def test_missing_or_broken_entries_are_misses(cache):
+    assert cache.get('clusters') is None
+    os.makedirs(cache.dir)
+    with open(os.path.join(cache.dir, 'clusters.json'), 'w') as f:
+        f.write('[truncated')
+    assert cache.get('clusters') is None
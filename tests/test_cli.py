@@ -0,0 +1,70 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import argparse
+
+import pytest
+
+from cassandra_reaper_cli import build_parser, invoked_command, missing_options, positive_int
+from cassandra_reaper_cli.completion import COMPLETE_KEYSPACE, add_completions
+
+
+def parse(*argv):
+    return build_parser(invoked_command(argv)).parse_args(argv)
+
+
+@pytest.fixture(autouse=True)
+def no_environment(monkeypatch):
+    for name in ('REAPER_URL', 'REAPER_USER', 'REAPER_PASSWORD', 'REAPER_CACHE_TTL'):
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_commands_calling_reaper_need_credentials():
+    assert missing_options(parse('repair-list')) == ['--url', '--username', '--password']
+    assert missing_options(parse('--url', 'http://reaper', 'repair-list')) == ['--username', '--password']
+    assert missing_options(parse('--url', 'http://reaper', '--username', 'u', '--password', 'p', 'repair-list')) == []
+
+
+def test_local_commands_need_no_credentials():
+    assert missing_options(parse('history-query', 'failures')) == ['--db or --url']
+    assert missing_options(parse('history-query', 'failures', '--db', 'history.sqlite')) == []
+    assert missing_options(parse('--url', 'http://reaper', 'history-query', 'failures')) == []
+    assert missing_options(parse('repair-list', '--cached')) == ['--url']
+    assert missing_options(parse('--url', 'http://reaper', 'schedule-list', '--cached')) == []
+
+
+def test_cache_ttl_from_environment(monkeypatch, capsys):
+    assert parse('repair-list').cache_ttl == 300
+    monkeypatch.setenv('REAPER_CACHE_TTL', '60')
+    assert parse('repair-list').cache_ttl == 60
+    assert parse('--cache-ttl', '10', 'repair-list').cache_ttl == 10
+    for value in ('abc', '0'):
+        monkeypatch.setenv('REAPER_CACHE_TTL', value)
+        with pytest.raises(SystemExit) as e:
+            parse('repair-list')
+        assert e.value.code == 2
+        assert '--cache-ttl' in capsys.readouterr().err
+    # Help doesn't convert defaults, a bad value can't break it
+    with pytest.raises(SystemExit) as e:
+        parse('--help')
+    assert e.value.code == 0
+
+
+def test_keyspace_completion_only_for_positional_keyspaces():
+    parser = build_parser()
+    add_completions(parser)
+    subparsers = next(a for a in parser._actions if a.dest == 'command').choices
+    keyspace = {name: next((a for a in p._actions if a.dest == 'keyspace'), None) for name, p in subparsers.items()}
+    assert getattr(keyspace['cluster-table-list'], 'complete', None) == COMPLETE_KEYSPACE
+    assert keyspace['history-query'].option_strings == ['--keyspace']
+    assert getattr(keyspace['history-query'], 'complete', None) is None
+
+
+def test_positive_int_is_an_int_greater_than_zero():
+    assert positive_int('4') == 4
+    for value in ('0', '-1'):
+        with pytest.raises(argparse.ArgumentTypeError):
+            positive_int(value)
+    with pytest.raises(ValueError):
+        positive_int('four')
+    assert parse('--url', 'http://reaper', 'cluster-schedule-enable', 'c1', '--concurrency', '8').concurrency == 8
@@ -0,0 +1,60 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import argparse
+import logging
+
+import pytest
+from cassandra_reaper_api import CassandraReaper
+
+from cassandra_reaper_cli import LazyReaper, reaper_client, reaper_session
+
+
+@pytest.fixture
+def logins(monkeypatch):
+    calls = []
+
+    def login(self):
+        calls.append(self)
+
+    monkeypatch.setattr(CassandraReaper, 'login', login)
+    return calls
+
+
+def client_args(**kwargs):
+    defaults = {'url': 'http://reaper/', 'username': 'u', 'password': 'p', 'disable_ssl_verify': False}
+    return argparse.Namespace(**{**defaults, **kwargs})
+
+
+def test_session_of_the_api_client():
+    r = CassandraReaper('http://reaper/', 'u', 'p', login=False)
+    assert reaper_session(r).verify is True
+
+
+def test_unsupported_client_fails_clearly(caplog):
+    with caplog.at_level(logging.ERROR, logger='cassandra-reaper-cli'), pytest.raises(SystemExit) as e:
+        reaper_session(object())
+    assert e.value.code == 1
+    assert 'Unsupported cassandra-reaper-api version' in caplog.text
+
+
+def test_pool_fits_all_parallel_calls(logins):
+    r = reaper_client(client_args(concurrency=8, parallel_clusters=4))
+    assert logins == [r]
+    adapter = reaper_session(r).get_adapter('https://reaper/')
+    assert adapter._pool_maxsize == 32
+    assert reaper_session(r).get_adapter('http://reaper/') is adapter
+
+
+@pytest.mark.usefixtures('logins')
+def test_pool_keeps_the_default_size_for_serial_calls():
+    adapter = reaper_session(reaper_client(client_args())).get_adapter('https://reaper/')
+    assert adapter._pool_maxsize == 10
+
+
+def test_one_login_per_invocation(logins):
+    r = LazyReaper(client_args(disable_ssl_verify=True))
+    assert logins == []
+    assert r.url == 'http://reaper/'
+    assert reaper_session(r).verify is False
+    assert len(logins) == 1
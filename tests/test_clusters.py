@@ -0,0 +1,64 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import logging
+
+import pytest
+
+from cassandra_reaper_cli import build_parser, invoked_command, is_cluster_pattern
+
+
+class FakeReaper:
+    def __init__(self, failing=()):
+        self.failing = failing
+        self.paused = []
+
+    def get_clusters(self):
+        return ['prod-us-1', 'dev-1', 'prod-eu-1']
+
+    def get_repairs(self, cluster, _):
+        return [{'id': f"{cluster}-r1", 'cluster_name': cluster, 'keyspace_name': 'ks1', 'state': 'RUNNING'}]
+
+    def pause_repair(self, repair_id):
+        if repair_id.split('-r')[0] in self.failing:
+            msg = 'Status: 500'
+            raise RuntimeError(msg)
+        self.paused.append(repair_id)
+
+
+def run(r, *argv):
+    args = build_parser(invoked_command(argv)).parse_args(argv)
+    return args.func(r, args)
+
+
+@pytest.mark.parametrize(
+    ('selector', 'paused'),
+    [
+        (('prod-*',), ['prod-eu-1-r1', 'prod-us-1-r1']),
+        (('--cluster-regex=-1$',), ['dev-1-r1', 'prod-eu-1-r1', 'prod-us-1-r1']),
+        (('--cluster-regex', 'eu'), ['prod-eu-1-r1']),
+        # A plain name isn't checked against the cluster list
+        (('staging',), ['staging-r1']),
+    ],
+)
+def test_clusters_are_selected_by_name_pattern_or_regex(selector, paused):
+    r = FakeReaper()
+    assert run(r, 'cluster-repair-pause', *selector) == 0
+    assert sorted(r.paused) == paused
+
+
+def test_failure_of_a_cluster_doesnt_stop_the_others(caplog):
+    r = FakeReaper(failing=['prod-eu-1'])
+    with caplog.at_level(logging.INFO, logger='cassandra-reaper-cli'):
+        assert run(r, 'cluster-repair-pause', 'prod-*') == 1
+    assert r.paused == ['prod-us-1-r1']
+    assert 'Failures in 1/2 clusters: prod-eu-1' in caplog.text
+
+
+@pytest.mark.parametrize('selector', [(), ('prod-*', '--cluster-regex', 'prod'), ('test-*',)])
+def test_invalid_or_empty_selection(selector):
+    assert run(FakeReaper(), 'cluster-repair-pause', *selector) == 1
+
+
+def test_cluster_patterns():
+    assert [is_cluster_pattern(c) for c in ('prod-*', 'prod-?', 'prod-[12]', 'prod-1')] == [True, True, True, False]
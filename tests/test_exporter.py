@@ -0,0 +1,137 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import sys
+
+import pytest
+
+from cassandra_reaper_cli.exporter import Exporter, Metrics
+
+
+def repair(repair_id, state, keyspace='ks1'):
+    return {
+        'id': repair_id,
+        'cluster_name': 'c1',
+        'keyspace_name': keyspace,
+        'state': state,
+        'segments_repaired': 3,
+        'total_segments': 10,
+        'intensity': 0.5,
+    }
+
+
+class FakeReaper:
+    def __init__(self):
+        self.repairs = [repair('r1', 'RUNNING'), repair('r2', 'PAUSED'), repair('r3', 'RUNNING', 'ks2')]
+        self.schedules = [
+            {
+                'id': 's1',
+                'cluster_name': 'c1',
+                'keyspace_name': 'ks1',
+                'state': 'ACTIVE',
+                'next_activation': '2023-05-01T10:00:00Z',
+            }
+        ]
+        self.segment_calls = []
+        self.fail = False
+
+    def get_repairs(self, cluster, states):
+        assert cluster == ''
+        if self.fail:
+            msg = 'Connection refused'
+            raise ConnectionError(msg)
+        return [i for i in self.repairs if i['state'] in states]
+
+    def get_schedules(self):
+        return self.schedules
+
+    def get_repair_segments(self, repair_id):
+        self.segment_calls.append(repair_id)
+        return [
+            {'state': 'DONE', 'failCount': 1, 'startTime': 1_000, 'endTime': 2_000},
+            {'state': 'RUNNING', 'failCount': 2, 'startTime': 1_000, 'endTime': None},
+            {'state': 'NOT_STARTED', 'failCount': 0, 'startTime': None, 'endTime': None},
+        ]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # The package exports an exporter command under the module's name
+    monkeypatch.setattr(sys.modules['cassandra_reaper_cli.exporter'], 'time', clock)
+    return clock
+
+
+def samples(e):
+    return [line for line in e.payload.decode().splitlines() if not line.startswith('#')]
+
+
+@pytest.mark.usefixtures('clock')
+def test_payload_of_a_poll():
+    e = Exporter(FakeReaper(), ['RUNNING', 'PAUSED'], 30, 60, 2)
+    e.poll()
+    lines = samples(e)
+    assert 'reaper_up 1' in lines
+    assert 'reaper_repairs{cluster="c1",keyspace="ks1",state="PAUSED"} 1' in lines
+    assert 'reaper_repair_segments_total{cluster="c1",keyspace="ks2",id="r3",state="RUNNING"} 10' in lines
+    # Segment metrics only for RUNNING repairs
+    assert 'reaper_repair_segments{cluster="c1",keyspace="ks1",id="r1",segment_state="DONE"} 1' in lines
+    assert 'reaper_repair_segment_failures{cluster="c1",keyspace="ks1",id="r1"} 3' in lines
+    assert 'reaper_repair_running_segment_max_seconds{cluster="c1",keyspace="ks1",id="r1"} 99.0' in lines
+    segment_lines = [line for line in lines if line.startswith(('reaper_repair_segments{', 'reaper_repair_segment_'))]
+    assert not any('id="r2"' in line for line in segment_lines)
+    assert 'reaper_schedules{cluster="c1",state="ACTIVE"} 1' in lines
+    assert (
+        'reaper_schedule_next_activation_timestamp_seconds{cluster="c1",keyspace="ks1",id="s1",state="ACTIVE"} '
+        '1682935200.0'
+    ) in lines
+    assert '# TYPE reaper_exporter_polls_total counter' in e.payload.decode()
+
+
+def test_segments_are_fetched_at_most_every_segments_interval(clock):
+    r = FakeReaper()
+    e = Exporter(r, ['RUNNING', 'PAUSED'], 30, 60, 2)
+    e.poll()
+    assert sorted(r.segment_calls) == ['r1', 'r3']
+    clock.now += 30
+    e.poll()
+    assert len(r.segment_calls) == 2
+    clock.now += 30
+    r.repairs[2]['state'] = 'DONE'
+    e.poll()
+    # r3 isn't RUNNING anymore, its summary is dropped
+    assert r.segment_calls[2:] == ['r1']
+    assert sorted(e.segments) == ['r1']
+
+
+@pytest.mark.usefixtures('clock')
+def test_failed_poll_keeps_serving_the_last_state():
+    r = FakeReaper()
+    e = Exporter(r, ['RUNNING'], 30, 60, 2)
+    e.poll()
+    r.fail = True
+    e.poll()
+    lines = samples(e)
+    assert 'reaper_up 0' in lines
+    assert 'reaper_exporter_poll_errors_total 1' in lines
+    assert 'reaper_exporter_last_success_timestamp_seconds 100.0' in lines
+    assert 'reaper_repairs{cluster="c1",keyspace="ks1",state="RUNNING"} 1' in lines
+
+
+def test_label_values_are_escaped_and_missing_values_skipped():
+    m = Metrics()
+    m.family('m', 'gauge', 'A metric.')
+    m.sample('m', 1, keyspace='a"b\\c\nd')
+    m.sample('m', None, keyspace='unset')
+    assert m.text() == '# HELP m A metric.\n# TYPE m gauge\nm{keyspace="a\\"b\\\\c\\nd"} 1\n'
@@ -0,0 +1,60 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import argparse
+import sqlite3
+
+import pytest
+
+from cassandra_reaper_cli.history import History, since_timestamp
+
+
+def repair(repair_id, keyspace, state='DONE', hours=1):
+    return {
+        'id': repair_id,
+        'cluster_name': 'c1',
+        'keyspace_name': keyspace,
+        'state': state,
+        'creation_time': '2023-05-01T00:00:00Z',
+        'start_time': '2023-05-01T00:00:00Z',
+        'end_time': f"2023-05-01T{hours:02}:00:00Z",
+    }
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = History(str(tmp_path / 'history.sqlite'))
+    yield history
+    history.close()
+
+
+def test_store_writes_only_new_and_changed_runs(history):
+    assert history.store('c1', [repair('r1', 'ks1'), repair('r2', 'ks2', 'ERROR')]) == (2, 0)
+    assert history.store('c1', [repair('r1', 'ks1'), repair('r2', 'ks2', 'ABORTED')]) == (0, 1)
+    _, rows = history.query('failures', since=0)
+    assert rows == [{'cluster_name': 'c1', 'repairs': 2, 'done': 1, 'error': 0, 'aborted': 1, 'failure_pct': 50.0}]
+
+
+def test_durations_query(history):
+    history.store('c1', [repair('r1', 'ks1', hours=1), repair('r2', 'ks1', hours=5), repair('r3', 'ks2', hours=2)])
+    columns, rows = history.query('durations', keyspace='ks*')
+    assert columns[:4] == ['cluster_name', 'keyspace_name', 'repairs', 'avg_duration']
+    assert [(r['keyspace_name'], r['avg_duration'], r['max_duration']) for r in rows] == [
+        ('ks1', 10800, 18000),
+        ('ks2', 7200, 7200),
+    ]
+    assert history.query('durations', cluster='c2')[1] == []
+
+
+def test_failed_query_keeps_the_sqlite_error(history):
+    with pytest.raises(ValueError, match='Query failed') as e:
+        history.sql('SELECT nothing FROM repairs')
+    assert isinstance(e.value.__cause__, sqlite3.Error)
+
+
+def test_since_timestamp():
+    assert since_timestamp('2023-05-01') == 1682899200
+    assert since_timestamp('2023-05-01T12:00:00Z') == 1682942400
+    with pytest.raises(argparse.ArgumentTypeError) as e:
+        since_timestamp('last week')
+    assert isinstance(e.value.__cause__, ValueError)
@@ -0,0 +1,94 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+from cassandra_reaper_cli.index import SegmentIndex
+
+MIN_TOKEN = -(2**63)
+MAX_TOKEN = 2**63 - 1
+
+
+def segment(segment_id, ranges, state='DONE', replicas=('10.0.0.1', '10.0.0.2')):
+    return {
+        'id': segment_id,
+        'state': state,
+        'replicas': {host: 'dc1' for host in replicas},
+        'tokenRange': {
+            'baseRange': {'start': str(ranges[0][0]), 'end': str(ranges[0][1])},
+            'tokenRanges': [{'start': str(start), 'end': str(end)} for start, end in ranges],
+        },
+    }
+
+
+def ids(segments):
+    return [s['id'] for s in segments]
+
+
+# Listed out of token order, s2 wraps around the ring
+RING = SegmentIndex(
+    [
+        segment('s2', [(100, -100)], 'RUNNING', ('10.0.0.1', '10.0.0.3')),
+        segment('s0', [(-100, 0)]),
+        segment('s1', [(0, 50), (50, 100)], 'NOT_STARTED', ('10.0.0.2', '10.0.0.3')),
+    ]
+)
+
+
+def test_token_ranges_exclude_start_and_include_end():
+    assert ids(RING.find(token=0)) == ['s0']
+    assert ids(RING.find(token=1)) == ['s1']
+    assert ids(RING.find(token=50)) == ['s1']
+    assert ids(RING.find(token=100)) == ['s1']
+    assert ids(RING.find(token=-99)) == ['s0']
+
+
+def test_wraparound_range_covers_both_ends_of_the_ring():
+    assert ids(RING.find(token=101)) == ['s2']
+    assert ids(RING.find(token=MAX_TOKEN)) == ['s2']
+    assert ids(RING.find(token=MIN_TOKEN)) == ['s2']
+    assert ids(RING.find(token=-100)) == ['s2']
+
+
+def test_minimum_token_belongs_to_the_range_ending_on_it():
+    index = SegmentIndex(
+        [
+            segment('first', [(MIN_TOKEN, 0)]),
+            segment('last', [(0, MIN_TOKEN)]),
+        ]
+    )
+    assert ids(index.find(token=MIN_TOKEN)) == ['last']
+    assert ids(index.find(token=MIN_TOKEN + 1)) == ['first']
+    assert ids(index.find(token=MAX_TOKEN)) == ['last']
+
+
+def test_host_and_state_results_are_in_token_order():
+    assert ids(RING.find()) == ['s0', 's1', 's2']
+    assert ids(RING.find(host='10.0.0.3')) == ['s1', 's2']
+    assert ids(RING.find(host='10.0.0.1')) == ['s0', 's2']
+    assert ids(RING.find(state='RUNNING')) == ['s2']
+    assert ids(RING.find(host='10.0.0.9')) == []
+    assert ids(RING.find(state='STARTED')) == []
+
+
+def test_combined_criteria():
+    assert ids(RING.find(token=MIN_TOKEN, host='10.0.0.3', state='RUNNING')) == ['s2']
+    assert ids(RING.find(token=MIN_TOKEN, host='10.0.0.2', state='RUNNING')) == []
+    assert ids(RING.find(token=MIN_TOKEN, host='10.0.0.3', state='DONE')) == []
+    assert ids(RING.find(token=75, host='10.0.0.2')) == ['s1']
+    assert ids(RING.find(host='10.0.0.3', state='NOT_STARTED')) == ['s1']
+    assert ids(RING.find(host='10.0.0.1', state='DONE')) == ['s0']
+
+
+def test_combined_criteria_with_long_lists():
+    segments = [
+        segment(
+            f"s{n}", [(n * 10, n * 10 + 10)], 'DONE' if n % 3 else 'RUNNING', ('10.0.0.1',) if n % 2 else ('10.0.0.2',)
+        )
+        for n in range(1000)
+    ]
+    index = SegmentIndex(segments)
+    expected = [f"s{n}" for n in range(1000) if n % 3 == 0 and n % 2]
+    assert ids(index.find(host='10.0.0.1', state='RUNNING')) == expected
+    # The same lookup again uses the kept sets
+    assert ids(index.find(state='RUNNING', host='10.0.0.1')) == expected
+    assert ids(index.find(token=35, host='10.0.0.1', state='RUNNING')) == ['s3']
+    assert ids(index.find(token=35, host='10.0.0.2')) == []
@@ -0,0 +1,83 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import logging
+
+import pytest
+
+from cassandra_reaper_cli import change_running_repair_intensity
+
+REPAIR = {'id': 'r1', 'cluster_name': 'c1', 'keyspace_name': 'ks1', 'intensity': 0.5}
+
+
+class FakeReaper:
+    """A repair that changes state on requests, with failures injected per call"""
+
+    def __init__(self, **failures):
+        self.state = 'RUNNING'
+        self.intensity = 0.5
+        self.failures = failures
+
+    def fail(self, call):
+        if call in self.failures:
+            raise self.failures.pop(call)
+
+    def get_repair(self, repair_id):
+        self.fail('get_repair')
+        return {'id': repair_id, 'state': self.state, 'intensity': self.intensity}
+
+    def pause_repair(self, _):
+        self.state = 'PAUSED'
+        self.fail('pause_repair')
+
+    def resume_repair(self, _):
+        self.fail('resume_repair')
+        if not self.failures.pop('resume_ignored', False):
+            self.state = 'RUNNING'
+
+    def change_repair_intensity(self, _, intensity):
+        self.fail('change_repair_intensity')
+        self.intensity = intensity
+
+
+def test_intensity_change_resumes_the_repair():
+    r = FakeReaper()
+    change_running_repair_intensity(r, REPAIR, 0.9, 1)
+    assert (r.state, r.intensity) == ('RUNNING', 0.9)
+
+
+def test_failed_change_resumes_and_raises_its_error():
+    r = FakeReaper(change_repair_intensity=RuntimeError('Status: 400'))
+    with pytest.raises(RuntimeError, match='400'):
+        change_running_repair_intensity(r, REPAIR, 0.9, 1)
+    assert (r.state, r.intensity) == ('RUNNING', 0.5)
+
+
+def test_failed_resume_names_the_repair_left_paused(caplog):
+    r = FakeReaper(resume_repair=RuntimeError('Status: 409'))
+    with caplog.at_level(logging.ERROR, logger='cassandra-reaper-cli'), pytest.raises(RuntimeError, match='409'):
+        change_running_repair_intensity(r, REPAIR, 0.9, 1)
+    assert r.state == 'PAUSED'
+    assert 'repair r1, it may be left PAUSED' in caplog.text
+
+
+def test_resume_is_checked(caplog):
+    r = FakeReaper(resume_ignored=True)
+    with caplog.at_level(logging.ERROR, logger='cassandra-reaper-cli'), pytest.raises(RuntimeError, match='RUNNING'):
+        change_running_repair_intensity(r, REPAIR, 0.9, 1)
+    assert 'repair r1, it may be left PAUSED' in caplog.text
+
+
+def test_failed_state_check_keeps_the_pause_error(caplog):
+    # The pause request fails after pausing the repair, then the state can't be fetched
+    r = FakeReaper(pause_repair=RuntimeError('Status: 400'), get_repair=RuntimeError('Status: 404'))
+    with caplog.at_level(logging.ERROR, logger='cassandra-reaper-cli'), pytest.raises(RuntimeError, match='400'):
+        change_running_repair_intensity(r, REPAIR, 0.9, 1)
+    assert "Can't check the state of c1 cluster ks1 keyspace repair r1, it may be left PAUSED" in caplog.text
+
+
+def test_failed_pause_request_that_paused_the_repair_resumes_it():
+    r = FakeReaper(pause_repair=RuntimeError('Status: 400'))
+    with pytest.raises(RuntimeError, match='400'):
+        change_running_repair_intensity(r, REPAIR, 0.9, 1)
+    assert r.state == 'RUNNING'
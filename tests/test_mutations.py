@@ -0,0 +1,137 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import argparse
+import json
+import logging
+
+import pytest
+import requests
+from cassandra_reaper_api import CassandraReaper
+from requests.adapters import BaseAdapter
+
+from cassandra_reaper_cli import (
+    delete_repair,
+    delete_schedule,
+    needs_change,
+    reaper_session,
+    repair_pause,
+    schedule_enable,
+    update_schedule,
+)
+from cassandra_reaper_cli.bulk import http_status
+
+URL = 'http://reaper/'
+
+
+class FakeTransport(BaseAdapter):
+    """Answers requests with the queued statuses, then with 200, and keeps the requests"""
+
+    def __init__(self, statuses=()):
+        super().__init__()
+        self.statuses = list(statuses)
+        self.requests = []
+
+    def send(self, request, **_):
+        self.requests.append(request)
+        response = requests.Response()
+        response.status_code = self.statuses.pop(0) if self.statuses else 200
+        response.url = request.url
+        response.request = request
+        response._content = b''
+        return response
+
+    def close(self):
+        pass
+
+
+class Client(CassandraReaper):
+    def __init__(self, statuses=()):
+        super().__init__(URL, 'u', 'p', login=False)
+        self.transport = FakeTransport(statuses)
+        reaper_session(self).mount(URL, self.transport)
+        self.logins = 0
+
+    def login(self):
+        self.logins += 1
+
+
+def test_delete_with_the_known_owner():
+    r = Client()
+    delete_schedule(r, {'id': 's1', 'owner': 'ops team'})
+    delete_repair(r, {'id': 'r1', 'owner': 'reaper'})
+    assert [(q.method, q.url) for q in r.transport.requests] == [
+        ('DELETE', f"{URL}repair_schedule/s1?owner=ops+team"),
+        ('DELETE', f"{URL}repair_run/r1?owner=reaper"),
+    ]
+
+
+def test_update_sends_only_the_given_fields():
+    r = Client()
+    update_schedule(r, 's1', {'intensity': 0.9, 'owner': 'ops'})
+    [request] = r.transport.requests
+    assert (request.method, request.url) == ('PATCH', f"{URL}repair_schedule/s1")
+    assert json.loads(request.body) == {'intensity': 0.9, 'owner': 'ops'}
+
+
+def test_delete_logs_in_again_when_the_token_expired():
+    r = Client([499])
+    delete_repair(r, {'id': 'r1', 'owner': 'reaper'})
+    assert r.logins == 1
+    assert len(r.transport.requests) == 2
+
+
+def test_failed_delete_raises_with_its_status():
+    r = Client([404])
+    with pytest.raises(requests.HTTPError) as e:
+        delete_repair(r, {'id': 'r1', 'owner': 'reaper'})
+    assert http_status(e.value) == 404
+
+
+class FakeReaper:
+    """Items by ID and the state changes requested on them"""
+
+    def __init__(self, state):
+        self.item = {'id': 'x1', 'cluster_name': 'c1', 'keyspace_name': 'ks1', 'state': state}
+        self.calls = []
+
+    def get(self, item_id):
+        self.calls.append(('get', item_id))
+        return self.item
+
+    def change(self, item_id):
+        self.calls.append(('change', item_id))
+
+    get_schedule = get_repair = get
+    enable_schedule = pause_repair = change
+
+
+def mutation_args(*, no_lookup=False):
+    return argparse.Namespace(id='x1', no_lookup=no_lookup)
+
+
+def test_mutation_of_an_item_already_in_the_state_is_skipped(caplog):
+    r = FakeReaper('PAUSED')
+    with caplog.at_level(logging.INFO, logger='cassandra-reaper-cli'):
+        repair_pause(r, mutation_args())
+    assert r.calls == [('get', 'x1')]
+    assert "Skipping c1 cluster ks1 keyspace repair, it's already PAUSED" in caplog.text
+
+
+def test_mutation_of_an_item_in_another_state():
+    r = FakeReaper('PAUSED')
+    schedule_enable(r, mutation_args())
+    assert r.calls == [('get', 'x1'), ('change', 'x1')]
+
+
+def test_mutation_without_lookup_only_changes_the_state():
+    r = FakeReaper('ACTIVE')
+    schedule_enable(r, mutation_args(no_lookup=True))
+    assert r.calls == [('change', 'x1')]
+
+
+def test_bulk_mutations_skip_items_in_the_state(caplog):
+    items = [{'id': 's1', 'state': 'ACTIVE'}, {'id': 's2', 'state': 'PAUSED'}, {'id': 's3', 'state': 'ACTIVE'}]
+    with caplog.at_level(logging.INFO, logger='cassandra-reaper-cli'):
+        assert needs_change(items, 'ACTIVE', 'Enabling c1 cluster repair schedules') == [items[1]]
+    assert 'Enabling c1 cluster repair schedules: 2/3 already ACTIVE, skipped' in caplog.text
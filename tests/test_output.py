@@ -0,0 +1,101 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import argparse
+import io
+import json
+
+from cassandra_reaper_cli import print_segments
+from cassandra_reaper_cli.output import CHUNK_SIZE, output_format, write_csv, write_items, write_lines, write_ndjson
+
+
+class Output(io.StringIO):
+    """Output that counts flushes"""
+
+    def __init__(self):
+        super().__init__()
+        self.flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+
+
+def test_lines_are_written_in_flushed_chunks():
+    out = Output()
+    written = []
+
+    def lines():
+        for n in range(CHUNK_SIZE * 2 + 1):
+            # Rows reach the output before the rest is produced
+            written.append(len(out.getvalue().splitlines()))
+            yield str(n)
+
+    write_lines(lines(), out)
+    assert out.getvalue().splitlines() == [str(n) for n in range(CHUNK_SIZE * 2 + 1)]
+    assert written[CHUNK_SIZE] == CHUNK_SIZE
+    assert out.flushes == 3
+
+
+def test_no_lines():
+    out = Output()
+    write_lines([], out)
+    assert (out.getvalue(), out.flushes) == ('', 1)
+
+
+def test_ndjson_is_one_compact_object_per_line():
+    out = io.StringIO()
+    write_ndjson(({'id': n, 'replicas': ['a', 'b']} for n in range(2)), out)
+    assert out.getvalue() == '{"id":0,"replicas":["a","b"]}\n{"id":1,"replicas":["a","b"]}\n'
+
+
+def test_csv_quotes_only_when_needed():
+    out = Output()
+    write_csv(['id', 'replicas'], iter([['s1', 'a b'], ['s2', 'a,b']]), out)
+    assert out.getvalue() == 'id,replicas\ns1,a b\ns2,"a,b"\n'
+    assert out.flushes == 1
+
+
+def test_items_in_every_format():
+    items = [
+        {'id': 'r1', 'state': 'DONE', 'intensity': 0.9, 'nodes': ['a']},
+        {'id': 'r22', 'state': None, 'intensity': 1.0, 'nodes': []},
+    ]
+    fields = ['id', 'state', 'nodes']
+    outputs = {}
+    for fmt in ('json', 'ndjson', 'csv', 'table'):
+        outputs[fmt] = io.StringIO()
+        write_items([{f: i[f] for f in fields} for i in items], fields, fmt, outputs[fmt])
+    assert json.loads(outputs['json'].getvalue())[1] == {'id': 'r22', 'state': None, 'nodes': []}
+    assert outputs['ndjson'].getvalue().count('\n') == 2
+    assert outputs['csv'].getvalue() == 'id,state,nodes\nr1,DONE,"[""a""]"\nr22,,[]\n'
+    assert outputs['table'].getvalue() == 'ID   STATE  NODES\nr1   DONE   ["a"]\nr22         []\n'
+
+
+def test_json_option_overrides_format():
+    assert output_format(argparse.Namespace(json=True, format='csv')) == 'json'
+    assert output_format(argparse.Namespace(json=False, format='csv')) == 'csv'
+    assert output_format(argparse.Namespace(format='ndjson')) == 'ndjson'
+
+
+SEGMENT = {
+    'id': 's1',
+    'state': 'DONE',
+    'failCount': 0,
+    'replicas': {'10.0.0.1': 'dc1', '10.0.0.2': 'dc1'},
+    'startTime': 1_700_000_000_000,
+    'endTime': 1_700_000_090_000,
+    'tokenRange': {'baseRange': {'start': '-100', 'end': '0'}, 'tokenRanges': [{'start': '-100', 'end': '0'}]},
+}
+
+
+def test_segment_list_streams_csv_and_ndjson(capsys):
+    args = argparse.Namespace(json=False, format='csv', show_id=True, show_token_ranges=False, sort='start-time')
+    print_segments([SEGMENT], args)
+    assert capsys.readouterr().out == (
+        'start_token,end_token,id,fail_count,state,replicas,start_time,end_time,'
+        'duration_seconds\n-100,0,s1,0,DONE,10.0.0.1 10.0.0.2,1700000000000,'
+        '1700000090000,90.0\n'
+    )
+    args.format = 'ndjson'
+    print_segments([SEGMENT], args)
+    assert json.loads(capsys.readouterr().out) == SEGMENT
@@ -0,0 +1,130 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import logging
+from datetime import datetime, timezone
+
+import pytest
+
+from cassandra_reaper_cli.planner import DAY, apply_move, plan_cluster
+
+HOUR = 3600
+NOW = 1_800_000_000 // HOUR * HOUR
+
+
+def schedule(keyspace, next_activation, days=7, state='ACTIVE'):
+    return {
+        'id': f"id-{keyspace}",
+        'cluster_name': 'c1',
+        'keyspace_name': keyspace,
+        'owner': 'reaper',
+        'state': state,
+        'scheduled_days_between': days,
+        'intensity': 0.9,
+        'repair_parallelism': 'PARALLEL',
+        'segment_count_per_node': 64,
+        'next_activation': next_activation,
+    }
+
+
+def iso(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def test_plan_cluster_staggers_overlapping_schedules():
+    schedules = [schedule(k, iso(NOW + HOUR)) for k in ('ks1', 'ks2', 'ks3')]
+    schedules.append(schedule('paused', iso(NOW), state='PAUSED'))
+    durations = {('c1', 'ks1'): 3 * HOUR, ('c1', 'ks2'): 2 * HOUR}
+    plan = plan_cluster(schedules, durations, HOUR, NOW, 14 * DAY, HOUR, 1)
+
+    assert plan['schedules'] == 3
+    assert plan['peak'] == 3
+    assert plan['hot_spots'][0] == {
+        'start': NOW + HOUR,
+        'end': NOW + 3 * HOUR,
+        'peak': 3,
+        'keyspaces': ['ks1', 'ks2', 'ks3'],
+    }
+    assert plan['planned_peak'] == 1
+    assert plan['planned_hot_spots'] == []
+    # The longest repair stays, the others start once the previous one is done
+    moves = {m['schedule']['keyspace_name']: m for m in plan['moves']}
+    assert sorted(moves) == ['ks2', 'ks3']
+    assert moves['ks2']['proposed_activation'] == NOW + 4 * HOUR
+    assert moves['ks3']['proposed_activation'] == NOW + 6 * HOUR
+    assert moves['ks3']['shift'] == 5 * HOUR
+
+
+def test_plan_cluster_keeps_level_schedules():
+    schedules = [schedule('ks1', iso(NOW + HOUR)), schedule('ks2', iso(NOW + 5 * HOUR))]
+    plan = plan_cluster(schedules, {}, 2 * HOUR, NOW, 14 * DAY, HOUR, 1)
+    assert plan['hot_spots'] == []
+    assert plan['moves'] == []
+
+
+def test_plan_cluster_moves_overdue_schedules_from_now():
+    schedules = [schedule('ks1', iso(NOW - DAY)), schedule('ks2', iso(NOW - 2 * DAY))]
+    plan = plan_cluster(schedules, {}, 2 * HOUR, NOW, 14 * DAY, HOUR, 1)
+    assert [m['proposed_activation'] for m in plan['moves']] == [NOW + 2 * HOUR]
+
+
+class FakeReaper:
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = []
+
+    def disable_schedule(self, schedule_id):
+        self.calls.append(('disable', schedule_id))
+
+    def add_schedule(self, **kwargs):
+        self.calls.append(('add', kwargs['keyspace'], kwargs['schedule_trigger_time'].timestamp()))
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('Status: 500')
+
+
+def delete(r, s):
+    r.calls.append(('delete', s['id']))
+
+
+def move(seconds_from_now):
+    s = schedule('ks1', iso(NOW + 10 * DAY))
+    return {
+        'schedule': s,
+        'duration': HOUR,
+        'shift': HOUR,
+        'next_activation': NOW + 10 * DAY,
+        'proposed_activation': NOW + 10 * DAY + seconds_from_now,
+    }
+
+
+def test_plan_cluster_with_buckets_under_a_second():
+    schedules = [schedule(k, iso(NOW + HOUR)) for k in ('ks1', 'ks2')]
+    plan = plan_cluster(schedules, {('c1', 'ks1'): 2}, 1, NOW + HOUR, 60, 0.5, 1)
+    assert plan['peak'] == 2
+    assert plan['planned_peak'] == 1
+    assert [(m['schedule']['keyspace_name'], m['shift']) for m in plan['moves']] == [('ks2', 2.0)]
+
+
+def test_apply_move_recreates_schedule():
+    r = FakeReaper(0)
+    apply_move(r, move(HOUR), delete)
+    assert r.calls == [('disable', 'id-ks1'), ('delete', 'id-ks1'), ('add', 'ks1', NOW + 10 * DAY + HOUR)]
+
+
+def test_apply_move_adds_original_back_when_add_fails(caplog):
+    r = FakeReaper(1)
+    with caplog.at_level(logging.ERROR, logger='cassandra-reaper-cli'), pytest.raises(RuntimeError):
+        apply_move(r, move(HOUR), delete)
+    assert r.calls[-2:] == [('add', 'ks1', NOW + 10 * DAY + HOUR), ('add', 'ks1', NOW + 10 * DAY)]
+    assert 'id-ks1' in caplog.text
+    assert '"segment_count_per_node": 64' in caplog.text
+
+
+def test_apply_move_logs_lost_schedule_when_restore_fails(caplog):
+    r = FakeReaper(2)
+    with caplog.at_level(logging.ERROR, logger='cassandra-reaper-cli'), pytest.raises(RuntimeError):
+        apply_move(r, move(HOUR), delete)
+    assert len([c for c in r.calls if c[0] == 'add']) == 2
+    assert 'has no repair schedule' in caplog.text
@@ -0,0 +1,105 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import argparse
+import random
+import re
+
+import pytest
+
+from cassandra_reaper_cli.query import Filter, pushed_down, select, sort_keys
+
+NOW = 1_700_000_000
+
+
+def test_filter_parsing():
+    f = Filter(' keyspace ~ ^audit ')
+    assert (f.field, f.op, f.value) == ('keyspace_name', '~', '^audit')
+    f = Filter('state!=ERROR,ABORTED')
+    assert (f.field, f.op, f.patterns) == ('state', '!=', ['ERROR', 'ABORTED'])
+    assert Filter('intensity<=0.5').bound == 0.5
+    assert Filter('end_time>2023-05-01').bound == '2023-05-01'
+    assert Filter('age>7d').bound == 7 * 86400
+    assert Filter('cluster=prod-eu-1').field == 'cluster_name'
+
+
+@pytest.mark.parametrize('text', ['keyspace', 'keyspace audit', '=audit', 'keyspace~[', 'age>soon'])
+def test_filter_parsing_errors(text):
+    with pytest.raises(argparse.ArgumentTypeError):
+        Filter(text)
+
+
+@pytest.mark.parametrize(('text', 'cause'), [('keyspace~[', re.error), ('age>soon', ValueError)])
+def test_filter_parsing_errors_keep_their_cause(text, cause):
+    with pytest.raises(argparse.ArgumentTypeError) as e:
+        Filter(text)
+    assert isinstance(e.value.__cause__, cause)
+
+
+def test_filter_matching():
+    item = {
+        'keyspace_name': 'audit_log',
+        'state': 'ERROR',
+        'intensity': 0.9,
+        'end_time': None,
+        'creation_time': '2023-11-14T00:00:00Z',
+    }
+    assert Filter('keyspace=audit*,billing')(item, NOW)
+    assert not Filter('keyspace!=audit*')(item, NOW)
+    assert Filter('keyspace~log$')(item, NOW)
+    assert Filter('state!~^DONE')(item, NOW)
+    assert Filter('intensity>0.5')(item, NOW)
+    assert not Filter('intensity<0.5')(item, NOW)
+    assert not Filter('end_time>2023-01-01')(item, NOW)
+    assert Filter('end_time=')(item, NOW)
+    assert Filter('age<1d')(item, NOW)
+    assert not Filter('age>1d')(item, NOW)
+
+
+def test_pushdown_of_exact_equalities():
+    filters = [Filter('keyspace~x'), Filter('cluster=prod-1,prod-2'), Filter('state=RUNNING')]
+    assert pushed_down(filters, 'cluster_name') == ['prod-1', 'prod-2']
+    assert pushed_down(filters, 'state') == ['RUNNING']
+    assert pushed_down(filters, 'keyspace_name') is None
+    assert pushed_down([Filter('cluster=prod-*')], 'cluster_name') is None
+    assert pushed_down([Filter('cluster!=prod-1')], 'cluster_name') is None
+    assert pushed_down(None, 'cluster_name') is None
+
+
+def test_missing_values_sort_last_in_both_directions():
+    items = [{'id': 1, 'end_time': None}, {'id': 2, 'end_time': '2023-05-02'}, {'id': 3, 'end_time': '2023-05-01'}]
+    ascending, descending = sort_keys('end_time'), sort_keys('-end_time')
+    assert [i['id'] for i in select(items, keys=ascending)] == [3, 2, 1]
+    assert [i['id'] for i in select(items, keys=descending)] == [2, 3, 1]
+    assert [i['id'] for i in select(items, keys=ascending, limit=2)] == [3, 2]
+    assert [i['id'] for i in select(items, keys=descending, limit=2)] == [2, 3]
+
+
+def random_items(n, seed):
+    rnd = random.Random(seed)
+    return [
+        {
+            'id': i,
+            'state': rnd.choice(['DONE', 'ERROR', None]),
+            'intensity': rnd.choice([0.5, 0.9, None]),
+            'end_time': rnd.choice([None, '2023-05-01', '2023-05-02', '2023-05-03']),
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize(
+    'sort', ['end_time', '-end_time', 'state,-intensity', '-state,-intensity,-end_time', 'intensity,end_time']
+)
+@pytest.mark.parametrize('limit', [1, 5, 50])
+def test_heap_and_full_sort_agree(sort, limit):
+    items = random_items(200, limit)
+    keys = sort_keys(sort)
+    # With a limit keys in one direction take the heap, the same select without a limit sorts everything
+    filters = [Filter('state!=ERROR')]
+    assert select(items, filters, keys, limit) == select(items, filters, keys)[:limit]
+    ids = [i['id'] for i in select(items, keys=keys, limit=limit)]
+    assert ids == [i['id'] for i in select(items, keys=keys)][:limit]
+    for field, descending in keys:
+        values = [i[field] for i in select(items, keys=[(field, descending)])]
+        assert values == sorted(values, key=lambda v: v is None)
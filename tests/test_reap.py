@@ -0,0 +1,68 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import time
+
+from cassandra_reaper_cli import build_parser, invoked_command
+
+
+def segment(segment_id, state, start, end=None):
+    return {'id': segment_id, 'state': state, 'startTime': start, 'endTime': end, 'replicas': {'10.0.0.1': 'dc1'}}
+
+
+class FakeReaper:
+    def __init__(self):
+        now = time.time() * 1000
+        self.repairs = [
+            {'id': f"r{n}", 'cluster_name': cluster, 'keyspace_name': 'ks1', 'state': 'RUNNING'}
+            for n, cluster in enumerate(['prod-1', 'prod-2', 'dev-1'], 1)
+        ]
+        # Ten 30 s segments done, one running for 10 minutes and one for 30 seconds
+        self.segments = [segment(f"d{n}", 'DONE', now - 3_600_000, now - 3_570_000) for n in range(10)]
+        self.segments += [segment('s1', 'RUNNING', now - 600_000), segment('s2', 'RUNNING', now - 30_000)]
+        self.calls = []
+
+    def get_repairs(self, cluster, states):
+        self.calls.append(('list', cluster, tuple(states)))
+        return self.repairs
+
+    def get_repair_segments(self, repair_id):
+        self.calls.append(('segments', repair_id))
+        return self.segments
+
+    def abort_repair_segment(self, repair_id, segment_id):
+        self.calls.append(('abort', repair_id, segment_id))
+
+
+def run(r, *argv):
+    args = build_parser(invoked_command(argv)).parse_args(argv)
+    return args.func(r, args)
+
+
+def test_reap_stuck_segments_of_matching_clusters():
+    r = FakeReaper()
+    assert run(r, 'repair-segment-reap', '--cluster', 'prod-*', '--min-done', '10') == 0
+    assert r.calls[0] == ('list', '', ('RUNNING',))
+    assert sorted(c for c in r.calls if c[0] != 'list') == [
+        ('abort', 'r1', 's1'),
+        ('abort', 'r2', 's1'),
+        ('segments', 'r1'),
+        ('segments', 'r2'),
+    ]
+
+
+def test_too_few_done_segments_reap_nothing_without_max_duration():
+    r = FakeReaper()
+    run(r, 'repair-segment-reap', '--cluster', 'dev-1')
+    # The list is filtered by Reaper when the cluster is a name
+    assert r.calls[0] == ('list', 'dev-1', ('RUNNING',))
+    assert not any(c[0] == 'abort' for c in r.calls)
+    run(r, 'repair-segment-reap', '--cluster', 'dev-1', '--max-duration', '1m')
+    assert [c for c in r.calls if c[0] == 'abort'] == [('abort', 'r3', 's1')]
+
+
+def test_dry_run_prints_the_abort_commands(capsys):
+    r = FakeReaper()
+    run(r, 'repair-segment-reap', '--cluster', 'dev-1', '--min-done', '10', '--dry-run')
+    assert capsys.readouterr().out == 'repair-segment-abort r3 s1\n'
+    assert not any(c[0] == 'abort' for c in r.calls)
@@ -0,0 +1,137 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import io
+import json
+
+import pytest
+
+from cassandra_reaper_cli.reconcile import apply_change, describe_change, load_desired, plan
+
+
+def desired_file(text, name='desired.yaml'):
+    f = io.StringIO(text)
+    f.name = name
+    return f
+
+
+def schedule(schedule_id, cluster, keyspace, state='ACTIVE', **settings):
+    return dict(
+        {
+            'id': schedule_id,
+            'cluster_name': cluster,
+            'keyspace_name': keyspace,
+            'state': state,
+            'owner': 'reaper',
+            'intensity': 0.5,
+            'scheduled_days_between': 7,
+        },
+        **settings,
+    )
+
+
+RULES = load_desired(desired_file('''
+schedules:
+  - cluster: "prod-*"
+    intensity: 0.9
+  - cluster: prod-eu-1
+    keyspace: audit
+    state: PAUSED
+  - keyspace: "tmp_*"
+    state: ABSENT
+'''))
+
+
+def test_load_desired_yaml_and_json():
+    assert RULES[0] == {'cluster': 'prod-*', 'keyspace': '*', 'intensity': 0.9}
+    rules = load_desired(desired_file(json.dumps({'schedules': [{'intensity': 1, 'adaptive': False}]}), 'd.json'))
+    assert rules == [{'cluster': '*', 'keyspace': '*', 'intensity': 1.0, 'adaptive': False}]
+
+
+@pytest.mark.parametrize(
+    ('text', 'error'),
+    [
+        ('schedules: {}', 'must have a list of rules under `schedules`'),
+        ('schedules: [1]', 'Rule 1 must be a mapping'),
+        ('schedules: [{state: DELETED}]', 'Rule 1 state must be one of ACTIVE, PAUSED, ABSENT'),
+        ('schedules: [{}, {window: 1}]', 'Rule 2 has unknown fields: window'),
+        ('schedules: [{adaptive: 1}]', 'Rule 1 adaptive must be true or false'),
+    ],
+)
+def test_invalid_desired_state(text, error):
+    with pytest.raises(ValueError, match=error):
+        load_desired(desired_file(text))
+
+
+def test_parse_errors_keep_their_cause():
+    with pytest.raises(ValueError, match=r"Can't parse desired\.yaml") as e:
+        load_desired(desired_file('schedules: [unclosed'))
+    assert e.value.__cause__ is not None
+    with pytest.raises(ValueError, match='Rule 1 intensity must be float') as e:
+        load_desired(desired_file('schedules: [{intensity: high}]'))
+    assert isinstance(e.value.__cause__, ValueError)
+
+
+def test_plan_only_what_differs():
+    schedules = [
+        schedule('s1', 'prod-eu-1', 'audit'),
+        schedule('s2', 'prod-eu-1', 'billing', intensity=0.9),
+        schedule('s3', 'prod-us-1', 'tmp_load', state='PAUSED'),
+        schedule('s4', 'dev-1', 'audit'),
+        schedule('s5', 'prod-us-1', 'orders'),
+    ]
+    changes = {c['schedule']['id']: c for c in plan(schedules, RULES)}
+    # s2 is in the desired state already, no rule selects s4
+    assert sorted(changes) == ['s1', 's3', 's5']
+    assert changes['s1']['settings'] == {'intensity': (0.5, 0.9)}
+    assert changes['s1']['state'] == ('ACTIVE', 'PAUSED')
+    assert describe_change(changes['s1']) == 'intensity: 0.5 -> 0.9, state: ACTIVE -> PAUSED'
+    # Settings of a schedule to delete don't matter
+    assert changes['s3'] == {'schedule': schedules[2], 'settings': {}, 'state': ('PAUSED', 'ABSENT')}
+    assert changes['s5']['state'] is None
+
+
+class FakeReaper:
+    def __init__(self):
+        self.calls = []
+
+    def enable_schedule(self, schedule_id):
+        self.calls.append(('enable', schedule_id))
+
+    def disable_schedule(self, schedule_id):
+        self.calls.append(('disable', schedule_id))
+
+
+def update_schedule(r, schedule_id, fields):
+    r.calls.append(('update', schedule_id, fields))
+
+
+def delete_schedule(r, s):
+    r.calls.append(('delete', s['id']))
+
+
+def test_apply_sends_only_settings_reaper_returned():
+    r = FakeReaper()
+    # Reaper omitted segment_count_per_node, percent_unrepaired_threshold and adaptive
+    s = schedule('s1', 'prod-eu-1', 'audit', repair_parallelism='PARALLEL', state='PAUSED')
+    apply_change(
+        r,
+        {'schedule': s, 'settings': {'intensity': (0.5, 0.9)}, 'state': ('PAUSED', 'ACTIVE')},
+        update_schedule,
+        delete_schedule,
+    )
+    assert r.calls == [
+        (
+            'update',
+            's1',
+            {'owner': 'reaper', 'repair_parallelism': 'PARALLEL', 'intensity': 0.9, 'scheduled_days_between': 7},
+        ),
+        ('enable', 's1'),
+    ]
+
+
+def test_apply_disables_before_deleting():
+    r = FakeReaper()
+    s = schedule('s1', 'prod-eu-1', 'tmp_load')
+    apply_change(r, {'schedule': s, 'settings': {}, 'state': ('ACTIVE', 'ABSENT')}, update_schedule, delete_schedule)
+    assert r.calls == [('disable', 's1'), ('delete', 's1')]
@@ -0,0 +1,68 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import os
+
+import pytest
+from requests.exceptions import HTTPError
+
+from cassandra_reaper_cli import build_parser, invoked_command, restore_snapshot
+from cassandra_reaper_cli.bulk import RateLimiter
+from cassandra_reaper_cli.snapshot import load_snapshot, save_snapshot, snapshot_path
+
+URL = 'http://reaper'
+
+
+class FakeReaper:
+    """Answers state changes of the given IDs with the given HTTP status"""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.calls = []
+
+    def change(self, item_id):
+        self.calls.append(item_id)
+        if item_id in self.statuses:
+            msg = f"URL: {URL}/{item_id}, Status: {self.statuses[item_id]}, Text: "
+            raise HTTPError(msg)
+
+    enable_schedule = resume_repair = change
+
+
+def restore(statuses):
+    argv = ('--url', URL, 'cluster-enable', 'c1', '--from-snapshot')
+    args = build_parser(invoked_command(argv)).parse_args(argv)
+    args.cluster, args.limiter = 'c1', RateLimiter()
+    r = FakeReaper(statuses)
+    return restore_snapshot(r, args), r.calls
+
+
+@pytest.fixture
+def path(monkeypatch, tmp_path):
+    monkeypatch.setenv('XDG_STATE_HOME', str(tmp_path))
+    path = snapshot_path(URL, 'c1')
+    save_snapshot(
+        path,
+        'c1',
+        [{'id': 's1', 'keyspace_name': 'ks1'}],
+        [{'id': 'r1', 'keyspace_name': 'ks1'}, {'id': 'r2', 'keyspace_name': 'ks2'}],
+    )
+    return path
+
+
+def test_restored_snapshot_is_removed(path):
+    assert restore({}) == (0, ['s1', 'r1', 'r2'])
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize('status', [404, 405, 409])
+def test_items_that_cant_be_restored_anymore_are_skipped(path, status):
+    # e.g. a repair that finished or was aborted since the snapshot
+    assert restore({'s1': 404, 'r1': status}) == (0, ['s1', 'r1', 'r2'])
+    assert not os.path.exists(path)
+
+
+def test_failures_keep_the_snapshot(path):
+    failed, _ = restore({'r2': 400})
+    assert failed == 1
+    assert [i['id'] for i in load_snapshot(path)['repairs']] == ['r1', 'r2']
@@ -0,0 +1,58 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import argparse
+import subprocess
+import sys
+
+import pytest
+
+from cassandra_reaper_cli import COMMANDS, build_parser, duration, invoked_command
+
+
+def subcommands(parser):
+    return next(a for a in parser._actions if isinstance(a, argparse._SubParsersAction)).choices
+
+
+def test_invoked_command_is_the_first_command_name():
+    assert invoked_command(['--url', 'http://reaper', 'repair-list', '--states', 'RUNNING']) == 'repair-list'
+    assert invoked_command(['cluster-repair-list', 'repair-list']) == 'cluster-repair-list'
+    assert invoked_command(['--profile']) is None
+    assert invoked_command([]) is None
+
+
+def test_only_the_invoked_subparser_gets_its_arguments():
+    choices = subcommands(build_parser('repair-list'))
+    # Every command is still listed, so usage and errors name all of them
+    assert set(choices) == set(COMMANDS)
+    assert any('--states' in a.option_strings for a in choices['repair-list']._actions)
+    assert [a.dest for a in choices['schedule-list']._actions] == ['help']
+
+
+def test_full_parser_for_completion():
+    choices = subcommands(build_parser())
+    assert all(len(p._actions) > 1 or not COMMANDS[name][2] for name, p in choices.items())
+
+
+def test_unknown_command_is_still_an_error(capsys):
+    with pytest.raises(SystemExit) as e:
+        build_parser(invoked_command(['repair-lst'])).parse_args(['repair-lst'])
+    assert e.value.code == 2
+    assert "invalid choice: 'repair-lst'" in capsys.readouterr().err
+
+
+def test_duration():
+    assert duration('90') == 90
+    assert duration('2h') == 7200
+    for value in ('soon', '0'):
+        with pytest.raises(argparse.ArgumentTypeError):
+            duration(value)
+
+
+def test_package_import_leaves_out_the_api_client():
+    code = (
+        'import sys, cassandra_reaper_cli; '
+        'print(sorted(m for m in ("requests", "cassandra_reaper_api", "shtab") if m in sys.modules))'
+    )
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
@@ -0,0 +1,159 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+from cassandra_reaper_cli.stats import repair_progress, since_last_pause, stuck_segments
+
+START = 1_700_000_000_000
+
+
+def done(end, duration=20_000):
+    return {'state': 'DONE', 'startTime': end - duration, 'endTime': end}
+
+
+def todo(n):
+    return [{'state': 'NOT_STARTED', 'startTime': None, 'endTime': None}] * n
+
+
+def repair(state='RUNNING', intensity=1.0, pause_time=None):
+    return {'state': state, 'intensity': intensity, 'pause_time': pause_time}
+
+
+def iso(ms):
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+# 20 segments a minute apart, a pause of an hour, then 10 segments 30 seconds apart at a higher intensity
+BEFORE = [START + n * 60_000 for n in range(20)]
+AFTER = [BEFORE[-1] + 3_600_000 + n * 30_000 for n in range(10)]
+
+
+def test_since_last_pause_cuts_at_the_gap():
+    assert since_last_pause(BEFORE + AFTER) == AFTER
+    assert since_last_pause(BEFORE) == BEFORE
+    assert since_last_pause(BEFORE + AFTER, AFTER[3] - 1) == AFTER[3:]
+
+
+def test_since_last_pause_keeps_bursty_completions():
+    # Bursts of completions a second apart with a minute between them, as with parallel segments
+    ends = [START + burst * 60_000 + n * 1000 for burst in range(20) for n in range(5)]
+    assert since_last_pause(ends) == ends
+    assert since_last_pause(ends, window=30) == ends[-30:]
+
+
+def simulated_run(seed, workers, intensity, pause_at=None, pause=0):
+    """Segments of workers repairing one after another, like Reaper does at `intensity`.
+
+    Durations have a long tail, after each segment a worker waits for the
+    duration times (1 / intensity - 1) and a scheduling delay of up to 10 s.
+    A pause aborts running segments and starts no others until it ends.
+    """
+    rnd = random.Random(seed)
+    segments = []
+    for _ in range(workers):
+        start = START + rnd.randint(0, 60_000)
+        while start < START + 10_000_000 + pause:
+            duration = round(rnd.lognormvariate(10.5, 1.0))
+            if pause_at and start < pause_at + pause and start + duration > pause_at:
+                start = pause_at + pause
+                continue
+            segments.append(done(start + duration, duration))
+            start += round(duration / intensity) + rnd.randint(0, 10_000)
+    return sorted(segments, key=lambda s: s['endTime'])
+
+
+@pytest.mark.parametrize('workers', [1, 3, 8])
+@pytest.mark.parametrize('intensity', [1.0, 0.5, 0.1])
+def test_irregular_completions_are_not_taken_for_a_pause(workers, intensity):
+    for seed in range(50):
+        segments = simulated_run(seed, workers, intensity)
+        progress = repair_progress(repair(intensity=intensity), segments + todo(10), segments[-1]['endTime'])
+        assert progress['observed'] == min(len(segments), 100), seed
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_pause_longer_than_segment_cycles_is_found(workers):
+    pause_at = START + 5_000_000
+    for seed in range(50):
+        segments = simulated_run(seed, workers, 1.0, pause_at, 4 * 3_600_000)
+        after = [s for s in segments if s['endTime'] > pause_at]
+        progress = repair_progress(repair(), segments[-len(after) - 50 :] + todo(10), after[-1]['endTime'])
+        assert progress['observed'] == min(len(after), 100), seed
+
+
+def test_reported_pause_time_is_trusted():
+    # Completions since pause_time are all observed, whatever gaps they have
+    ends = BEFORE + AFTER
+    assert since_last_pause(ends, BEFORE[5], cycle=1000) == ends[5:]
+    assert since_last_pause(ends, cycle=1000) == AFTER
+
+
+def test_gap_shorter_than_segment_cycles_is_no_pause():
+    # One slow segment of 10 minutes explains the 9 minute gap before the last completions
+    segments = [done(e) for e in BEFORE] + [done(BEFORE[-1] + 540_000, 600_000)]
+    segments += [done(BEFORE[-1] + 540_000 + n * 60_000) for n in range(1, 5)]
+    progress = repair_progress(repair(), segments + todo(10), segments[-1]['endTime'])
+    assert progress['observed'] == 25
+
+
+def test_rate_after_a_pause_ignores_completions_before_it():
+    segments = [done(e) for e in BEFORE + AFTER] + todo(60)
+    progress = repair_progress(repair(), segments, AFTER[-1] + 1000)
+    assert progress['observed'] == 10
+    assert progress['observed_since'] == AFTER[0] / 1000
+    assert progress['rate'] == pytest.approx(120)
+    assert progress['remaining_seconds'] == pytest.approx(60 * 30)
+
+
+def test_pause_time_of_a_running_repair_starts_the_window():
+    # Same pace before and after the pause, so only pause_time tells them apart
+    ends = [START + n * 60_000 for n in range(20)] + [START + 20 * 60_000 + n * 30_000 for n in range(10)]
+    segments = [done(e) for e in ends] + todo(60)
+    progress = repair_progress(repair(pause_time=iso(START + 20 * 60_000 - 1000)), segments, ends[-1])
+    assert progress['observed'] == 10
+    assert progress['rate'] == pytest.approx(120)
+
+
+def test_paused_repair_keeps_the_rate_before_its_pause():
+    segments = [done(e) for e in BEFORE] + todo(60)
+    progress = repair_progress(repair('PAUSED', pause_time=iso(BEFORE[-1] + 1000)), segments, BEFORE[-1] + 60_000)
+    assert progress['rate'] == pytest.approx(60)
+    assert progress['eta'] is None
+
+
+def test_model_rate_right_after_a_pause():
+    segments = [done(e) for e in BEFORE + AFTER[:2]] + [{'state': 'RUNNING', 'startTime': AFTER[1], 'endTime': None}]
+    progress = repair_progress(repair(intensity=0.5), segments + todo(10), AFTER[1] + 1000)
+    assert progress['rate'] is None
+    # One running segment of 20 s at intensity 0.5
+    assert progress['model_rate'] == pytest.approx(90)
+    assert progress['remaining_seconds'] == pytest.approx(11 * 40)
+
+
+def running(start, segment_id='s1'):
+    return {'id': segment_id, 'state': 'RUNNING', 'startTime': start, 'endTime': None}
+
+
+# DONE segments of 10 to 29 seconds, the 90th percentile is 27 s
+DURATIONS = [done(START + n * 60_000, (10 + n) * 1000) for n in range(20)]
+
+
+def test_stuck_segments_relative_to_done_durations():
+    now = START + 3_600_000
+    segments = [*DURATIONS, running(now - 60_000, 's1'), running(now - 100_000, 's2'), running(now - 90_000, 's3')]
+    threshold, stuck = stuck_segments(segments, now)
+    assert threshold == pytest.approx(3 * 27)
+    assert [(s['id'], seconds) for s, seconds in stuck] == [('s2', 100), ('s3', 90)]
+
+
+def test_stuck_segments_need_enough_done_segments_or_a_cap():
+    now = START + 3_600_000
+    segments = [*DURATIONS[:19], running(now - 100_000)]
+    assert stuck_segments(segments, now) == (None, [])
+    assert stuck_segments(segments, now, cap=60)[0] == 60
+    # The cap is the upper bound of the relative threshold
+    assert stuck_segments([*DURATIONS, running(now - 70_000)], now, cap=60)[1][0][1] == 70
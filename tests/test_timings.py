@@ -0,0 +1,106 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import io
+import json
+
+import pytest
+
+from cassandra_reaper_cli import exit_status
+from cassandra_reaper_cli.timings import Timings, endpoint
+
+URL = 'http://reaper/'
+
+
+class Response:
+    def __init__(self, url, status_code, content):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+
+
+class FakeSession:
+    """Answers every request with 200 and the URL as body, or with the status of a path listed in `statuses`"""
+
+    def __init__(self, statuses=None):
+        self.statuses = statuses or {}
+
+    def request(self, _, url, *_args, **_kwargs):
+        path = url[len(URL) :]
+        if self.statuses.get(path) is ConnectionError:
+            raise ConnectionError(url)
+        return Response(url, self.statuses.get(path, 200), url.encode())
+
+
+def timed(statuses=None, *requests):
+    timings = Timings()
+    session = FakeSession(statuses)
+    timings.instrument(session)
+    for method, path in requests:
+        try:
+            session.request(method, URL + path)
+        except ConnectionError:
+            pass
+    return timings
+
+
+def test_endpoint_names_replace_parameters():
+    assert endpoint('GET', f"{URL}repair_run/1f2e/segments") == 'GET repair_run/{}/segments'
+    assert endpoint('PUT', f"{URL}repair_run/1f2e/state/PAUSED") == 'PUT repair_run/{}/state/PAUSED'
+    assert endpoint('GET', f"{URL}cluster/prod-eu-1/tables?x=1") == 'GET cluster/{}/tables'
+
+
+def test_report_per_endpoint():
+    timings = timed(
+        {'repair_run/r2': 404, 'repair_run/r3': ConnectionError},
+        ('get', 'repair_run/r1'),
+        ('GET', 'repair_run/r2'),
+        ('GET', 'repair_run/r3'),
+        ('GET', 'repair_run/r1'),
+        ('PUT', 'repair_run/r1/state/PAUSED'),
+    )
+    report = timings.report()
+    assert report['requests'] == 5
+    get = report['endpoints']['GET repair_run/{}']
+    assert (get['calls'], get['errors'], get['bytes']) == (4, 2, 3 * len(f"{URL}repair_run/r1"))
+    assert get['histogram'][-1] == 4
+    assert report['endpoints']['PUT repair_run/{}/state/PAUSED']['errors'] == 0
+    assert report['duplicates'] == [{'url': f"{URL}repair_run/r1", 'calls': 2}]
+
+
+def test_api_time_counts_parallel_requests_once():
+    timings = Timings()
+    timings.requests = [('GET', URL, 0.0, 2.0, 200, 0), ('GET', URL, 1.0, 3.0, 200, 0), ('GET', URL, 5.0, 6.0, 200, 0)]
+    timings.add_phase('command', 10.0)
+    assert timings.api_wall_time() == 4.0
+    phases = timings.report()['phases']
+    assert (phases['api'], phases['cli']) == (4.0, 6.0)
+
+
+def test_print_report():
+    out = io.StringIO()
+    timings = timed(None, ('GET', 'repair_run'), ('GET', 'repair_run'))
+    timings.add_phase('startup', 0.1)
+    timings.print_report(out)
+    assert 'startup' in out.getvalue()
+    assert 'GET repair_run' in out.getvalue()
+    assert f"1 redundant GET requests:\n    2x {URL}repair_run\n" in out.getvalue()
+
+
+def test_save_json_and_prometheus(tmp_path):
+    timings = timed(None, ('GET', 'cluster'))
+    timings.add_phase('command', 1.0)
+    timings.save(str(tmp_path / 'profile.json'), 'cluster-list', 0)
+    saved = json.loads((tmp_path / 'profile.json').read_text())
+    assert (saved['command'], saved['exit_code'], saved['requests']) == ('cluster-list', 0, 1)
+    timings.save(str(tmp_path / 'profile.prom'), 'cluster-list', 1)
+    text = (tmp_path / 'profile.prom').read_text()
+    assert 'reaper_cli_exit_code{command="cluster-list"} 1\n' in text
+    assert 'reaper_cli_api_requests{command="cluster-list",endpoint="GET cluster"} 1\n' in text
+    labels = 'command="cluster-list",endpoint="GET cluster"'
+    assert f'reaper_cli_api_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1\n' in text
+
+
+@pytest.mark.parametrize(('code', 'status'), [(None, 0), (0, 0), (3, 3), ('Reaper is down', 1)])
+def test_exit_status_of_system_exit_codes(code, status):
+    assert exit_status(code) == status
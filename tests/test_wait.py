@@ -0,0 +1,124 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import argparse
+import logging
+import random
+import time
+
+import pytest
+import requests
+
+from cassandra_reaper_cli import WAIT_TIMED_OUT, WAIT_UNEXPECTED_STATE, repair_wait
+
+
+class Clock:
+    """time.monotonic() and time.sleep() that only advance on sleep"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(time, 'sleep', clock.sleep)
+    return clock
+
+
+class FakeReaper:
+    """Repairs whose states follow a script, one list of states per poll"""
+
+    def __init__(self, *polls):
+        self.polls = list(polls)
+        self.states = {}
+        self.calls = []
+
+    def repair(self, repair_id):
+        return {
+            'id': repair_id,
+            'cluster_name': 'c1',
+            'keyspace_name': f"ks_{repair_id}",
+            'state': self.states[repair_id],
+        }
+
+    def get_repairs(self, cluster, states):
+        self.calls.append(('list', cluster))
+        if self.polls:
+            poll = self.polls.pop(0)
+            if isinstance(poll, Exception):
+                raise poll
+            self.states.update(poll)
+        return [self.repair(i) for i, state in self.states.items() if state in states]
+
+    def get_repair(self, repair_id):
+        self.calls.append(('get', repair_id))
+        if repair_id not in self.states:
+            msg = f"URL: http://reaper/repair_run/{repair_id}, Status: 404, Text: Not found"
+            raise requests.HTTPError(msg)
+        return self.repair(repair_id)
+
+
+def wait_args(*ids, until=('DONE',), timeout=None, cluster=None):
+    return argparse.Namespace(
+        ids=list(ids), cluster=cluster, until=list(until), timeout=timeout, interval=2.0, max_interval=8.0
+    )
+
+
+def test_wait_until_all_repairs_are_done(clock, monkeypatch):
+    monkeypatch.setattr(random, 'uniform', lambda _, high: high)
+    r = FakeReaper({'r1': 'RUNNING', 'r2': 'PAUSED'}, {}, {}, {'r2': 'DONE'}, {'r1': 'DONE'})
+    assert repair_wait(r, wait_args('r1', 'r2')) is None
+    # Polls back off while nothing changes and list only the cluster of the repairs once it's known
+    assert clock.sleeps == [2.0, 4.0, 8.0, 2.0]
+    assert r.calls[0] == ('list', '')
+    assert ('list', 'c1') in r.calls
+    # Ended repairs are fetched by ID once
+    assert r.calls.count(('get', 'r2')) == 1
+
+
+@pytest.mark.usefixtures('clock')
+def test_repair_ending_in_another_state_exits_4(caplog):
+    r = FakeReaper({'r1': 'RUNNING'}, {'r1': 'ABORTED'})
+    with caplog.at_level(logging.ERROR, logger='cassandra-reaper-cli'), pytest.raises(SystemExit) as e:
+        repair_wait(r, wait_args('r1'))
+    assert e.value.code == WAIT_UNEXPECTED_STATE
+    assert 'Repair r1 ended in ABORTED state instead of DONE' in caplog.text
+
+
+@pytest.mark.usefixtures('clock')
+def test_deleted_repair_exits_4():
+    r = FakeReaper({})
+    with pytest.raises(SystemExit) as e:
+        repair_wait(r, wait_args('r1'))
+    assert e.value.code == WAIT_UNEXPECTED_STATE
+
+
+def test_timeout_exits_3(clock, caplog):
+    r = FakeReaper({'r1': 'RUNNING', 'r2': 'DONE'})
+    with caplog.at_level(logging.ERROR, logger='cassandra-reaper-cli'), pytest.raises(SystemExit) as e:
+        repair_wait(r, wait_args('r1', 'r2', timeout=30))
+    assert e.value.code == WAIT_TIMED_OUT
+    assert 'Timed out waiting for repairs: r1 (RUNNING)' in caplog.text
+    # The last sleep is cut short at the deadline
+    assert clock.now == 130
+
+
+@pytest.mark.usefixtures('clock')
+def test_transient_errors_are_retried():
+    r = FakeReaper(requests.ConnectionError('Connection refused'), {'r1': 'DONE'})
+    assert repair_wait(r, wait_args('r1')) is None
+
+
+def test_ids_or_cluster():
+    assert repair_wait(FakeReaper(), wait_args()) == 1
+    assert repair_wait(FakeReaper(), wait_args('r1', cluster='c1')) == 1
@@ -0,0 +1,50 @@
+# SPDX-FileCopyrightText: 2023-present Timur Isanov <tisanov@evolution.com>
+#
+# SPDX-License-Identifier: MIT
+import io
+import logging
+
+import pytest
+
+from cassandra_reaper_cli import build_parser, invoked_command
+from cassandra_reaper_cli.watch import Screen
+
+
+def run(*argv):
+    args = build_parser(invoked_command(argv)).parse_args(argv)
+    # Conflicting options are refused before any API call
+    return args.func(None, args)
+
+
+@pytest.mark.parametrize(
+    ('argv', 'options'),
+    [
+        (('repair-list', '--watch', '--json'), '--json'),
+        (('repair-list', '-w', '2', '--format', 'csv', '--fields', 'id'), '--format, --fields'),
+        (('cluster-repair-list', 'c1', '--watch', '-f', 'ndjson'), '--format'),
+        (('repair-segment-list', 'r1', '--watch', '-j'), '--json'),
+        (('repair-segment-list', 'r1', '--watch', '--format', 'csv'), '--format'),
+    ],
+)
+def test_watch_refuses_output_options(caplog, argv, options):
+    with caplog.at_level(logging.ERROR, logger='cassandra-reaper-cli'):
+        assert run(*argv) == 1
+    assert f"--watch always shows a table, it can't be combined with {options}" in caplog.text
+
+
+class Output(io.StringIO):
+    def isatty(self):
+        return False
+
+
+def test_screen_prints_only_changed_rows_when_not_a_terminal():
+    out = Output()
+    screen = Screen(out)
+    assert screen.update('ID STATE', [('r1', 'RUNNING', 'r1 RUNNING 1m'), ('r2', 'PAUSED', 'r2 PAUSED')]) == 0
+    # A running duration changes the text only, a state change changes the signature
+    assert screen.update('ID STATE', [('r1', 'RUNNING', 'r1 RUNNING 2m'), ('r2', 'RUNNING', 'r2 RUNNING')]) == 1
+    assert screen.update('ID STATE', [('r1', 'RUNNING', 'r1 RUNNING 3m'), ('r2', 'RUNNING', 'r2 RUNNING')]) == 0
+    lines = out.getvalue().splitlines()
+    assert lines[:3] == ['ID STATE', 'r1 RUNNING 1m', 'r2 PAUSED']
+    assert lines[3].startswith('--- ')
+    assert lines[4:] == ['r2 RUNNING']